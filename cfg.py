@@ -24,6 +24,72 @@ class Config:
     # 数据库文件路径
     sDBFilePath = sDBPath / "farm.db"
 
+    # 数据库日志模式
+    sDBJournalMode = "WAL"
+
+    # 数据库同步模式
+    sDBSynchronous = "NORMAL"
+
+    # 数据库页缓存大小 负数单位为KiB 正数单位为页
+    iDBCacheSize = -16000
+
+    # 数据库内存映射大小 单位字节 0为关闭
+    iDBMmapSize = 134217728
+
+    # 数据库临时表存储位置
+    sDBTempStore = "MEMORY"
+
+    # 数据库锁等待超时 单位毫秒
+    iDBBusyTimeout = 5000
+
+    # 数据库只读连接数量 0为读写共用一个连接
+    iDBReaderCount = 2
+
+    # 数据库存储后端 sqlite=文件数据库 memory=内存数据库 定时写回文件
+    sDBBackend = "sqlite"
+
+    # 内存数据库写回文件的间隔 单位秒 0为只在卸载插件时写回
+    iDBCheckpointInterval = 300
+
+    # 定时备份间隔 单位小时 0为不备份
+    iDBBackupInterval = 24
+
+    # 保留的备份数量
+    iDBBackupKeep = 7
+
+    # 在线备份每步复制的页数
+    iDBBackupPages = 256
+
+    # 数据整理的空闲时段 格式为 开始小时-结束小时 为空时不定时整理
+    sDBQuietHours = "4-6"
+
+    # 签到记录保留逐日明细的月数 更早的记录归档为月度汇总 0为不归档
+    iSignLogRetentionMonths = 3
+
+    # 增量整理每批回收的页数
+    iDBVacuumPages = 256
+
+    # 导出农场数据的压缩方式 none gzip zstd zstd需安装zstandard
+    sDBExportCompression = "gzip"
+
+    # 是否开启合并提交 多个用户的写入合并为一次事务提交
+    bDBGroupCommit = False
+
+    # 合并提交最长等待时间 单位毫秒
+    iDBGroupCommitDelay = 5
+
+    # 合并提交最多合并的写入数量 达到后立即提交
+    iDBGroupCommitSize = 32
+
+    # 用户信息缓存数量 0为不缓存
+    iUserCacheSize = 1024
+
+    # 未开通农场用户的缓存时间 单位秒
+    iUserCacheNegativeTTL = 30
+
+    # 地块存储方式 row=每块土地一行 packed=每个用户的全部土地打包为一行
+    sSoilEngine = "row"
+
     # 农场资源文件目录
     sResourcePath = Path(__file__).resolve().parent / "resource"
 
@@ -71,7 +137,8 @@ class Config:
         },
         "eradicate": {
             "success": "🗑️ 成功铲除荒废作物，累计获得经验：{exp} ✨",
-            "error": "❌ 没有可以铲除的作物 🚜",
+            "no": "❌ 没有可以铲除的作物 🚜",
+            "error": "❌ 铲除失败，请稍后重试！⏳",
         },
         "reclamation": {
             "confirm": "⚠️ 回复“是”将执行开垦 ⛏️",
@@ -92,6 +159,7 @@ class Config:
             "success1": "💰 成功出售{name}，获得农场币：{point}，当前农场币：{num} 🥳",
             "error": "❌ 出售作物{name}出错：仓库中不存在该作物 🚫",
             "error1": "❌ 出售作物{name}出错：数量不足 ⚠️",
+            "error2": "❌ 出售作物失败，请稍后重试！⏳",
         },
         "stealing": {
             "noTarget": "🎯 请在指令后跟需要at的人 👤",
@@ -100,6 +168,7 @@ class Config:
             "info": "🤫 成功偷到作物：{name}，数量为：{num} 🍒",
             "noPlant": "🌱 目标没有作物可以被偷 🌾",
             "repeat": "🚫 你已经偷过目标啦，请手下留情 🙏",
+            "error": "❌ 偷菜失败，请稍后重试！⏳",
         },
         "changeName": {
             "noName": "✏️ 请在指令后跟需要更改的农场名",
@@ -115,6 +184,37 @@ class Config:
             "error": "❗️ 签到功能异常！",
             "error1": "❌ 签到失败！未知错误 💔",
         },
+        "backup": {
+            "noAdmin": "🔒 只有管理员可以管理农场备份",
+            "success": "✅ 农场数据已备份：{name}",
+            "error": "❌ 农场数据备份失败，请查看日志 💔",
+            "empty": "📭 暂无农场备份",
+            "list": "🗂️ 农场备份（从新到旧）：\n{names}",
+            "notFound": "❓ 未找到备份：{name}",
+            "restore": "✅ 备份{name}已恢复到暂存文件并通过完整性校验\n📄 {path}\n🔢 数据库版本v{version}，共{users}位用户\n停用插件后用该文件替换 farm.db 即可完成恢复",
+            "restoreError": "❌ 备份{name}校验失败：{integrity}",
+        },
+        "retention": {
+            "noAdmin": "🔒 只有管理员可以整理农场数据",
+            "success": "✅ 农场数据整理完毕\n📅 归档签到记录{signRows}条\n🧹 清理偷菜记录{stealRows}条\n💾 回收{vacuumPages}页，剩余空闲{freePages}页\n⏱️ 耗时{seconds}秒",
+            "busy": "⏳ 农场数据正在整理中，请稍后再试",
+        },
+        "metrics": {
+            "noAdmin": "🔒 只有管理员可以查看农场指标",
+            "success": "📊 农场运行指标\n🔐 用户锁：加锁{lockAcquired}次，等待{lockContended}次，平均等待{lockWaitAvg}ms，最长{lockWaitMax}ms，当前{lockActive}把\n💾 数据库提交：{commits}次（{commitMode}），失败{commitFailed}次，平均合并{batchAvg}个写入，最多{batchMax}个，平均耗时{commitAvg}ms\n🗂️ 用户缓存：命中率{cacheHitRate}%，命中{cacheHit}次，未命中{cacheMiss}次，淘汰{cacheEvicted}次，当前缓存{cacheSize}个用户",
+        },
+        "transfer": {
+            "noAdmin": "🔒 只有管理员可以导出或导入农场数据",
+            "busy": "⏳ 农场数据正在导出或导入中，请稍后再试",
+            "exportSuccess": "✅ 农场数据已导出：{name}\n📦 共{rows}行，耗时{seconds}秒",
+            "exportError": "❌ 农场数据导出失败，请查看日志 💔",
+            "noName": "✏️ 请在指令后跟导出目录中的文件名，可以通过【农场导出】生成",
+            "notFound": "❓ 导出目录中未找到文件：{name}",
+            "importSuccess": "✅ 农场数据已导入：{name}\n📥 本次导入{rows}行，跳过此前已导入的{resumed}行，耗时{seconds}秒",
+            "importIncomplete": "⚠️ 农场数据已导入：{name}\n📥 本次导入{rows}行，但文件缺少结束标记，可能不完整",
+            "importError": "❌ 农场数据导入中断：{error}\n📥 已导入{rows}行，再次执行同一指令将从中断处继续",
+            "importNewer": "❌ 无法导入：{name}\n🧬 文件的数据库版本为{dbVersion}，高于当前的{localVersion}，请先更新插件",
+        },
         "soilInfo": {
             "noSoil": "✏️ 请在指令后跟需要升级的土地ID，可以通过【农场详述】查询",
             "success": "土地成功升级至{name}，效果为：{text}",
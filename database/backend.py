@@ -0,0 +1,147 @@
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import aiosqlite
+from astrbot.api import logger
+
+from .statement import g_pStatementRegistry
+
+
+class CStorageBackend(ABC):
+    """存储后端基类
+
+    CSqlManager 只通过后端获取写连接与只读连接，各数据表的仓库类
+    (用户、土地、种子、作物、道具、偷菜、签到) 不感知数据存放在哪里
+
+    注意：目前两种后端都基于 SQLite 连接，memory 后端是内存中的 SQLite 数据库，
+    而不是以字典/数组保存数据；各仓库类仍直接编写 SQL，
+    未抽象出与存储无关的仓库接口
+    """
+
+    # 后端名称 与配置项 sDBBackend 对应
+    m_sName = ""
+
+    def __init__(self, path: str | Path | None):
+        """
+        Args:
+            path (str | Path | None): 数据库文件路径
+        """
+        self.m_pPath = Path(path) if path else None
+
+    @staticmethod
+    def create(name: str, path: str | Path | None) -> "CStorageBackend":
+        """按名称创建存储后端
+
+        Args:
+            name (str): 后端名称 sqlite 或 memory
+            path (str | Path | None): 数据库文件路径
+
+        Returns:
+            CStorageBackend: 存储后端，名称未知时使用 sqlite
+        """
+        for backend in (CSqliteBackend, CMemoryBackend):
+            if backend.m_sName == name:
+                return backend(path)
+
+        logger.warning(f"未知的数据库存储后端: {name}，已改用sqlite")
+        return CSqliteBackend(path)
+
+    @property
+    def supportsCheckpoint(self) -> bool:
+        """是否需要定时将数据写回文件"""
+        return False
+
+    @abstractmethod
+    async def connect(self) -> aiosqlite.Connection:
+        """打开写连接
+
+        Returns:
+            aiosqlite.Connection: 数据库连接
+        """
+        raise NotImplementedError
+
+    async def connectReader(self) -> aiosqlite.Connection | None:
+        """打开独立的只读连接
+
+        Returns:
+            aiosqlite.Connection | None: 数据库连接，后端不支持独立只读连接时返回 None，
+            此时读取与快照都改由写连接完成
+        """
+        return None
+
+    async def checkpoint(self, db: aiosqlite.Connection) -> bool:
+        """将数据持久化到文件，调用方需保证没有未提交的事务
+
+        Args:
+            db (aiosqlite.Connection): 写连接
+
+        Returns:
+            bool: 是否写入了文件
+        """
+        return False
+
+
+class CSqliteBackend(CStorageBackend):
+    """文件数据库 每次提交即写入文件"""
+
+    m_sName = "sqlite"
+
+    async def connect(self) -> aiosqlite.Connection:
+        return await aiosqlite.connect(
+            self.m_pPath, cached_statements=g_pStatementRegistry.m_iCacheSize
+        )
+
+    async def connectReader(self) -> aiosqlite.Connection:
+        return await aiosqlite.connect(
+            self.m_pPath.resolve().as_uri() + "?mode=ro",
+            uri=True,
+            cached_statements=g_pStatementRegistry.m_iCacheSize,
+        )
+
+
+class CMemoryBackend(CStorageBackend):
+    """内存数据库
+
+    启动时通过 SQLite 备份接口将文件整体载入内存，之后的读写不再访问磁盘，
+    按检查点间隔与卸载插件时再通过备份接口整体写回文件；
+    未指定文件时数据只存在于内存，用于压测与测试
+    """
+
+    m_sName = "memory"
+
+    # 内存数据库只属于创建它的连接 不提供独立的只读连接
+
+    @property
+    def supportsCheckpoint(self) -> bool:
+        return self.m_pPath is not None
+
+    async def connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(
+            ":memory:", cached_statements=g_pStatementRegistry.m_iCacheSize
+        )
+
+        if self.m_pPath and self.m_pPath.exists():
+            async with aiosqlite.connect(self.m_pPath) as source:
+                await source.backup(db)
+            logger.info(f"真寻农场数据库已载入内存: {self.m_pPath}")
+
+        return db
+
+    async def checkpoint(self, db: aiosqlite.Connection) -> bool:
+        if not self.m_pPath:
+            return False
+
+        # 先写入临时文件再整体替换 写入中途失败不影响原文件
+        temp = self.m_pPath.with_name(self.m_pPath.name + ".checkpoint")
+        temp.unlink(missing_ok=True)
+
+        async with aiosqlite.connect(temp) as target:
+            await db.backup(target)
+            await target.execute("PRAGMA journal_mode = DELETE")
+
+        # 原文件遗留的日志属于旧数据 替换前一并删除
+        for suffix in ("-wal", "-shm", "-journal"):
+            Path(f"{self.m_pPath}{suffix}").unlink(missing_ok=True)
+        os.replace(temp, self.m_pPath)
+        return True
@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+import gzip
+import os
+import shutil
+import time
+from pathlib import Path
+
+import aiosqlite
+from astrbot.api import logger
+
+from ..cfg import g_pConfigManager
+from ..tool import g_pToolManager
+from .database import CSqlManager
+
+
+class CBackupManager(CSqlManager):
+    """farm.db 在线备份
+
+    通过 SQLite 备份接口按页分步复制，文件数据库在独立的只读连接上进行，
+    开始前开启读事务固定快照，备份得到的是该时刻的完整数据库，
+    复制在连接线程中分步执行，每步之间让出数据库，不阻塞事件循环与写入
+    """
+
+    # 备份文件名前缀与后缀 farm-年月日-时分秒.db.gz
+    m_sPrefix = "farm-"
+    m_sSuffix = ".db.gz"
+
+    # 每步之间的等待时间 单位秒
+    m_fStepSleep = 0.005
+
+    # 定时备份任务 保留引用避免任务被回收
+    m_pBackupTask: asyncio.Task | None = None
+
+    # 正在进行的备份 同一时间只允许一个
+    m_pBackupLock = asyncio.Lock()
+
+    @classmethod
+    def backupDir(cls) -> Path:
+        """备份目录 位于数据库文件同级的 backup 目录"""
+        return Path(g_pConfigManager.sDBFilePath).parent / "backup"
+
+    @classmethod
+    def stagingPath(cls) -> Path:
+        """恢复备份时写入的暂存文件"""
+        return Path(g_pConfigManager.sDBFilePath).parent / "farm.restore.db"
+
+    @classmethod
+    def listSnapshots(cls) -> list[Path]:
+        """列出全部备份，按时间从新到旧排列
+
+        Returns:
+            list[Path]: 备份文件路径
+        """
+        backupDir = cls.backupDir()
+        if not backupDir.exists():
+            return []
+
+        # 文件名中的时间可直接按字符串排序
+        return sorted(
+            (
+                path
+                for path in backupDir.iterdir()
+                if path.name.startswith(cls.m_sPrefix)
+                and path.name.endswith(cls.m_sSuffix)
+            ),
+            key=lambda path: path.name,
+            reverse=True,
+        )
+
+    @classmethod
+    def start(cls):
+        """按配置启动定时备份，间隔为0时不启动"""
+        if int(g_pConfigManager.iDBBackupInterval) <= 0:
+            return
+
+        if cls.m_pBackupTask and not cls.m_pBackupTask.done():
+            return
+
+        cls.m_pBackupTask = asyncio.create_task(cls._backupLoop())
+
+    @classmethod
+    async def cleanup(cls):
+        """停止定时备份，并等待进行中的备份结束，之后才可关闭数据库连接"""
+        task = cls.m_pBackupTask
+        cls.m_pBackupTask = None
+        if task and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        # 指令触发的备份不在定时任务中 等待其结束
+        async with cls.m_pBackupLock:
+            pass
+
+    @classmethod
+    async def _backupLoop(cls):
+        interval = int(g_pConfigManager.iDBBackupInterval) * 3600
+
+        while True:
+            # 以最近一次备份的时间计算下次备份 重启插件不会提前或重复备份
+            snapshots = cls.listSnapshots()
+            last = snapshots[0].stat().st_mtime if snapshots else 0
+            await asyncio.sleep(max(0, last + interval - time.time()))
+
+            await cls.backup()
+
+    @classmethod
+    async def _copyTo(cls, target: aiosqlite.Connection):
+        """将当前数据库复制到目标连接
+
+        Args:
+            target (aiosqlite.Connection): 目标数据库连接
+        """
+        backend = CSqlManager.m_pBackend
+        source = await backend.connectReader() if backend else None
+
+        # 内存数据库只能从写连接复制 整体复制速度很快 在写锁内一次完成
+        if source is None:
+            await cls.flushGroupCommit()
+            async with CSqlManager.m_pWriteLock:
+                await cls.m_pDB.backup(target)
+            return
+
+        try:
+            # 读事务固定快照 分步期间其他连接的写入不会使备份重新开始
+            await source.execute("BEGIN")
+            async with source.execute("SELECT COUNT(*) FROM sqlite_master") as cursor:
+                await cursor.fetchone()
+
+            await source.backup(
+                target,
+                pages=max(1, int(g_pConfigManager.iDBBackupPages)),
+                sleep=cls.m_fStepSleep,
+            )
+        finally:
+            await source.close()
+
+    @classmethod
+    async def backup(cls) -> Path | None:
+        """立即备份一次数据库，并按配置保留最近的备份
+
+        Returns:
+            Path | None: 备份文件路径，失败返回None
+        """
+        async with cls.m_pBackupLock:
+            backupDir = cls.backupDir()
+            os.makedirs(backupDir, exist_ok=True)
+
+            stamp = g_pToolManager.dateTime().now().strftime("%Y%m%d-%H%M%S")
+            path = backupDir / f"{cls.m_sPrefix}{stamp}{cls.m_sSuffix}"
+            temp = backupDir / f"{cls.m_sPrefix}{stamp}.db.tmp"
+
+            start = time.perf_counter()
+            try:
+                temp.unlink(missing_ok=True)
+                async with aiosqlite.connect(temp) as target:
+                    await cls._copyTo(target)
+                    await target.execute("PRAGMA journal_mode = DELETE")
+
+                await asyncio.to_thread(cls._compress, temp, path)
+            except Exception as e:
+                logger.warning(f"真寻农场数据库备份失败: {e}")
+                return None
+            finally:
+                temp.unlink(missing_ok=True)
+
+            cls._rotate()
+
+            logger.info(
+                f"真寻农场数据库已备份: {path.name}，"
+                f"耗时 {time.perf_counter() - start:.2f}s"
+            )
+            return path
+
+    @classmethod
+    def _compress(cls, source: Path, target: Path):
+        """压缩数据库文件，写完后再改名，避免留下不完整的备份"""
+        partial = target.with_name(target.name + ".part")
+        with open(source, "rb") as src, gzip.open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(partial, target)
+
+    @classmethod
+    def _rotate(cls):
+        """删除超出保留数量的旧备份"""
+        keep = max(1, int(g_pConfigManager.iDBBackupKeep))
+        for path in cls.listSnapshots()[keep:]:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"删除旧备份失败: {path.name} {e}")
+
+    @classmethod
+    async def restoreToStaging(cls, name: str = "") -> dict:
+        """将备份解压到暂存文件并校验，不替换正在使用的数据库
+
+        Args:
+            name (str): 备份文件名，可省略后缀，为空时使用最新的备份
+
+        Returns:
+            dict: 恢复结果，包含 name, path, integrity, version, users；
+                未找到备份时为空字典
+        """
+        snapshots = cls.listSnapshots()
+        if name:
+            snapshots = [
+                path
+                for path in snapshots
+                if path.name in (name, f"{name}{cls.m_sSuffix}")
+            ]
+        if not snapshots:
+            return {}
+
+        snapshot = snapshots[0]
+        staging = cls.stagingPath()
+        partial = staging.with_name(staging.name + ".part")
+
+        def decompress():
+            with gzip.open(snapshot, "rb") as src, open(partial, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+        result = {"name": snapshot.name, "path": str(staging)}
+        try:
+            await asyncio.to_thread(decompress)
+
+            async with aiosqlite.connect(partial) as db:
+                async with db.execute("PRAGMA integrity_check") as cursor:
+                    rows = await cursor.fetchall()
+                result["integrity"] = "; ".join(str(row[0]) for row in rows)
+
+                if result["integrity"] == "ok":
+                    async with db.execute("PRAGMA user_version") as cursor:
+                        result["version"] = (await cursor.fetchone())[0]
+                    async with db.execute("SELECT COUNT(*) FROM user") as cursor:
+                        result["users"] = (await cursor.fetchone())[0]
+        except Exception as e:
+            result["integrity"] = str(e)
+
+        # 校验不通过的文件不作为暂存文件保留
+        if result["integrity"] != "ok":
+            partial.unlink(missing_ok=True)
+            logger.warning(
+                f"真寻农场备份校验失败: {snapshot.name} {result['integrity']}"
+            )
+            return result
+
+        os.replace(partial, staging)
+        logger.info(f"真寻农场备份已恢复到暂存文件: {snapshot.name} -> {staging}")
+        return result
+
+
+g_pBackupManager = CBackupManager()
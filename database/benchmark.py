@@ -0,0 +1,136 @@
+import time
+
+from astrbot.api import logger
+
+from .database import CSqlManager
+from .statement import g_pStatementRegistry
+
+
+class CQueryBenchmark(CSqlManager):
+    """单条查询开销的微基准
+
+    对同一批数据分别以原先的内联SQL加字典解码、具名语句加记录解码执行，
+    比较每条查询的平均耗时，只在调试模式下运行
+    """
+
+    # 每项测试的执行次数
+    m_iRounds = 200
+
+    # 两种方式交替执行的轮数 取每种方式的最好成绩 降低后台抖动与执行顺序的影响
+    m_iRepeat = 5
+
+    @classmethod
+    async def _measure(cls, func, rounds: int) -> float:
+        """执行指定次数并返回每次的平均耗时
+
+        Args:
+            func: 无参数的协程函数
+            rounds (int): 执行次数
+
+        Returns:
+            float: 平均耗时 单位:微秒
+        """
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await func()
+        return (time.perf_counter() - start) / rounds * 1_000_000
+
+    @classmethod
+    async def _compare(cls, inline, named, rounds: int) -> tuple[float, float]:
+        """交替测量两种方式的单条查询耗时
+
+        Args:
+            inline: 原方式的无参数协程函数
+            named: 具名语句方式的无参数协程函数
+            rounds (int): 每轮的执行次数
+
+        Returns:
+            tuple[float, float]: (原方式耗时, 具名语句耗时) 单位:微秒
+        """
+        # 预热一次 使两种方式的语句都已进入连接的语句缓存
+        await inline()
+        await named()
+
+        before = after = float("inf")
+        for _ in range(cls.m_iRepeat):
+            before = min(before, await cls._measure(inline, rounds))
+            after = min(after, await cls._measure(named, rounds))
+        return before, after
+
+    @classmethod
+    async def run(cls, rounds: int = 0) -> dict[str, tuple[float, float]]:
+        """以库中第一块地对应的用户执行基准测试
+
+        写入测试把地块等级写回原值，不修改数据
+
+        Args:
+            rounds (int): 每项测试的执行次数，为0时使用 m_iRounds
+
+        Returns:
+            dict[str, tuple[float, float]]: 测试名称 -> (原方式耗时, 具名语句耗时) 单位:微秒，
+                库中没有地块时返回空字典
+        """
+        rounds = rounds or cls.m_iRounds
+
+        row = await cls.queryOne(
+            g_pStatementRegistry.require(
+                "benchmark.sample",
+                lambda: (
+                    "SELECT s.uid, s.soilIndex, s.soilLevel FROM userSoil s "
+                    "JOIN user u ON u.uid = s.uid LIMIT 1"
+                ),
+            )
+        )
+        if not row:
+            return {}
+
+        uid, soilIndex, soilLevel = row
+        field = "soilLevel"
+
+        async def inlineUser():
+            async with cls._readDB().execute(
+                "SELECT * FROM user WHERE uid = ?", (uid,)
+            ) as cursor:
+                return dict(await cursor.fetchone())
+
+        async def namedUser():
+            return await cls.queryOne("user.get", (uid,))
+
+        async def inlineSoil():
+            async with cls._readDB().execute(
+                "SELECT * FROM userSoil WHERE uid = ? AND soilIndex = ?",
+                (uid, soilIndex),
+            ) as cursor:
+                return dict(await cursor.fetchone())
+
+        async def namedSoil():
+            return await cls.queryOne("userSoil.get", (uid, soilIndex))
+
+        async def inlineUpdate():
+            async with cls._transaction():
+                await cls.m_pDB.execute(
+                    f'UPDATE userSoil SET "{field}" = ? WHERE uid = ? AND soilIndex = ?',
+                    (soilLevel, uid, soilIndex),
+                )
+
+        async def namedUpdate():
+            async with cls._transaction():
+                await cls.executeStatement(
+                    f"userSoil.set.{field}", (soilLevel, uid, soilIndex)
+                )
+
+        result = {
+            "user.get": await cls._compare(inlineUser, namedUser, rounds),
+            "userSoil.get": await cls._compare(inlineSoil, namedSoil, rounds),
+            "userSoil.set": await cls._compare(inlineUpdate, namedUpdate, rounds),
+        }
+
+        for name, (before, after) in result.items():
+            logger.info(
+                f"真寻农场查询基准 {name}: 内联 {before:.1f}us 具名语句 {after:.1f}us"
+            )
+
+        return result
+
+
+g_pQueryBenchmark = CQueryBenchmark()
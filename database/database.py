@@ -1,16 +1,62 @@
+import asyncio
 import os
 import re
+import time
+from collections.abc import Callable
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import ClassVar
 
 import aiosqlite
 
 from astrbot.api import logger
 
 from ..cfg import g_pConfigManager
+from .backend import CStorageBackend
+from .statement import g_pStatementRegistry
 
 
 class CSqlManager:
+    # 存储后端 提供写连接与只读连接
+    m_pBackend: CStorageBackend | None = None
+
+    # 定时检查点任务 只在后端需要写回文件时运行
+    m_pCheckpointTask: asyncio.Task | None = None
+
+    # 只读连接池 读写分离后普通查询不再排在写事务之后
+    m_pReaders: ClassVar[list[aiosqlite.Connection]] = []
+    m_iReaderIndex = 0
+
+    # 写连接同一时间只允许一个事务
+    m_pWriteLock = asyncio.Lock()
+
+    # 当前协程持有的写事务嵌套层数 0表示不在事务中
+    m_pTransactionDepth: ContextVar[int] = ContextVar("farmTransactionDepth", default=0)
+
+    # 当前事务注册的 (提交回调, 回滚回调) 列表
+    m_pTransactionHooks: ContextVar[list | None] = ContextVar(
+        "farmTransactionHooks", default=None
+    )
+
+    # 重建表时每批复制的行数
+    m_iMigrationChunkSize = 5000
+
+    # 合并提交 当前未提交批次的完成信号、已合并的写入数量与定时提交任务
+    m_pGroupBatch: asyncio.Future | None = None
+    m_iGroupUnits = 0
+    m_pGroupFlushTask: asyncio.Task | None = None
+    m_pGroupHooks: ClassVar[list] = []
+
+    # 提交指标
+    m_pCommitMetrics: ClassVar[dict[str, int | float]] = {
+        "commits": 0,  # 提交次数
+        "units": 0,  # 提交的写入数量
+        "batchMax": 0,  # 单次提交最多合并的写入数量
+        "commitTotal": 0.0,  # 累计提交耗时 单位秒
+        "failed": 0,  # 提交失败次数
+    }
+
     def __init__(self):
         dbPath = Path(g_pConfigManager.sDBPath)
         if dbPath and not dbPath.exists():
@@ -18,30 +64,515 @@ class CSqlManager:
 
     @classmethod
     async def cleanup(cls):
+        await cls.flushGroupCommit()
+
+        task = CSqlManager.m_pCheckpointTask
+        CSqlManager.m_pCheckpointTask = None
+        if task is not None:
+            task.cancel()
+
+        if hasattr(cls, "m_pDB") and cls.m_pDB:
+            await cls.checkpoint()
+
+        metrics = cls.getCommitMetrics()
+        if metrics["commits"]:
+            logger.info(
+                f"真寻农场数据库提交 {metrics['commits']} 次，"
+                f"平均每次合并 {metrics['batchAvg']:.1f} 个写入，"
+                f"平均耗时 {metrics['commitAvg'] * 1000:.2f}ms"
+            )
+
+        for reader in CSqlManager.m_pReaders:
+            await reader.close()
+        CSqlManager.m_pReaders = []
+
         if hasattr(cls, "m_pDB") and cls.m_pDB:
             await cls.m_pDB.close()
 
     @classmethod
-    async def init(cls) -> bool:
+    async def init(cls, backend: CStorageBackend | None = None) -> bool:
+        """打开数据库连接
+
+        Args:
+            backend (CStorageBackend | None): 存储后端，为空时按配置创建
+
+        Returns:
+            bool: 是否初始化成功
+        """
         try:
-            cls.m_pDB = await aiosqlite.connect(g_pConfigManager.sDBFilePath)
+            if backend is None:
+                backend = CStorageBackend.create(
+                    g_pConfigManager.sDBBackend, g_pConfigManager.sDBFilePath
+                )
+            CSqlManager.m_pBackend = backend
+
+            cls.m_pDB = await backend.connect()
             cls.m_pDB.row_factory = aiosqlite.Row
+
+            profile = {"backend": backend.m_sName}
+            profile.update(await cls.applyPragma(cls.m_pDB))
+
+            readers = []
+            readerCount = int(g_pConfigManager.iDBReaderCount)
+            for _ in range(max(0, readerCount)):
+                reader = await backend.connectReader()
+                if reader is None:
+                    break
+
+                reader.row_factory = aiosqlite.Row
+                await cls.applyPragma(reader, readOnly=True)
+                readers.append(reader)
+            CSqlManager.m_pReaders = readers
+
+            interval = int(g_pConfigManager.iDBCheckpointInterval)
+            if interval > 0 and backend.supportsCheckpoint:
+                CSqlManager.m_pCheckpointTask = asyncio.create_task(
+                    cls._checkpointLoop(interval)
+                )
+
+            profile["readers"] = len(readers)
+            logger.info(
+                "真寻农场数据库配置: "
+                + ", ".join(f"{key}={value}" for key, value in profile.items())
+            )
             return True
         except Exception as e:
             logger.warning(f"初始化总数据库失败{e}")
             return False
 
+    @classmethod
+    async def checkpoint(cls) -> bool:
+        """将当前数据通过存储后端写回文件，不可在事务中调用
+
+        先提交合并中的写入，再在写锁内执行，保证写回的是已提交的完整数据
+
+        Returns:
+            bool: 是否写入了文件
+        """
+        backend = CSqlManager.m_pBackend
+        if backend is None:
+            return False
+
+        await cls.flushGroupCommit()
+
+        async with CSqlManager.m_pWriteLock:
+            try:
+                start = time.perf_counter()
+                if not await backend.checkpoint(cls.m_pDB):
+                    return False
+
+                logger.debug(
+                    f"真寻农场数据库检查点完成，耗时 "
+                    f"{(time.perf_counter() - start) * 1000:.2f}ms"
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"真寻农场数据库检查点失败: {e}")
+                return False
+
+    @classmethod
+    async def _checkpointLoop(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            await cls.checkpoint()
+
+    @classmethod
+    def _readDB(cls) -> aiosqlite.Connection:
+        """获取用于查询的连接
+
+        持有写事务时返回写连接，保证能读到事务内未提交的数据；
+        否则轮询返回只读连接，未配置只读连接时退回写连接
+
+        Returns:
+            aiosqlite.Connection: 数据库连接
+        """
+        readers = CSqlManager.m_pReaders
+        if not readers or CSqlManager.m_pTransactionDepth.get() > 0:
+            return cls.m_pDB
+
+        CSqlManager.m_iReaderIndex = (CSqlManager.m_iReaderIndex + 1) % len(readers)
+        return readers[CSqlManager.m_iReaderIndex]
+
+    @classmethod
+    async def queryOne(
+        cls, name: str, params: tuple = (), db: aiosqlite.Connection | None = None
+    ):
+        """执行具名语句并返回第一行
+
+        Args:
+            name (str): 已登记的语句名称
+            params (tuple): 语句参数
+            db (aiosqlite.Connection | None): 执行的连接，为空时使用查询连接
+
+        Returns:
+            语句登记了记录类型时返回记录，否则返回 aiosqlite.Row，无结果返回None
+        """
+        sql, record = g_pStatementRegistry.get(name)
+        async with (db or cls._readDB()).execute(sql, params) as cursor:
+            if record:
+                cursor.row_factory = record.fromRow
+            return await cursor.fetchone()
+
+    @classmethod
+    async def queryAll(
+        cls, name: str, params: tuple = (), db: aiosqlite.Connection | None = None
+    ) -> list:
+        """执行具名语句并返回全部行
+
+        Args:
+            name (str): 已登记的语句名称
+            params (tuple): 语句参数
+            db (aiosqlite.Connection | None): 执行的连接，为空时使用查询连接
+
+        Returns:
+            list: 语句登记了记录类型时为记录列表，否则为 aiosqlite.Row 列表
+        """
+        sql, record = g_pStatementRegistry.get(name)
+        async with (db or cls._readDB()).execute(sql, params) as cursor:
+            if record:
+                cursor.row_factory = record.fromRow
+            return list(await cursor.fetchall())
+
+    @classmethod
+    async def executeStatement(cls, name: str, params: tuple = ()) -> int:
+        """在写连接上执行具名写入语句
+
+        Args:
+            name (str): 已登记的语句名称
+            params (tuple): 语句参数
+
+        Returns:
+            int: 受影响的行数
+        """
+        sql, _ = g_pStatementRegistry.get(name)
+        # 写入语句无结果集 不单独关闭游标 省去一次与数据库线程的往返
+        cursor = await cls.m_pDB.execute(sql, params)
+        return cursor.rowcount
+
+    @classmethod
+    async def executeStatementMany(cls, name: str, paramsList: list) -> int:
+        """在写连接上以多组参数执行具名写入语句
+
+        Args:
+            name (str): 已登记的语句名称
+            paramsList (list): 参数列表
+
+        Returns:
+            int: 各组参数受影响的行数之和
+        """
+        sql, _ = g_pStatementRegistry.get(name)
+        cursor = await cls.m_pDB.executemany(sql, paramsList)
+        return cursor.rowcount
+
+    @classmethod
+    async def applyPragma(
+        cls, db: aiosqlite.Connection, readOnly: bool = False
+    ) -> dict:
+        """按配置为连接设置存储参数
+
+        Args:
+            db (aiosqlite.Connection): 数据库连接
+            readOnly (bool): 是否为只读连接，只读连接不修改日志与同步模式
+
+        Returns:
+            dict: 实际生效的参数
+        """
+        journalMode = g_pConfigManager.sDBJournalMode.upper()
+        if journalMode not in ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"):
+            logger.warning(f"未知的数据库日志模式: {journalMode}，已改用WAL")
+            journalMode = "WAL"
+
+        synchronous = g_pConfigManager.sDBSynchronous.upper()
+        if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            logger.warning(f"未知的数据库同步模式: {synchronous}，已改用NORMAL")
+            synchronous = "NORMAL"
+
+        tempStore = g_pConfigManager.sDBTempStore.upper()
+        if tempStore not in ("DEFAULT", "FILE", "MEMORY"):
+            logger.warning(f"未知的临时表存储位置: {tempStore}，已改用MEMORY")
+            tempStore = "MEMORY"
+
+        busyTimeout = int(g_pConfigManager.iDBBusyTimeout)
+        cacheSize = int(g_pConfigManager.iDBCacheSize)
+        mmapSize = int(g_pConfigManager.iDBMmapSize)
+
+        # PRAGMA 无法使用参数绑定，故先校验取值再拼接
+        await db.execute(f"PRAGMA busy_timeout = {busyTimeout}")
+        if not readOnly:
+            await db.execute(f"PRAGMA journal_mode = {journalMode}")
+            await db.execute(f"PRAGMA synchronous = {synchronous}")
+        await db.execute(f"PRAGMA cache_size = {cacheSize}")
+        await db.execute(f"PRAGMA mmap_size = {mmapSize}")
+        await db.execute(f"PRAGMA temp_store = {tempStore}")
+
+        profile = {}
+        for name in (
+            "journal_mode",
+            "synchronous",
+            "cache_size",
+            "mmap_size",
+            "temp_store",
+            "busy_timeout",
+        ):
+            async with db.execute(f"PRAGMA {name}") as cursor:
+                row = await cursor.fetchone()
+                profile[name] = row[0] if row else None
+
+        return profile
+
     @classmethod
     @asynccontextmanager
     async def _transaction(cls):
-        await cls.m_pDB.execute("BEGIN;")
+        depth = CSqlManager.m_pTransactionDepth.get()
+
+        # 已处于事务中则加入外层事务，用保存点保证内层失败时只回滚自身
+        if depth > 0:
+            savepoint = f"farmSavepoint{depth}"
+            hooks = CSqlManager.m_pTransactionHooks.get()
+            mark = len(hooks) if hooks is not None else 0
+            token = CSqlManager.m_pTransactionDepth.set(depth + 1)
+            try:
+                await cls.m_pDB.execute(f"SAVEPOINT {savepoint};")
+                try:
+                    yield
+                except:
+                    await cls.m_pDB.execute(f"ROLLBACK TO {savepoint};")
+                    await cls.m_pDB.execute(f"RELEASE {savepoint};")
+                    if hooks is not None:
+                        cls._runTransactionHooks(hooks[mark:], False)
+                        del hooks[mark:]
+                    raise
+                else:
+                    await cls.m_pDB.execute(f"RELEASE {savepoint};")
+            finally:
+                CSqlManager.m_pTransactionDepth.reset(token)
+            return
+
+        if g_pConfigManager.bDBGroupCommit:
+            async with CSqlManager.m_pWriteLock:
+                # 定时提交任务需在进入事务前创建，避免继承事务层数
+                batch = cls._openGroupBatch()
+
+                hooks = []
+                hookToken = CSqlManager.m_pTransactionHooks.set(hooks)
+                token = CSqlManager.m_pTransactionDepth.set(1)
+                try:
+                    if not cls.m_pDB.in_transaction:
+                        await cls.m_pDB.execute("BEGIN;")
+
+                    # 每个写入用保存点隔离，失败时不影响同批次的其他写入
+                    await cls.m_pDB.execute("SAVEPOINT farmGroupUnit;")
+                    try:
+                        yield
+                    except:
+                        await cls.m_pDB.execute("ROLLBACK TO farmGroupUnit;")
+                        await cls.m_pDB.execute("RELEASE farmGroupUnit;")
+                        cls._runTransactionHooks(hooks, False)
+                        raise
+                    else:
+                        await cls.m_pDB.execute("RELEASE farmGroupUnit;")
+
+                    # 回调随批次一同提交或回滚
+                    CSqlManager.m_pGroupHooks.extend(hooks)
+                    CSqlManager.m_iGroupUnits += 1
+                    if CSqlManager.m_iGroupUnits >= max(
+                        1, int(g_pConfigManager.iDBGroupCommitSize)
+                    ):
+                        await cls._commitGroupBatch()
+                finally:
+                    CSqlManager.m_pTransactionDepth.reset(token)
+                    CSqlManager.m_pTransactionHooks.reset(hookToken)
+
+            # 释放写锁后等待本批次提交落盘，其他写入可在此期间继续合并
+            await asyncio.shield(batch)
+            return
+
+        async with CSqlManager.m_pWriteLock:
+            # 合并提交刚被关闭时先提交遗留批次
+            if CSqlManager.m_pGroupBatch is not None:
+                await cls._commitGroupBatch()
+
+            hooks = []
+            hookToken = CSqlManager.m_pTransactionHooks.set(hooks)
+            token = CSqlManager.m_pTransactionDepth.set(1)
+            try:
+                await cls.m_pDB.execute("BEGIN;")
+                try:
+                    yield
+                except:
+                    await cls.m_pDB.execute("ROLLBACK;")
+                    cls._runTransactionHooks(hooks, False)
+                    raise
+                else:
+                    start = time.perf_counter()
+                    try:
+                        await cls.m_pDB.execute("COMMIT;")
+                    except:
+                        cls._runTransactionHooks(hooks, False)
+                        raise
+                    cls._recordCommit(1, time.perf_counter() - start)
+                    cls._runTransactionHooks(hooks, True)
+            finally:
+                CSqlManager.m_pTransactionDepth.reset(token)
+                CSqlManager.m_pTransactionHooks.reset(hookToken)
+
+    @classmethod
+    def addTransactionHook(
+        cls,
+        onCommit: Callable[[], None] | None = None,
+        onRollback: Callable[[], None] | None = None,
+    ):
+        """注册当前事务结束时的回调
+
+        事务提交后调用 onCommit，事务或所在保存点回滚后调用 onRollback；
+        不在事务中时立即调用 onCommit
+
+        Args:
+            onCommit (Callable[[], None] | None): 提交回调
+            onRollback (Callable[[], None] | None): 回滚回调
+        """
+        hooks = CSqlManager.m_pTransactionHooks.get()
+        if hooks is None or CSqlManager.m_pTransactionDepth.get() == 0:
+            if onCommit:
+                onCommit()
+            return
+
+        hooks.append((onCommit, onRollback))
+
+    @classmethod
+    def _runTransactionHooks(cls, hooks: list, committed: bool):
+        for onCommit, onRollback in hooks:
+            callback = onCommit if committed else onRollback
+            if callback is None:
+                continue
+
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"真寻农场事务回调执行失败: {e}")
+
+    @classmethod
+    def _openGroupBatch(cls) -> asyncio.Future:
+        """获取当前合并提交批次，不存在时新建批次并安排定时提交
+
+        调用方需持有写锁
+
+        Returns:
+            asyncio.Future: 批次提交完成信号，结果为该批次合并的写入数量
+        """
+        batch = CSqlManager.m_pGroupBatch
+        if batch is not None:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        batch = CSqlManager.m_pGroupBatch = loop.create_future()
+        CSqlManager.m_iGroupUnits = 0
+        CSqlManager.m_pGroupHooks = []
+        CSqlManager.m_pGroupFlushTask = loop.create_task(cls._flushGroupLater(batch))
+
+        return batch
+
+    @classmethod
+    async def _flushGroupLater(cls, batch: asyncio.Future):
+        await asyncio.sleep(max(0, int(g_pConfigManager.iDBGroupCommitDelay)) / 1000)
+
+        async with CSqlManager.m_pWriteLock:
+            if CSqlManager.m_pGroupBatch is batch:
+                await cls._commitGroupBatch()
+
+    @classmethod
+    async def _commitGroupBatch(cls):
+        """提交当前合并批次并通知所有等待的写入
+
+        调用方需持有写锁
+        """
+        batch = CSqlManager.m_pGroupBatch
+        if batch is None:
+            return
+
+        units = CSqlManager.m_iGroupUnits
+        hooks = CSqlManager.m_pGroupHooks
+        CSqlManager.m_pGroupBatch = None
+        CSqlManager.m_iGroupUnits = 0
+        CSqlManager.m_pGroupHooks = []
+
+        task = CSqlManager.m_pGroupFlushTask
+        CSqlManager.m_pGroupFlushTask = None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+        # 批次内写入均已失败回滚 无需提交
+        if units == 0:
+            if cls.m_pDB.in_transaction:
+                await cls.m_pDB.execute("ROLLBACK;")
+            batch.set_result(0)
+            return
+
+        start = time.perf_counter()
         try:
-            yield
-        except:
-            await cls.m_pDB.execute("ROLLBACK;")
-            raise
-        else:
             await cls.m_pDB.execute("COMMIT;")
+        except Exception as e:
+            CSqlManager.m_pCommitMetrics["failed"] += 1
+            logger.warning(f"真寻农场合并提交失败，{units} 个写入已回滚: {e}")
+
+            try:
+                await cls.m_pDB.execute("ROLLBACK;")
+            except Exception as e:
+                logger.warning(f"真寻农场合并提交回滚失败: {e}")
+
+            cls._runTransactionHooks(hooks, False)
+            batch.set_exception(e)
+            # 标记异常已读取 无人等待时不再输出警告
+            batch.exception()
+            return
+
+        cls._recordCommit(units, time.perf_counter() - start)
+        cls._runTransactionHooks(hooks, True)
+        batch.set_result(units)
+
+    @classmethod
+    async def flushGroupCommit(cls):
+        """立即提交合并中的写入，不可在事务中调用"""
+        if CSqlManager.m_pGroupBatch is None:
+            return
+
+        async with CSqlManager.m_pWriteLock:
+            await cls._commitGroupBatch()
+
+    @classmethod
+    def _recordCommit(cls, units: int, elapsed: float):
+        metrics = CSqlManager.m_pCommitMetrics
+        metrics["commits"] += 1
+        metrics["units"] += units
+        metrics["batchMax"] = max(metrics["batchMax"], units)
+        metrics["commitTotal"] += elapsed
+
+    @classmethod
+    def getCommitMetrics(cls) -> dict:
+        """获取提交指标
+
+        Returns:
+            dict: 提交次数、写入数量、平均/最大批大小、平均提交耗时及当前模式
+        """
+        metrics = dict(CSqlManager.m_pCommitMetrics)
+        commits = metrics["commits"]
+        metrics["batchAvg"] = metrics["units"] / commits if commits else 0.0
+        metrics["commitAvg"] = metrics["commitTotal"] / commits if commits else 0.0
+        metrics["groupCommit"] = bool(g_pConfigManager.bDBGroupCommit)
+
+        return metrics
+
+    @classmethod
+    def unitOfWork(cls):
+        """开启一次指令级事务
+
+        整条指令内的读写都在同一个事务中完成，只提交一次；
+        期间调用的其他数据库接口会自动加入该事务而不是各自提交
+
+        Returns:
+            AsyncContextManager: 事务上下文
+        """
+        return cls._transaction()
 
     @classmethod
     async def getTableInfo(cls, tableName: str) -> list:
@@ -70,14 +601,20 @@ class CSqlManager:
 
         info = await cls.getTableInfo(tableName)
         existing = {col["name"]: col["type"].upper() for col in info}
-        desired = {k: v.upper() for k, v in columns.items() if k != "PRIMARY KEY"}
+        desired = {
+            k: v.upper()
+            for k, v in columns.items()
+            if k not in ("PRIMARY KEY", "WITHOUT ROWID")
+        }
         primaryKey = columns.get("PRIMARY KEY", "")
+        withoutRowid = bool(columns.get("WITHOUT ROWID"))
 
         if not existing:
             colsDef = ", ".join(f'"{k}" {v}' for k, v in desired.items())
             if primaryKey:
                 colsDef += f", PRIMARY KEY {primaryKey}"
-            await cls.m_pDB.execute(f'CREATE TABLE "{tableName}" ({colsDef});')
+            suffix = " WITHOUT ROWID" if withoutRowid else ""
+            await cls.m_pDB.execute(f'CREATE TABLE "{tableName}" ({colsDef}){suffix};')
             return True
 
         toAdd = [k for k in desired if k not in existing]
@@ -86,6 +623,10 @@ class CSqlManager:
             k for k in desired if k in existing and existing[k] != desired[k]
         ]
 
+        # 结构一致则无需任何变更
+        if not toAdd and not toRemove and not typeMismatch:
+            return False
+
         if toAdd and not toRemove and not typeMismatch:
             for col in toAdd:
                 await cls.m_pDB.execute(
@@ -93,29 +634,216 @@ class CSqlManager:
                 )
             return True
 
+        await cls._rebuildTable(tableName, desired, primaryKey, existing, withoutRowid)
+        return True
+
+    @classmethod
+    async def ensureColumns(cls, tableName: str, columns: dict) -> bool:
+        """只为已存在的表追加缺失字段，不比较已有字段的类型
+
+        Args:
+            tableName (str): 表名
+            columns (dict): 字段名-字段定义的字典
+
+        Returns:
+            bool: 是否追加了字段
+        """
+        info = await cls.getTableInfo(tableName)
+        existing = {col["name"] for col in info}
+
+        toAdd = [k for k in columns if k not in existing]
+        for col in toAdd:
+            await cls.m_pDB.execute(
+                f'ALTER TABLE "{tableName}" ADD COLUMN "{col}" {columns[col]}'
+            )
+
+        return bool(toAdd)
+
+    @classmethod
+    async def ensureTableIndexes(cls, tableName: str, indexes: dict) -> None:
+        """按声明创建表索引，已存在的索引跳过
+
+        Args:
+            tableName (str): 表名
+            indexes (dict): 索引名-字段列表的字典 如 {"idxA": "(uid, soilIndex)"}
+        """
+        pattern = r"^[A-Za-z_][A-Za-z0-9_]*$"
+        if not re.match(pattern, tableName):
+            raise ValueError(f"Illegal table name: {tableName}")
+
+        for name, columns in indexes.items():
+            if not re.match(pattern, name):
+                raise ValueError(f"Illegal index name: {name}")
+
+            await cls.m_pDB.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}" ON "{tableName}" {columns};'
+            )
+
+    @classmethod
+    async def _rebuildTable(
+        cls,
+        tableName: str,
+        desired: dict,
+        primaryKey: str,
+        existing: dict,
+        withoutRowid: bool = False,
+    ):
+        """按新结构重建表，数据分批复制，中断后再次启动会从断点继续
+
+        Args:
+            tableName (str): 表名
+            desired (dict): 新表字段定义
+            primaryKey (str): 主键定义
+            existing (dict): 旧表字段定义
+            withoutRowid (bool): 新表是否为 WITHOUT ROWID 表
+        """
+        tmpTable = f"{tableName}_new"
+        colsDef = ", ".join(f'"{k}" {v}' for k, v in desired.items())
+        if primaryKey:
+            colsDef += f", PRIMARY KEY {primaryKey}"
+        suffix = " WITHOUT ROWID" if withoutRowid else ""
+
+        # 新表与复制进度同时建立，重复执行时沿用上次的进度
         async with cls._transaction():
-            tmpTable = f"{tableName}_new"
-            colsDef = ", ".join(f'"{k}" {v}' for k, v in desired.items())
-            if primaryKey:
-                colsDef += f", PRIMARY KEY {primaryKey}"
-            await cls.m_pDB.execute(f'CREATE TABLE "{tmpTable}" ({colsDef});')
+            await cls.m_pDB.execute(
+                f'CREATE TABLE IF NOT EXISTS "{tmpTable}" ({colsDef}){suffix};'
+            )
+            await cls.m_pDB.execute(
+                "CREATE TABLE IF NOT EXISTS farmMigrationState "
+                "(tableName TEXT PRIMARY KEY, lastRowid INTEGER NOT NULL DEFAULT 0)"
+            )
+            await cls.m_pDB.execute(
+                "INSERT OR IGNORE INTO farmMigrationState (tableName) VALUES (?)",
+                (tableName,),
+            )
 
-            commonCols = [k for k in desired if k in existing]
-            if commonCols:
-                colsStr = ", ".join(f'"{c}"' for c in commonCols)
+        async with cls.m_pDB.execute(
+            "SELECT lastRowid FROM farmMigrationState WHERE tableName = ?",
+            (tableName,),
+        ) as cursor:
+            row = await cursor.fetchone()
+        lastRowid = row[0] if row else 0
 
-                sql = (
-                    f'INSERT INTO "{tmpTable}" ({colsStr}) '
-                    f"SELECT {colsStr} "
-                    f'FROM "{tableName}";'
-                )
+        commonCols = [k for k in desired if k in existing]
+        colsStr = ", ".join(f'"{c}"' for c in commonCols)
+
+        # WITHOUT ROWID 表没有 rowid 无法分批 在删除旧表的事务中一次复制
+        hasRowid = await cls._hasRowid(tableName)
+        if commonCols and hasRowid:
+            copied = 0
+
+            while True:
+                # 每批数据与进度在同一事务中提交
+                async with cls._transaction():
+                    async with cls.m_pDB.execute(
+                        f'SELECT MAX(rowid), COUNT(*) FROM (SELECT rowid FROM "{tableName}" '
+                        f"WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                        (lastRowid, cls.m_iMigrationChunkSize),
+                    ) as cursor:
+                        upper, count = await cursor.fetchone()
+
+                    if not count:
+                        break
 
-                await cls.m_pDB.execute(sql)
+                    await cls.m_pDB.execute(
+                        f'INSERT INTO "{tmpTable}" ({colsStr}) '
+                        f'SELECT {colsStr} FROM "{tableName}" '
+                        f"WHERE rowid > ? AND rowid <= ? ORDER BY rowid",
+                        (lastRowid, upper),
+                    )
+                    await cls.m_pDB.execute(
+                        "UPDATE farmMigrationState SET lastRowid = ? WHERE tableName = ?",
+                        (upper, tableName),
+                    )
+
+                lastRowid = upper
+                copied += count
+                logger.info(f"重建表 {tableName}: 已复制 {copied} 行")
+
+        async with cls._transaction():
+            if commonCols and not hasRowid:
+                await cls.m_pDB.execute(
+                    f'INSERT OR IGNORE INTO "{tmpTable}" ({colsStr}) '
+                    f'SELECT {colsStr} FROM "{tableName}"'
+                )
             await cls.m_pDB.execute(f'DROP TABLE "{tableName}";')
             await cls.m_pDB.execute(
                 f'ALTER TABLE "{tmpTable}" RENAME TO "{tableName}";'
             )
-        return True
+            await cls.m_pDB.execute(
+                "DELETE FROM farmMigrationState WHERE tableName = ?", (tableName,)
+            )
+
+    @classmethod
+    async def _hasRowid(cls, tableName: str) -> bool:
+        try:
+            await cls.m_pDB.execute(f'SELECT rowid FROM "{tableName}" LIMIT 0')
+            return True
+        except aiosqlite.OperationalError:
+            return False
+
+    @classmethod
+    async def _applyCountDeltas(
+        cls, tableName: str, keyColumn: str, uid: str, deltas: dict[str | int, int]
+    ) -> bool:
+        """批量增减用户仓库中物品的数量
+
+        增加量通过一次 executemany 的 UPSERT 写入；扣除量以带余量条件的更新写入，
+        任一物品不存在或数量不足时全部不变更，数量归零的记录在同一事务中清理
+
+        Args:
+            tableName (str): 仓库表名 如 userSeed
+            keyColumn (str): 物品字段 如 plantId
+            uid (str): 用户Uid
+            deltas (dict[str | int, int]): 物品名称或ID-增减量的字典，负数为扣除
+
+        Returns:
+            bool: 是否执行成功，扣除时数量不足返回False
+        """
+        rows = [(uid, key, int(count)) for key, count in deltas.items() if count]
+        if not rows:
+            return True
+
+        additions = [row for row in rows if row[2] > 0]
+        deductions = [(count, uid, key, count) for uid, key, count in rows if count < 0]
+
+        try:
+            upsert = g_pStatementRegistry.require(
+                f"{tableName}.applyDeltas",
+                lambda: (
+                    f'INSERT INTO "{tableName}" (uid, "{keyColumn}", count) '
+                    f"VALUES (?, ?, ?) "
+                    f'ON CONFLICT(uid, "{keyColumn}") '
+                    f"DO UPDATE SET count = count + excluded.count"
+                ),
+            )
+            deduct = g_pStatementRegistry.require(
+                f"{tableName}.deduct",
+                lambda: (
+                    f'UPDATE "{tableName}" SET count = count + ? '
+                    f'WHERE uid = ? AND "{keyColumn}" = ? AND count + ? >= 0'
+                ),
+            )
+            purge = g_pStatementRegistry.require(
+                f"{tableName}.purgeEmpty",
+                lambda: f'DELETE FROM "{tableName}" WHERE uid = ? AND count <= 0',
+            )
+
+            async with cls._transaction():
+                if additions:
+                    await cls.executeStatementMany(upsert, additions)
+
+                if deductions:
+                    # 每个物品最多更新一行 更新行数不足说明有物品不存在或数量不足
+                    changed = await cls.executeStatementMany(deduct, deductions)
+                    if changed != len(deductions):
+                        raise ValueError(f"{tableName}数量不足: {uid}")
+
+                    await cls.executeStatement(purge, (uid,))
+            return True
+        except Exception as e:
+            logger.warning(f"批量更新{tableName}数量失败: {e}")
+            return False
 
     @classmethod
     async def executeDB(cls, command: str) -> bool:
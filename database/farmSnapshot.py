@@ -0,0 +1,115 @@
+from dataclasses import dataclass, field
+
+from astrbot.api import logger
+
+from ..dbService import g_pDBService
+from .database import CSqlManager
+from .plant import CPlantCatalog
+from .record import CPlantRow
+
+
+@dataclass(slots=True)
+class CSoilState:
+    """单块土地状态，含该地块的偷菜统计"""
+
+    soilIndex: int  # 地块索引 从1开始
+    plantName: str = ""  # 作物名称
+    plantTime: int = 0  # 播种时间
+    matureTime: int = 0  # 成熟时间
+    soilLevel: int = 0  # 土地等级
+    wiltStatus: int = 0  # 枯萎状态
+    fertilizerStatus: int = 0  # 施肥状态
+    bugStatus: int = 0  # 虫害状态
+    weedStatus: int = 0  # 杂草状态
+    waterStatus: int = 0  # 缺水状态
+    harvestCount: int = 0  # 收获次数
+    isSoilPlanted: int | None = None  # 是否种植作物 旧数据迁移后可能为空
+    stolenCount: int = 0  # 被偷总数量
+    stealerCount: int = 0  # 偷菜人数
+    isStolenByStealer: bool = False  # 是否已被指定的偷菜用户偷过
+
+
+@dataclass(slots=True)
+class CFarmSnapshot:
+    """用户农场快照 一次性读取用户、全部地块、偷菜统计与作物信息"""
+
+    uid: str
+    user: dict
+    catalog: CPlantCatalog  # 读取快照时的作物目录 整条指令使用同一版本
+    soils: dict[int, CSoilState] = field(default_factory=dict)
+
+    @property
+    def soilNumber(self) -> int:
+        """已解锁土地数量"""
+        return int(self.user.get("soil", 0))
+
+    def soil(self, soilIndex: int) -> CSoilState | None:
+        """获取指定地块状态，未开垦或无记录返回None"""
+        return self.soils.get(soilIndex)
+
+    def plant(self, name: str) -> CPlantRow | None:
+        """获取地块上作物的配置"""
+        return self.catalog.plant(name)
+
+    def phase(self, name: str) -> tuple[int, ...]:
+        """获取作物各阶段累计时间"""
+        return self.catalog.phase(name)
+
+
+class CFarmSnapshotDB(CSqlManager):
+    @classmethod
+    async def loadFarmSnapshot(
+        cls, uid: str, stealerUid: str = ""
+    ) -> CFarmSnapshot | None:
+        """读取用户农场快照
+
+        用户信息与地块各一条语句读取，被偷统计由地块记录自带，
+        作物配置取自内存中的作物目录，替代逐块查询土地、作物和偷菜数量
+
+        Args:
+            uid (str): 用户Uid
+            stealerUid (str): 偷菜用户Uid 不为空时标记其偷过的地块
+
+        Returns:
+            CFarmSnapshot | None: 农场快照，用户不存在返回None
+        """
+        try:
+            db = cls._readDB()
+
+            row = await cls.queryOne("user.get", (uid,), db)
+            if not row:
+                return None
+
+            snapshot = CFarmSnapshot(
+                uid=uid, user=dict(row), catalog=g_pDBService.plant.m_pCatalog
+            )
+            soilNumber = snapshot.soilNumber
+
+            rows = await g_pDBService.userSoil.getSnapshotSoils(
+                db, uid, soilNumber, stealerUid
+            )
+
+            for row in rows:
+                soil = CSoilState(
+                    soilIndex=int(row["soilIndex"]),
+                    plantName=snapshot.catalog.plantName(row["plantId"]),
+                    plantTime=int(row["plantTime"] or 0),
+                    matureTime=int(row["matureTime"] or 0),
+                    soilLevel=int(row["soilLevel"] or 0),
+                    wiltStatus=int(row["wiltStatus"] or 0),
+                    fertilizerStatus=int(row["fertilizerStatus"] or 0),
+                    bugStatus=int(row["bugStatus"] or 0),
+                    weedStatus=int(row["weedStatus"] or 0),
+                    waterStatus=int(row["waterStatus"] or 0),
+                    harvestCount=int(row["harvestCount"] or 0),
+                    isSoilPlanted=row["isSoilPlanted"],
+                    stolenCount=int(row["stolenTotal"] or 0),
+                    stealerCount=int(row["stealerCount"] or 0),
+                    isStolenByStealer=bool(row["isStolenByStealer"]),
+                )
+                snapshot.soils[soil.soilIndex] = soil
+
+            return snapshot
+        except Exception as e:
+            logger.warning(f"读取农场快照失败: {uid} {e}")
+            return None
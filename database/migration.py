@@ -0,0 +1,317 @@
+from collections.abc import Awaitable, Callable
+from typing import ClassVar
+
+from astrbot.api import logger
+
+from ..dbService import g_pDBService
+from .database import CSqlManager
+
+
+class CMigrationManager(CSqlManager):
+    # 已注册的迁移 (版本号, 名称, 迁移函数) 按版本号升序排列
+    m_pMigrations: ClassVar[list[tuple[int, str, Callable[[], Awaitable[None]]]]] = []
+
+    @classmethod
+    def register(cls, version: int, name: str):
+        """装饰器：注册一个数据库迁移
+
+        迁移函数需可重复执行，中断后下次启动会从该版本重新开始
+
+        Args:
+            version (int): 迁移完成后的数据库版本号 必须递增
+            name (str): 迁移名称
+
+        Returns:
+            Callable: 装饰器
+        """
+
+        def decorator(func):
+            if cls.m_pMigrations and version <= cls.m_pMigrations[-1][0]:
+                raise ValueError(f"数据库迁移版本号必须递增: {version} {name}")
+
+            cls.m_pMigrations.append((version, name, func))
+            return func
+
+        return decorator
+
+    @classmethod
+    def latestVersion(cls) -> int:
+        return cls.m_pMigrations[-1][0] if cls.m_pMigrations else 0
+
+    @classmethod
+    async def getUserVersion(cls) -> int:
+        async with cls.m_pDB.execute("PRAGMA user_version") as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    @classmethod
+    async def migrate(cls) -> int:
+        """将数据库升级到最新版本，已是最新版本时不做任何结构检查
+
+        Returns:
+            int: 升级后的数据库版本号
+        """
+        current = await cls.getUserVersion()
+        if current >= cls.latestVersion():
+            logger.debug(f"真寻农场数据库已是最新版本 v{current}")
+            return current
+
+        for version, name, func in cls.m_pMigrations:
+            if version <= current:
+                continue
+
+            logger.info(f"真寻农场数据库迁移 v{current} -> v{version}: {name}")
+            await func()
+
+            # PRAGMA 无法使用参数绑定 版本号来自注册表且为整数
+            async with cls._transaction():
+                await cls.m_pDB.execute(f"PRAGMA user_version = {int(version)}")
+            current = version
+
+        logger.info(f"真寻农场数据库迁移完毕，当前版本 v{current}")
+        return current
+
+    @classmethod
+    async def convertPlantNameTable(
+        cls, table, tableName: str, nameColumn: str, keepUnknown: bool = False
+    ):
+        """将以作物名称存储的旧表转换为以作物ID存储的新表
+
+        旧表先改名为 表名_byName，再由 initDB 建立新表后按 rowid 分批复制，
+        进度与每批数据在同一事务中提交，中断后再次启动会从断点继续
+
+        Args:
+            table: 表对应的数据库类，需提供 initDB 与可选的 initIndex
+            tableName (str): 表名
+            nameColumn (str): 旧表中存储作物名称的字段
+            keepUnknown (bool): 作物不存在时是否仍保留该行 作物ID记为0
+        """
+        legacyTable = f"{tableName}_byName"
+
+        columns = {col["name"] for col in await cls.getTableInfo(tableName)}
+        if nameColumn in columns:
+            async with cls._transaction():
+                await cls.m_pDB.execute(
+                    f'ALTER TABLE "{tableName}" RENAME TO "{legacyTable}"'
+                )
+
+                # 索引随旧表改名保留原名 需先删除才能为新表建立同名索引
+                async with cls.m_pDB.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' "
+                    "AND tbl_name = ? AND sql IS NOT NULL",
+                    (legacyTable,),
+                ) as cursor:
+                    indexes = [row[0] for row in await cursor.fetchall()]
+                for index in indexes:
+                    await cls.m_pDB.execute(f'DROP INDEX "{index}"')
+
+                await table.initDB()
+                if hasattr(table, "initIndex"):
+                    await table.initIndex()
+
+        if not await cls.getTableInfo(legacyTable):
+            return
+
+        catalog = g_pDBService.plant.m_pCatalog
+        if len(catalog) <= 0:
+            raise RuntimeError("作物目录为空，无法将作物名称转换为作物ID")
+
+        # 名称与ID的对照表只存在于写连接 供复制时关联
+        await cls.m_pDB.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS farmPlantMap "
+            "(name TEXT PRIMARY KEY, id INTEGER NOT NULL)"
+        )
+        async with cls._transaction():
+            await cls.m_pDB.execute("DELETE FROM temp.farmPlantMap")
+            await cls.m_pDB.executemany(
+                "INSERT INTO temp.farmPlantMap (name, id) VALUES (?, ?)",
+                [(plant["name"], int(plant["id"])) for plant in catalog.m_pOrdered],
+            )
+
+        legacyColumns = {col["name"] for col in await cls.getTableInfo(legacyTable)}
+        targetColumns = []
+        sourceExprs = []
+        for col in await cls.getTableInfo(tableName):
+            name = col["name"]
+            if name == "plantId":
+                targetColumns.append('"plantId"')
+                sourceExprs.append("IFNULL(m.id, 0)")
+            elif name in legacyColumns:
+                targetColumns.append(f'"{name}"')
+                sourceExprs.append(f't."{name}"')
+
+        join = "LEFT JOIN" if keepUnknown else "JOIN"
+        insertSql = (
+            f'INSERT OR IGNORE INTO "{tableName}" ({", ".join(targetColumns)}) '
+            f'SELECT {", ".join(sourceExprs)} FROM "{legacyTable}" t '
+            f'{join} temp.farmPlantMap m ON m.name = t."{nameColumn}" '
+            f"WHERE t.rowid > ? AND t.rowid <= ?"
+        )
+
+        async with cls._transaction():
+            await cls.m_pDB.execute(
+                "CREATE TABLE IF NOT EXISTS farmMigrationState "
+                "(tableName TEXT PRIMARY KEY, lastRowid INTEGER NOT NULL DEFAULT 0)"
+            )
+            await cls.m_pDB.execute(
+                "INSERT OR IGNORE INTO farmMigrationState (tableName) VALUES (?)",
+                (legacyTable,),
+            )
+
+        async with cls.m_pDB.execute(
+            "SELECT lastRowid FROM farmMigrationState WHERE tableName = ?",
+            (legacyTable,),
+        ) as cursor:
+            row = await cursor.fetchone()
+        lastRowid = row[0] if row else 0
+
+        copied = 0
+        while True:
+            async with cls._transaction():
+                async with cls.m_pDB.execute(
+                    f'SELECT MAX(rowid), COUNT(*) FROM (SELECT rowid FROM "{legacyTable}" '
+                    f"WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                    (lastRowid, cls.m_iMigrationChunkSize),
+                ) as cursor:
+                    upper, count = await cursor.fetchone()
+
+                if not count:
+                    break
+
+                await cls.m_pDB.execute(insertSql, (lastRowid, upper))
+                await cls.m_pDB.execute(
+                    "UPDATE farmMigrationState SET lastRowid = ? WHERE tableName = ?",
+                    (upper, legacyTable),
+                )
+
+            lastRowid = upper
+            copied += count
+            logger.info(f"转换表 {tableName}: 已复制 {copied} 行")
+
+        async with cls.m_pDB.execute(
+            f'SELECT COUNT(*) FROM "{legacyTable}" t '
+            f'LEFT JOIN temp.farmPlantMap m ON m.name = t."{nameColumn}" '
+            f"WHERE m.id IS NULL AND IFNULL(t.\"{nameColumn}\", '') != ''"
+        ) as cursor:
+            unknown = (await cursor.fetchone())[0]
+
+        async with cls._transaction():
+            # 存在作物目录中没有的作物时保留旧表 以免数据丢失
+            if unknown:
+                logger.warning(
+                    f"表 {tableName} 中有 {unknown} 行作物不在作物目录中，"
+                    f"原始数据保留在 {legacyTable}"
+                )
+            else:
+                await cls.m_pDB.execute(f'DROP TABLE "{legacyTable}"')
+
+            await cls.m_pDB.execute(
+                "DELETE FROM farmMigrationState WHERE tableName = ?", (legacyTable,)
+            )
+
+        await cls.m_pDB.execute("DROP TABLE IF EXISTS temp.farmPlantMap")
+
+
+@CMigrationManager.register(1, "建立基础表结构")
+async def _createBaseTables():
+    from .user import CUserDB
+    from .userItem import CUserItemDB
+    from .userPlant import CUserPlantDB
+    from .userSeed import CUserSeedDB
+    from .userSign import CUserSignDB
+    from .userSoil import CUserSoilDB
+    from .userSteal import CUserStealDB
+
+    for table in (
+        CUserDB,
+        CUserSoilDB,
+        CUserPlantDB,
+        CUserSeedDB,
+        CUserItemDB,
+        CUserStealDB,
+        CUserSignDB,
+    ):
+        await table.initDB()
+
+
+@CMigrationManager.register(2, "迁移旧版土地数据")
+async def _migrateOldFarmData():
+    from .userSoil import CUserSoilDB
+
+    await CUserSoilDB.migrateOldFarmData()
+
+
+@CMigrationManager.register(3, "建立热点查询索引")
+async def _createHotIndexes():
+    from .userSteal import CUserStealDB
+
+    await CUserStealDB.initIndex()
+
+
+@CMigrationManager.register(4, "地块记录被偷数量与偷菜人数")
+async def _addSoilStolenColumns():
+    await CMigrationManager.ensureColumns(
+        "userSoil",
+        {
+            "stolenTotal": "INTEGER DEFAULT 0",
+            "stealerCount": "INTEGER DEFAULT 0",
+        },
+    )
+
+    # 由已有偷菜记录回填 主键含偷菜用户 故行数即偷菜人数
+    async with CMigrationManager._transaction():
+        await CMigrationManager.m_pDB.execute(
+            """
+            UPDATE userSoil
+            SET stolenTotal = t.stolenTotal, stealerCount = t.stealerCount
+            FROM (
+                SELECT uid, soilIndex,
+                       SUM(stealCount) AS stolenTotal,
+                       COUNT(*) AS stealerCount
+                FROM userSteal
+                GROUP BY uid, soilIndex
+            ) t
+            WHERE userSoil.uid = t.uid AND userSoil.soilIndex = t.soilIndex
+            """
+        )
+
+
+@CMigrationManager.register(5, "作物名称改为作物ID")
+async def _convertPlantIds():
+    from .userPlant import CUserPlantDB
+    from .userSeed import CUserSeedDB
+    from .userSoil import CUserSoilDB
+
+    await CMigrationManager.convertPlantNameTable(CUserSeedDB, "userSeed", "seed")
+    await CMigrationManager.convertPlantNameTable(CUserPlantDB, "userPlant", "plant")
+    await CMigrationManager.convertPlantNameTable(
+        CUserSoilDB, "userSoil", "plantName", keepUnknown=True
+    )
+
+
+@CMigrationManager.register(6, "建立打包地块表")
+async def _createPackedSoilTable():
+    from .userSoilPacked import CUserSoilPackedDB
+
+    await CUserSoilPackedDB.initDB()
+
+
+@CMigrationManager.register(7, "签到记录月度归档与增量整理")
+async def _createSignMonthTable():
+    from .userSign import CUserSignDB
+
+    await CUserSignDB.initDB()
+
+    # 切换增量整理模式需重写整个数据库文件 不在启动时执行
+    # 由整理任务在空闲时段检查并完成切换
+
+
+@CMigrationManager.register(8, "删除未使用的成熟时间索引")
+async def _dropMatureTimeIndex():
+    # 没有按成熟时间跨用户扫描地块的查询 该索引只增加写入开销
+    await CMigrationManager.m_pDB.execute(
+        'DROP INDEX IF EXISTS "idxUserSoilMatureTime"'
+    )
+
+
+g_pMigrationManager = CMigrationManager()
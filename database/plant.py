@@ -1,5 +1,10 @@
+import asyncio
 import os
+from bisect import bisect_right
+from collections.abc import Mapping
 from contextlib import asynccontextmanager
+from pathlib import Path
+from types import MappingProxyType
 
 import aiosqlite
 
@@ -7,9 +12,149 @@ from astrbot.api import logger
 
 from ..cfg import g_pConfigManager
 from ..request import g_pRequestManager
+from .record import CPlantRow
+
+
+class CPlantCatalog:
+    """作物目录
+
+    plant.db 只在下载新版本时变化，加载后常驻内存且不可修改，
+    更新时构建新目录整体替换，正在使用旧目录的调用不受影响
+    """
+
+    __slots__ = ("m_iBuyCount", "m_pById", "m_pByName", "m_pOrdered", "m_pPhases")
+
+    def __init__(self, rows: list[CPlantRow]):
+        ordered = tuple(rows)
+
+        self.m_pOrdered: tuple[CPlantRow, ...] = ordered
+        self.m_pByName: Mapping[str, CPlantRow] = MappingProxyType(
+            {plant.name: plant for plant in ordered}
+        )
+        self.m_pById: Mapping[int, CPlantRow] = MappingProxyType(
+            {int(plant.id): plant for plant in ordered}
+        )
+        # 阶段字符串本身即为各阶段的累计时间，预先解析并去重
+        self.m_pPhases: Mapping[str, tuple[int, ...]] = MappingProxyType(
+            {plant.name: self.parsePhase(plant.phase) for plant in ordered}
+        )
+        self.m_iBuyCount = sum(1 for plant in ordered if plant.isBuy == 1)
+
+    @staticmethod
+    def parsePhase(phase: str) -> tuple[int, ...]:
+        """解析作物阶段字符串 去除重复阶段
+
+        Args:
+            phase (str): 以逗号分隔的各阶段累计时间
+
+        Returns:
+            tuple[int, ...]: 阶段数组
+        """
+        seen = set()
+        result = []
+
+        for x in phase.split(","):
+            num = int(x)
+
+            if num not in seen:
+                seen.add(num)
+                result.append(num)
+
+        return tuple(result)
+
+    def __len__(self) -> int:
+        return len(self.m_pOrdered)
+
+    def plant(self, name: str) -> CPlantRow | None:
+        """根据作物名称获取作物"""
+        return self.m_pByName.get(name)
+
+    def plantById(self, plantId: int) -> CPlantRow | None:
+        """根据作物ID获取作物"""
+        return self.m_pById.get(plantId)
+
+    def plantId(self, name: str) -> int:
+        """根据作物名称获取作物ID，作物不存在或名称为空返回0"""
+        plant = self.m_pByName.get(name) if name else None
+        return int(plant.id) if plant else 0
+
+    def plantName(self, plantId: int | None) -> str:
+        """根据作物ID获取作物名称，作物不存在或ID为空返回空字符串"""
+        plant = self.m_pById.get(plantId) if plantId else None
+        return plant.name if plant else ""
+
+    def conflicts(self, other: "CPlantCatalog") -> list[str]:
+        """找出在另一份目录中ID与名称对应关系发生变化的作物
+
+        用户数据按作物ID保存，同一ID改名或同一名称换ID都会让已有数据指向别的作物；
+        新增或移除的作物不算冲突
+
+        Args:
+            other (CPlantCatalog): 待比较的作物目录
+
+        Returns:
+            list[str]: 冲突描述，形如 "ID:旧名称->新名称"，没有冲突时为空
+        """
+        result = []
+        for plant in self.m_pOrdered:
+            plantId = int(plant.id)
+
+            byId = other.plantById(plantId)
+            if byId and byId.name != plant.name:
+                result.append(f"{plantId}:{plant.name}->{byId.name}")
+
+            byName = other.plant(plant.name)
+            if byName and int(byName.id) != plantId:
+                result.append(f"{plant.name}:{plantId}->{byName.id}")
+
+        return result
+
+    def phase(self, name: str) -> tuple[int, ...]:
+        """获取作物各阶段累计时间，作物不存在返回空"""
+        return self.m_pPhases.get(name, ())
+
+    def stageCount(self, name: str) -> int:
+        """获取作物总阶段数，作物不存在返回-1"""
+        phase = self.m_pPhases.get(name)
+        return -1 if phase is None else len(phase)
+
+    def stageOf(self, name: str, elapsedTime: float) -> int:
+        """根据已生长时间计算作物当前所处阶段
+
+        Args:
+            name (str): 作物名称
+            elapsedTime (float): 播种至今经过的秒数
+
+        Returns:
+            int: 已经过的阶段数
+        """
+        return bisect_right(self.m_pPhases.get(name, ()), elapsedTime)
 
 
 class CPlantManager:
+    # 作物目录 整体替换保证读取方看到的始终是完整的一份
+    m_pCatalog: CPlantCatalog = CPlantCatalog([])
+
+    # 作物资源后台下载任务 保留引用避免任务被回收
+    m_pDownloadTask: asyncio.Task | None = None
+
+    # plant.db 必须包含的字段
+    m_pRequiredColumns = (
+        "id",
+        "name",
+        "level",
+        "buy",
+        "experience",
+        "harvest",
+        "price",
+        "time",
+        "crop",
+        "phase",
+        "general",
+        "sell",
+        "isBuy",
+    )
+
     def __init__(self):
         try:
             os.mkdir(g_pConfigManager.sPlantPath)
@@ -18,25 +163,31 @@ class CPlantManager:
 
     @classmethod
     async def cleanup(cls):
+        if cls.m_pDownloadTask and not cls.m_pDownloadTask.done():
+            cls.m_pDownloadTask.cancel()
+        cls.m_pDownloadTask = None
+
         if hasattr(cls, "m_pDB") and cls.m_pDB:
             await cls.m_pDB.close()
 
+    @classmethod
+    def getPlantDBPath(cls) -> str:
+        """获取当前使用的 plant.db 路径，调试模式使用测试库"""
+        if g_pConfigManager.bIsDebug:
+            return str(g_pConfigManager.sPlantPath.parent / "plant-test.db")
+
+        return str(g_pConfigManager.sPlantPath)
+
     @classmethod
     async def init(cls) -> bool:
         try:
             _ = os.path.exists(g_pConfigManager.sPlantPath)
 
-            if g_pConfigManager.bIsDebug:
-                cls.m_pDB = await aiosqlite.connect(
-                    str(g_pConfigManager.sPlantPath.parent / "plant-test.db")
-                )
-            else:
-                cls.m_pDB = await aiosqlite.connect(str(g_pConfigManager.sPlantPath))
-
+            cls.m_pDB = await aiosqlite.connect(cls.getPlantDBPath())
             cls.m_pDB.row_factory = aiosqlite.Row
-            return True
+            return await cls.reloadCatalog()
         except Exception as e:
-            logger.warning("初始化植物数据库失败", e=e)
+            logger.warning(f"初始化植物数据库失败: {e}")
             return False
 
     @classmethod
@@ -68,100 +219,196 @@ class CPlantManager:
         try:
             async with cls._transaction():
                 await cls.m_pDB.execute(command)
+
+            await cls.reloadCatalog()
             return True
         except Exception as e:
             logger.warning(f"数据库语句执行出错: {command}", e=e)
             return False
 
     @classmethod
-    async def getPlantByName(cls, name: str) -> dict | None:
-        """根据作物名称查询记录
+    async def reloadCatalog(cls) -> bool:
+        """从 plant.db 重新加载作物目录并整体替换
+
+        Returns:
+            bool: 是否加载成功，失败时保留原目录
+        """
+        try:
+            catalog = await cls.loadCatalog(cls.m_pDB)
+        except Exception as e:
+            logger.warning(f"加载作物目录失败: {e}")
+            return False
+
+        cls.m_pCatalog = catalog
+        logger.debug(f"作物目录加载完毕，共{len(catalog)}种作物")
+        return True
+
+    @classmethod
+    async def loadCatalog(cls, db: aiosqlite.Connection) -> CPlantCatalog:
+        """从指定连接读取全部作物并构建作物目录
 
         Args:
-            name (str): 作物名称
+            db (aiosqlite.Connection): plant.db 连接
+
+        Returns:
+            CPlantCatalog: 作物目录
+        """
+        async with db.execute("PRAGMA table_info(plant)") as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+
+        # 按记录字段顺序读取 旧版 plant.db 缺少的可选字段以空值补齐
+        columns = ", ".join(
+            f'"{name}"' if name in existing else f'NULL AS "{name}"'
+            for name in CPlantRow.columns()
+        )
+        async with db.execute(f"SELECT {columns} FROM plant ORDER BY level") as cursor:
+            cursor.row_factory = CPlantRow.fromRow
+            rows = await cursor.fetchall()
+
+        return CPlantCatalog(list(rows))
+
+    @classmethod
+    async def validatePlantDB(cls, path: str) -> CPlantCatalog | None:
+        """校验新下载的 plant.db 并构建对应的作物目录
+
+        依次检查文件完整性、表结构、作物数量以及已有作物的ID与名称是否一致，
+        任一项不通过则返回None
+
+        Args:
+            path (str): 待校验的数据库文件路径
 
         Returns:
-            dict | None: 返回记录字典，未找到返回None
+            CPlantCatalog | None: 校验通过返回新作物目录
         """
+        uri = Path(path).resolve().as_uri() + "?mode=ro"
         try:
-            async with cls.m_pDB.execute(
-                "SELECT * FROM plant WHERE name = ?", (name,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+            async with aiosqlite.connect(uri, uri=True) as db:
+                db.row_factory = aiosqlite.Row
+
+                async with db.execute("PRAGMA integrity_check") as cursor:
+                    row = await cursor.fetchone()
+                if not row or row[0] != "ok":
+                    logger.warning(f"plant.db 完整性校验失败: {row[0] if row else ''}")
+                    return None
+
+                async with db.execute("PRAGMA table_info(plant)") as cursor:
+                    columns = {r[1] for r in await cursor.fetchall()}
+                missing = [c for c in cls.m_pRequiredColumns if c not in columns]
+                if missing:
+                    logger.warning(f"plant.db 缺少字段: {missing}")
+                    return None
+
+                catalog = await cls.loadCatalog(db)
         except Exception as e:
-            logger.warning(f"查询作物失败: {name}", e=e)
+            logger.warning(f"plant.db 校验失败: {e}")
+            return None
+
+        if len(catalog) <= 0:
+            logger.warning("plant.db 中没有作物数据")
+            return None
+
+        # 用户的作物与地块按ID保存 对应关系变化会让已有数据指向别的作物
+        conflicts = cls.m_pCatalog.conflicts(catalog)
+        if conflicts:
+            logger.warning(
+                f"plant.db 中已有作物的ID与名称对应关系发生变化: {conflicts}"
+            )
             return None
 
+        return catalog
+
     @classmethod
-    async def getPlantPhaseByName(cls, name: str) -> list[int]:
-        """根据作物名称获取作物各个阶段
+    async def promotePlantDB(cls, path: str, catalog: CPlantCatalog) -> bool:
+        """将校验通过的 plant.db 替换为正式文件并切换作物目录
+
+        先原子替换文件并打开新连接，再切换目录与连接，最后关闭旧连接，
+        切换期间的查询仍由旧目录与旧连接完成
 
         Args:
-            name (str): 作物名称
+            path (str): 已校验的数据库文件路径
+            catalog (CPlantCatalog): 新文件对应的作物目录
 
         Returns:
-            list: 阶段数组
+            bool: 是否替换成功
         """
+        target = str(g_pConfigManager.sPlantPath)
+        isActive = cls.getPlantDBPath() == target
+        oldDB = getattr(cls, "m_pDB", None)
+
         try:
-            async with cls.m_pDB.execute(
-                "SELECT phase FROM plant WHERE name = ?", (name,)
-            ) as cursor:
-                row = await cursor.fetchone()
+            os.replace(path, target)
+        except PermissionError:
+            # Windows 下无法替换仍被打开的文件，只能先关闭旧连接
+            if not (isActive and oldDB):
+                raise
+            await oldDB.close()
+            oldDB = None
+            os.replace(path, target)
+
+        # 调试模式使用测试库，只替换文件不切换
+        if not isActive:
+            return True
+
+        newDB = await aiosqlite.connect(target)
+        newDB.row_factory = aiosqlite.Row
 
-                if not row:
-                    return []
+        cls.m_pDB = newDB
+        cls.m_pCatalog = catalog
 
-                phase = row[0].split(",")
+        if oldDB:
+            await oldDB.close()
 
-                seen = set()
-                result = []
+        logger.info(f"plant.db 已更新，共{len(catalog)}种作物")
+        return True
 
-                for x in phase:
-                    num = int(x)
+    @classmethod
+    def startDownloadPlant(cls) -> asyncio.Task:
+        """在后台下载作物资源，已在下载时不重复启动
 
-                    if num not in seen:
-                        seen.add(num)
-                        result.append(num)
+        Returns:
+            asyncio.Task: 下载任务
+        """
+        if cls.m_pDownloadTask and not cls.m_pDownloadTask.done():
+            return cls.m_pDownloadTask
 
-                return result
-        except Exception as e:
-            logger.warning(f"查询作物阶段失败: {name}", e=e)
-            return []
+        cls.m_pDownloadTask = asyncio.create_task(cls.downloadPlant())
+        return cls.m_pDownloadTask
 
     @classmethod
-    async def getPlantPhaseNumberByName(cls, name: str) -> int:
-        """根据作物名称获取作物总阶段数
+    async def getPlantByName(cls, name: str) -> CPlantRow | None:
+        """根据作物名称查询记录
 
         Args:
             name (str): 作物名称
 
         Returns:
-            int: 总阶段数
+            CPlantRow | None: 返回只读记录，未找到返回None
         """
-        try:
-            async with cls.m_pDB.execute(
-                "SELECT phase FROM plant WHERE name = ?", (name,)
-            ) as cursor:
-                row = await cursor.fetchone()
+        return cls.m_pCatalog.plant(name)
 
-                if not row:
-                    return -1
+    @classmethod
+    async def getPlantPhaseByName(cls, name: str) -> list[int]:
+        """根据作物名称获取作物各个阶段
 
-                phase = row[0].split(",")
+        Args:
+            name (str): 作物名称
 
-                # 去重
-                seen = set()
-                result = []
-                for x in phase:
-                    if x not in seen:
-                        seen.add(x)
-                        result.append(x)
+        Returns:
+            list: 阶段数组
+        """
+        return list(cls.m_pCatalog.phase(name))
 
-                return len(result)
-        except Exception as e:
-            logger.warning(f"查询作物阶段失败: {name}", e=e)
-            return -1
+    @classmethod
+    async def getPlantPhaseNumberByName(cls, name: str) -> int:
+        """根据作物名称获取作物总阶段数
+
+        Args:
+            name (str): 作物名称
+
+        Returns:
+            int: 总阶段数
+        """
+        return cls.m_pCatalog.stageCount(name)
 
     @classmethod
     async def getPlantAgainByName(cls, name: str) -> int:
@@ -173,23 +420,15 @@ class CPlantManager:
         Returns:
             int: 再次成熟时间 单位:h
         """
+        plant = cls.m_pCatalog.plant(name)
+        if not plant:
+            return -1
 
         try:
-            async with cls.m_pDB.execute(
-                "SELECT phase FROM plant WHERE name = ?", (name,)
-            ) as cursor:
-                row = await cursor.fetchone()
-
-                if not row:
-                    return -1
-
-                phase = row[0].split(",")
-                again = phase[-1] - phase[3] / 60 / 60
-
-                return again
-
+            phase = [int(x) for x in plant["phase"].split(",")]
+            return (phase[-1] - phase[3]) // 60 // 60
         except Exception as e:
-            logger.warning(f"查询作物阶段失败: {name}", e=e)
+            logger.warning(f"查询作物阶段失败: {name} {e}")
             return -1
 
     @classmethod
@@ -202,15 +441,7 @@ class CPlantManager:
         Returns:
             bool: 存在返回True，否则False
         """
-        try:
-            async with cls.m_pDB.execute(
-                "SELECT 1 FROM plant WHERE name = ? LIMIT 1", (name,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return True if row else False
-        except Exception as e:
-            logger.warning(f"检查作物存在性失败: {name}", e=e)
-            return False
+        return cls.m_pCatalog.plant(name) is not None
 
     @classmethod
     async def countPlants(cls, onlyBuy: bool = False) -> int:
@@ -222,32 +453,13 @@ class CPlantManager:
         Returns:
             int: 符合条件的记录数
         """
-        try:
-            if onlyBuy:
-                sql = "SELECT COUNT(*) FROM plant WHERE isBuy = 1"
-                params: tuple = ()
-            else:
-                sql = "SELECT COUNT(*) FROM plant"
-                params: tuple = ()
-            async with cls.m_pDB.execute(sql, params) as cursor:
-                row = await cursor.fetchone()
-                return row[0] if row else 0
-        except Exception as e:
-            logger.warning(f"统计作物数量失败, onlyBuy={onlyBuy}", e=e)
-            return 0
+        catalog = cls.m_pCatalog
+        return catalog.m_iBuyCount if onlyBuy else len(catalog)
 
     @classmethod
-    async def listPlants(cls) -> list[dict]:
-        """查询所有作物记录"""
-        try:
-            async with cls.m_pDB.execute(
-                "SELECT * FROM plant ORDER BY level"
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(r) for r in rows]
-        except Exception as e:
-            logger.warning("查询所有作物失败", e=e)
-            return []
+    async def listPlants(cls) -> list[CPlantRow]:
+        """查询所有作物记录 按等级排序"""
+        return list(cls.m_pCatalog.m_pOrdered)
 
     @classmethod
     async def downloadPlant(cls) -> bool:
@@ -0,0 +1,91 @@
+import re
+from typing import ClassVar
+
+from astrbot.api import logger
+
+from .database import CSqlManager
+from .statement import g_pStatementRegistry
+
+
+class CQueryPlanAudit(CSqlManager):
+    # 热点语句 以登记名称引用 与实际执行的SQL始终一致
+    m_pHotStatements: ClassVar[tuple[str, ...]] = (
+        "user.get",
+        "userSoil.get",
+        "userSoil.countByLevel",
+        "userSoil.harvestable",
+        "userSoil.matureTimes",
+        "userSoil.snapshot",
+        "userSoil.snapshotByStealer",
+        "userSoilPacked.load",
+        "userSteal.byStealer",
+        "userSteal.exists",
+        "userSteal.stealCount",
+        "userSteal.stealable",
+        "userSign.monthCount",
+        "userSign.hasSigned",
+        "userSeed.byUid",
+        "userPlant.byUid",
+    )
+
+    @classmethod
+    def hotStatements(cls) -> list[str]:
+        """获取需要检查的热点语句名称，按地块数量生成的偷菜语句取两块地的版本
+
+        Returns:
+            list[str]: 语句名称
+        """
+        from .userSteal import CUserStealDB
+
+        return [*cls.m_pHotStatements, CUserStealDB.stealStatement(2)]
+
+    @classmethod
+    async def explain(cls, sql: str) -> list[str]:
+        """获取查询计划
+
+        Args:
+            sql (str): SQL语句
+
+        Returns:
+            list[str]: 查询计划中每一步的描述
+        """
+        params = (0,) * sql.count("?")
+        async with cls.m_pDB.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cursor:
+            rows = await cursor.fetchall()
+
+        return [row[3] for row in rows]
+
+    @classmethod
+    async def audit(cls) -> list[str]:
+        """检查热点语句是否退化为全表扫描
+
+        Returns:
+            list[str]: 全表扫描的语句及其计划
+        """
+        failures = []
+        for name in cls.hotStatements():
+            sql, _ = g_pStatementRegistry.get(name)
+            plan = await cls.explain(sql)
+
+            # 子查询物化后的临时结果可以扫描 只关心真实表
+            subqueries = {
+                match.group(1)
+                for detail in plan
+                if (match := re.match(r"^(?:MATERIALIZE|CO-ROUTINE) (\w+)", detail))
+            }
+
+            for detail in plan:
+                # 形如 "SCAN userSoil" 或按索引顺序读完整个索引 均为全表扫描
+                match = re.match(
+                    r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$", detail
+                )
+                if match and match.group(1) not in subqueries:
+                    failures.append(f"{name}: {detail}")
+
+        for failure in failures:
+            logger.warning(f"真寻农场热点查询全表扫描 {failure}")
+
+        return failures
+
+
+g_pQueryPlanAudit = CQueryPlanAudit()
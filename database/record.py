@@ -0,0 +1,119 @@
+from dataclasses import dataclass, field, fields
+from typing import Any, ClassVar
+
+
+class CRecord:
+    """数据库记录基类
+
+    子类为 slots 数据类，由游标的 row_factory 直接按列顺序构造，
+    同时保留按字段名下标访问与 get，兼容原先以字典使用记录的调用方
+    """
+
+    __slots__ = ()
+
+    # 记录类型 -> 对应数据库列的字段名 标记 column=False 的字段不参与查询
+    m_pColumns: ClassVar[dict[type, tuple[str, ...]]] = {}
+
+    @classmethod
+    def columns(cls) -> tuple[str, ...]:
+        """获取与数据库列对应的字段名，按构造参数顺序排列"""
+        columns = CRecord.m_pColumns.get(cls)
+        if columns is None:
+            columns = tuple(
+                f.name for f in fields(cls) if f.metadata.get("column", True)
+            )
+            CRecord.m_pColumns[cls] = columns
+        return columns
+
+    @classmethod
+    def columnList(cls, alias: str = "") -> str:
+        """获取用于 SELECT 或 RETURNING 的列清单
+
+        Args:
+            alias (str): 表别名，为空时不加前缀
+
+        Returns:
+            str: 以逗号分隔的列名
+        """
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(f'{prefix}"{name}"' for name in cls.columns())
+
+    @classmethod
+    def fromRow(cls, cursor, row: tuple):
+        """游标 row_factory，按列顺序构造记录"""
+        return cls(*row)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__match_args__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> tuple[str, ...]:
+        return self.__match_args__
+
+
+@dataclass(slots=True)
+class CUserRow(CRecord):
+    """user 表记录"""
+
+    uid: str  # 用户Uid
+    name: str  # 农场名称
+    exp: int  # 经验值
+    point: int  # 金币
+    vipPoint: int  # 点券
+    soil: int  # 解锁土地数量
+    stealTime: str  # 偷菜时间字符串
+    stealCount: int  # 剩余偷菜次数
+
+
+@dataclass(slots=True)
+class CSoilRow(CRecord):
+    """userSoil 表记录，额外携带由作物ID得到的作物名称"""
+
+    uid: str
+    soilIndex: int  # 地块索引 从1开始
+    plantId: int  # 作物ID 0表示未种植
+    plantTime: int  # 播种时间
+    matureTime: int  # 成熟时间
+    soilLevel: int  # 土地等级
+    wiltStatus: int  # 枯萎状态
+    fertilizerStatus: int  # 施肥状态
+    bugStatus: int  # 虫害状态
+    weedStatus: int  # 杂草状态
+    waterStatus: int  # 缺水状态
+    harvestCount: int  # 收获次数
+    isSoilPlanted: int | None  # 是否种植作物 旧数据迁移后可能为空
+    stolenTotal: int  # 被偷总数量
+    stealerCount: int  # 偷菜人数
+    plantName: str = field(default="", metadata={"column": False})  # 作物名称
+
+
+@dataclass(slots=True, frozen=True)
+class CPlantRow(CRecord):
+    """plant.db 作物记录 作物目录共享同一份 故不可修改"""
+
+    id: int
+    name: str
+    level: int
+    buy: int
+    soil: int
+    experience: int
+    harvest: int
+    price: int
+    time: int
+    crop: int
+    phase: str
+    general: int
+    sell: int
+    isBuy: int
+    offsetX: int
+    offsetY: int
+    offsetW: int
+    offsetH: int
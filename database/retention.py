@@ -0,0 +1,262 @@
+import asyncio
+import contextlib
+import time
+
+from astrbot.api import logger
+
+from ..cfg import g_pConfigManager
+from ..dbService import g_pDBService
+from ..tool import g_pToolManager
+from .database import CSqlManager
+
+
+class CRetentionManager(CSqlManager):
+    """数据保留与整理
+
+    在空闲时段依次归档过期的签到记录、清理过期的偷菜记录，
+    最后分批执行 incremental_vacuum 回收空闲页，每一批都是独立的短事务，
+    批次之间让出写锁，不影响正常指令
+    """
+
+    # 每批归档的签到记录数
+    m_iSignChunk = 5000
+
+    # 每批检查偷菜记录的被偷用户数
+    m_iStealChunk = 200
+
+    # 检查是否进入空闲时段的间隔 单位秒
+    m_iCheckInterval = 600
+
+    # 定时整理任务 保留引用避免任务被回收
+    m_pRetentionTask: asyncio.Task | None = None
+
+    # 最近一次定时整理的日期 每天只在空闲时段执行一次
+    m_sLastRunDate = ""
+
+    # 正在进行的整理 同一时间只允许一个
+    m_pRetentionLock = asyncio.Lock()
+
+    @classmethod
+    def quietHours(cls) -> tuple[int, int] | None:
+        """解析空闲时段配置
+
+        Returns:
+            tuple[int, int] | None: 左闭右开的 (开始小时, 结束小时)，未配置或格式错误返回None
+        """
+        value = str(g_pConfigManager.sDBQuietHours).strip()
+        if not value:
+            return None
+
+        try:
+            start, end = (int(part) for part in value.split("-"))
+        except ValueError:
+            logger.warning(f"空闲时段格式错误: {value}，应为 开始小时-结束小时")
+            return None
+
+        if not (0 <= start < 24 and 0 <= end <= 24) or start == end:
+            logger.warning(f"空闲时段超出范围: {value}")
+            return None
+
+        return start, end
+
+    @classmethod
+    def isQuiet(cls) -> bool:
+        """当前是否处于空闲时段 支持跨零点的时段如 23-5"""
+        hours = cls.quietHours()
+        if hours is None:
+            return False
+
+        start, end = hours
+        hour = g_pToolManager.dateTime().now().hour
+        if start < end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    @classmethod
+    def start(cls):
+        """按配置启动定时整理，未配置空闲时段时不启动"""
+        if cls.quietHours() is None:
+            return
+
+        if cls.m_pRetentionTask and not cls.m_pRetentionTask.done():
+            return
+
+        cls.m_pRetentionTask = asyncio.create_task(cls._retentionLoop())
+
+    @classmethod
+    async def cleanup(cls):
+        task = cls.m_pRetentionTask
+        cls.m_pRetentionTask = None
+        if task and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        # 等待正在执行的手动整理结束 避免关闭连接时仍有写入
+        async with cls.m_pRetentionLock:
+            pass
+
+    @classmethod
+    async def _retentionLoop(cls):
+        while True:
+            today = g_pToolManager.dateTime().date().today().strftime("%Y-%m-%d")
+            if cls.isQuiet() and cls.m_sLastRunDate != today:
+                cls.m_sLastRunDate = today
+                try:
+                    await cls.run(untilQuietEnds=True)
+                except Exception as e:
+                    logger.warning(f"真寻农场数据整理失败: {e}")
+
+            await asyncio.sleep(cls.m_iCheckInterval)
+
+    @classmethod
+    def signArchiveBefore(cls) -> str:
+        """签到记录的归档界限，早于该日期的记录会被归档
+
+        Returns:
+            str: 日期 'YYYY-MM-DD'，不归档时为空字符串
+        """
+        months = int(g_pConfigManager.iSignLogRetentionMonths)
+        if months <= 0:
+            return ""
+
+        # 保留本月及之前 months 个月的逐日记录
+        today = g_pToolManager.dateTime().date().today()
+        index = today.year * 12 + today.month - 1 - months
+        return f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+
+    @classmethod
+    async def run(cls, untilQuietEnds: bool = False) -> dict:
+        """执行一次数据整理
+
+        Args:
+            untilQuietEnds (bool): 是否在空闲时段结束时停止回收空闲页
+
+        Returns:
+            dict: 整理结果 signRows 归档的签到记录数，stealRows 删除的偷菜记录数，
+                vacuumPages 回收的页数，freePages 剩余的空闲页数，seconds 耗时
+        """
+        async with cls.m_pRetentionLock:
+            start = time.perf_counter()
+            result = {"signRows": 0, "stealRows": 0, "vacuumPages": 0}
+
+            before = cls.signArchiveBefore()
+            while before:
+                rows = await g_pDBService.userSign.archiveSignLog(
+                    before, cls.m_iSignChunk
+                )
+                if rows <= 0:
+                    break
+                result["signRows"] += rows
+                await asyncio.sleep(0)
+
+            afterUid = ""
+            while True:
+                rows, afterUid = await g_pDBService.userSteal.purgeStaleRecords(
+                    afterUid, cls.m_iStealChunk
+                )
+                result["stealRows"] += rows
+                if not afterUid:
+                    break
+                await asyncio.sleep(0)
+
+            result["vacuumPages"], result["freePages"] = await cls.vacuum(
+                untilQuietEnds
+            )
+            result["seconds"] = round(time.perf_counter() - start, 2)
+
+            logger.info(
+                f"真寻农场数据整理完毕: 归档签到记录 {result['signRows']} 条，"
+                f"清理偷菜记录 {result['stealRows']} 条，"
+                f"回收 {result['vacuumPages']} 页，剩余空闲 {result['freePages']} 页，"
+                f"耗时 {result['seconds']}s"
+            )
+            return result
+
+    @classmethod
+    async def _pragmaValue(cls, name: str) -> int:
+        async with cls.m_pDB.execute(f"PRAGMA {name}") as cursor:
+            row = await cursor.fetchone()
+        return int(row[0]) if row else 0
+
+    @classmethod
+    async def enableIncrementalVacuum(cls) -> bool:
+        """将数据库切换为增量整理模式
+
+        切换需执行一次 VACUUM 重写整个数据库文件，期间持有写锁，
+        只应在空闲时段或由管理员手动触发
+
+        Returns:
+            bool: 是否切换成功
+        """
+        logger.warning("真寻农场数据库即将切换为增量整理模式，需重写整个数据库文件")
+
+        await cls.flushGroupCommit()
+        async with CSqlManager.m_pWriteLock:
+            try:
+                await cls.m_pDB.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await cls.m_pDB.execute("VACUUM")
+            except Exception as e:
+                logger.warning(f"真寻农场数据库切换增量整理模式失败: {e}")
+                return False
+
+            if await cls._pragmaValue("auto_vacuum") != 2:
+                logger.warning("真寻农场数据库切换增量整理模式失败，将在下次整理时重试")
+                return False
+
+        logger.info("真寻农场数据库已切换为增量整理模式")
+        return True
+
+    @classmethod
+    async def vacuum(cls, untilQuietEnds: bool = False) -> tuple[int, int]:
+        """分批执行 incremental_vacuum 回收空闲页
+
+        每批在写锁内执行，批次之间释放写锁；数据库尚未开启增量整理时先完成切换，
+        切换失败时本次不回收，下次整理再重试
+
+        Args:
+            untilQuietEnds (bool): 是否在空闲时段结束时停止
+
+        Returns:
+            tuple[int, int]: (回收的页数, 剩余的空闲页数)
+        """
+        # 2 为 INCREMENTAL
+        if await cls._pragmaValue("auto_vacuum") != 2:
+            if untilQuietEnds and not cls.isQuiet():
+                return 0, await cls._pragmaValue("freelist_count")
+
+            # 切换时的整理已回收全部空闲页 失败时下次整理再重试
+            before = await cls._pragmaValue("freelist_count")
+            if not await cls.enableIncrementalVacuum():
+                return 0, before
+            return before, await cls._pragmaValue("freelist_count")
+
+        pages = max(1, int(g_pConfigManager.iDBVacuumPages))
+        reclaimed = 0
+        while True:
+            if untilQuietEnds and not cls.isQuiet():
+                break
+
+            # executescript 会先提交未完成的事务 故先提交合并中的写入再持有写锁
+            await cls.flushGroupCommit()
+            async with CSqlManager.m_pWriteLock:
+                free = await cls._pragmaValue("freelist_count")
+                if free <= 0:
+                    break
+
+                # incremental_vacuum 每执行一步回收一页 executescript 执行到结束
+                await cls.m_pDB.executescript(
+                    f"PRAGMA incremental_vacuum({min(pages, free)});"
+                )
+                step = free - await cls._pragmaValue("freelist_count")
+
+            reclaimed += step
+            if step <= 0:
+                break
+
+            await asyncio.sleep(0)
+
+        return reclaimed, await cls._pragmaValue("freelist_count")
+
+
+g_pRetentionManager = CRetentionManager()
@@ -0,0 +1,109 @@
+from collections.abc import Callable
+from typing import ClassVar
+
+import aiosqlite
+from astrbot.api import logger
+
+from .record import CRecord
+
+
+class CStatementRegistry:
+    """具名SQL语句注册表
+
+    全部语句在注册表中以固定文本登记，sqlite3 按语句文本在每个连接上缓存编译结果，
+    文本固定后读写连接池中的每条连接只需编译一次；带记录类型的语句查询结果
+    由游标直接构造为记录。启动时统一编译校验，表结构与语句不一致可及早发现
+    """
+
+    # 名称 -> (SQL, 记录类型)
+    m_pStatements: ClassVar[dict[str, tuple[str, type[CRecord] | None]]] = {}
+
+    # 每个连接缓存的已编译语句数量 需大于注册语句数量
+    m_iCacheSize = 256
+
+    @classmethod
+    def register(cls, name: str, sql: str, record: type[CRecord] | None = None) -> str:
+        """登记一条具名语句
+
+        Args:
+            name (str): 语句名称
+            sql (str): SQL语句
+            record (type[CRecord] | None): 查询结果的记录类型，为空时返回 aiosqlite.Row
+
+        Returns:
+            str: 语句名称
+
+        Raises:
+            ValueError: 同名语句已登记为不同的SQL
+        """
+        existing = cls.m_pStatements.get(name)
+        if existing and existing != (sql, record):
+            raise ValueError(f"语句重复登记: {name}")
+
+        cls.m_pStatements[name] = (sql, record)
+        return name
+
+    @classmethod
+    def require(
+        cls,
+        name: str,
+        build: Callable[[], str],
+        record: type[CRecord] | None = None,
+    ) -> str:
+        """获取按字段组合生成的语句，首次使用时登记
+
+        调用方需保证字段来自白名单并按固定顺序排列，生成的语句数量有限
+
+        Args:
+            name (str): 语句名称，需包含字段组合
+            build (Callable[[], str]): 生成SQL语句的函数
+            record (type[CRecord] | None): 查询结果的记录类型
+
+        Returns:
+            str: 语句名称
+        """
+        if name not in cls.m_pStatements:
+            cls.register(name, build(), record)
+        return name
+
+    @classmethod
+    def get(cls, name: str) -> tuple[str, type[CRecord] | None]:
+        """获取语句与记录类型
+
+        Args:
+            name (str): 语句名称
+
+        Returns:
+            tuple[str, type[CRecord] | None]: (SQL, 记录类型)
+
+        Raises:
+            KeyError: 语句未登记
+        """
+        return cls.m_pStatements[name]
+
+    @classmethod
+    async def validate(cls, db: aiosqlite.Connection) -> list[str]:
+        """编译全部已登记语句，检查表结构与语句是否一致
+
+        Args:
+            db (aiosqlite.Connection): 数据库连接
+
+        Returns:
+            list[str]: 编译失败的语句及原因
+        """
+        failures = []
+        for name, (sql, _) in cls.m_pStatements.items():
+            params = (None,) * sql.count("?")
+            try:
+                async with db.execute(f"EXPLAIN {sql}", params) as cursor:
+                    await cursor.fetchone()
+            except Exception as e:
+                failures.append(f"{name}: {e}")
+
+        for failure in failures:
+            logger.warning(f"真寻农场数据库语句校验失败 {failure}")
+
+        return failures
+
+
+g_pStatementRegistry = CStatementRegistry()
@@ -0,0 +1,507 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import ClassVar
+
+import aiosqlite
+from astrbot.api import logger
+
+from ..cfg import g_pConfigManager
+from ..dbService import g_pDBService
+from ..tool import g_pToolManager
+from .database import CSqlManager
+from .userCache import g_pUserCache
+from .userSoilPacked import CUserSoilPackedDB
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CTransferManager(CSqlManager):
+    """农场数据导出与导入
+
+    导出在固定的快照上逐表以游标分批读取，每行写为一条 NDJSON 记录，
+    可选 gzip 或 zstd 压缩，内存占用与数据量无关；
+    导入逐批读取记录，每批在一个事务中覆盖写入，并在文件旁记录已提交的行数，
+    中断后再次导入同一文件时从中断处继续
+    """
+
+    # 导出文件格式标识与版本
+    m_sFormat = "farm-ndjson"
+    m_iFormatVersion = 1
+
+    # 导出文件名前缀
+    m_sPrefix = "farm-"
+
+    # 压缩方式 -> 文件后缀
+    m_pSuffixes: ClassVar[dict[str, str]] = {
+        "none": ".ndjson",
+        "gzip": ".ndjson.gz",
+        "zstd": ".ndjson.zst",
+    }
+
+    # 导出的数据表 按顺序写入 userSoil 为逻辑上的地块表 与存储方式无关
+    m_pTables = (
+        "user",
+        "userSoil",
+        "userSeed",
+        "userPlant",
+        "userItem",
+        "userSteal",
+        "userSignLog",
+        "userSignSummary",
+        "userSignMonth",
+    )
+
+    # 每批读取与写入的行数
+    m_iChunkSize = 1000
+
+    # 导入时每隔多少行输出一次进度
+    m_iProgressRows = 100000
+
+    # 同一时间只允许一个导出或导入
+    m_pTransferLock = asyncio.Lock()
+
+    @classmethod
+    def exportDir(cls) -> Path:
+        """导出目录 位于数据库文件同级的 export 目录，导入也从该目录读取"""
+        return Path(g_pConfigManager.sDBFilePath).parent / "export"
+
+    @classmethod
+    def compression(cls) -> str:
+        """按配置获取导出的压缩方式，未安装 zstandard 时 zstd 改用 gzip"""
+        compression = str(g_pConfigManager.sDBExportCompression).lower()
+        if compression not in cls.m_pSuffixes:
+            logger.warning(f"未知的导出压缩方式: {compression}，已改用gzip")
+            return "gzip"
+
+        if compression == "zstd" and zstandard is None:
+            logger.warning("未安装 zstandard，导出已改用gzip压缩")
+            return "gzip"
+
+        return compression
+
+    @classmethod
+    def _compressionOf(cls, path: Path) -> str:
+        """按文件后缀判断压缩方式"""
+        name = path.name.removesuffix(".part")
+        for compression, suffix in cls.m_pSuffixes.items():
+            if compression != "none" and name.endswith(suffix):
+                return compression
+        return "none"
+
+    @classmethod
+    def _openStream(cls, path: Path, mode: str):
+        """打开导出文件，读写的都是字节流
+
+        Args:
+            path (Path): 文件路径
+            mode (str): rb 或 wb
+
+        Returns:
+            按行读取或写入字节的文件对象
+        """
+        compression = cls._compressionOf(path)
+        if compression == "gzip":
+            return gzip.open(path, mode)
+
+        if compression == "zstd":
+            if zstandard is None:
+                raise RuntimeError("读取 zstd 压缩的文件需要安装 zstandard")
+
+            # zstandard.open 持有底层文件 关闭压缩流时一并关闭
+            stream = zstandard.open(path, mode)
+            if mode == "wb":
+                return stream
+            # 解压流不支持按行读取 包一层缓冲
+            return io.BufferedReader(stream)
+
+        return open(path, mode)
+
+    @staticmethod
+    def _encode(item: dict) -> bytes:
+        return (
+            json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        )
+
+    @staticmethod
+    def _readLines(stream, count: int) -> list[bytes]:
+        """读取至多 count 行"""
+        lines = []
+        for line in stream:
+            lines.append(line)
+            if len(lines) >= count:
+                break
+        return lines
+
+    @classmethod
+    async def _openSnapshot(cls) -> aiosqlite.Connection:
+        """打开用于导出的快照连接
+
+        文件数据库在独立的只读连接上开启读事务固定快照，导出期间的写入不影响导出内容；
+        内存数据库只能从写连接读取，先在写锁内整体复制一份再导出
+
+        Returns:
+            aiosqlite.Connection: 快照连接，使用后需关闭
+        """
+        backend = CSqlManager.m_pBackend
+        snapshot = await backend.connectReader() if backend else None
+        if snapshot is None:
+            snapshot = await aiosqlite.connect(":memory:")
+            await cls.flushGroupCommit()
+            async with CSqlManager.m_pWriteLock:
+                await cls.m_pDB.backup(snapshot)
+            return snapshot
+
+        snapshot.row_factory = None
+        await snapshot.execute("BEGIN")
+        async with snapshot.execute("SELECT COUNT(*) FROM sqlite_master") as cursor:
+            await cursor.fetchone()
+        return snapshot
+
+    @classmethod
+    async def _iterTable(cls, db: aiosqlite.Connection, table: str, uid: str):
+        """逐批读取数据表，表不存在时不返回任何行
+
+        Args:
+            db (aiosqlite.Connection): 快照连接
+            table (str): 数据表名
+            uid (str): 用户Uid，为空时读取全部用户
+
+        Yields:
+            list[dict]: 一批行
+        """
+        async with db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ) as cursor:
+            if not await cursor.fetchone():
+                return
+
+        sql = f'SELECT * FROM "{table}"'
+        params = ()
+        if uid:
+            sql += " WHERE uid = ?"
+            params = (uid,)
+
+        async with db.execute(sql, params) as cursor:
+            columns = [column[0] for column in cursor.description]
+            while rows := await cursor.fetchmany(cls.m_iChunkSize):
+                yield [dict(zip(columns, row)) for row in rows]
+
+    @classmethod
+    async def _iterRows(cls, db: aiosqlite.Connection, table: str, uid: str):
+        """逐批读取导出的行，地块同时读取逐块存储与打包存储并展开为逐块的行
+
+        Yields:
+            list[dict]: 一批行
+        """
+        async for rows in cls._iterTable(db, table, uid):
+            yield rows
+
+        if table != "userSoil":
+            return
+
+        async for rows in cls._iterTable(db, "userSoilPacked", uid):
+            yield [
+                soil
+                for row in rows
+                for soil in CUserSoilPackedDB.unpackPlots(
+                    row["uid"], row["soils"]
+                ).values()
+            ]
+
+    @classmethod
+    async def export(cls, uid: str = "") -> dict:
+        """导出农场数据
+
+        Args:
+            uid (str): 只导出该用户的数据，为空时导出全部用户
+
+        Returns:
+            dict: 导出结果，包含 name, path, rows, tables, seconds；失败时为空字典
+        """
+        async with cls.m_pTransferLock:
+            exportDir = cls.exportDir()
+            os.makedirs(exportDir, exist_ok=True)
+
+            stamp = g_pToolManager.dateTime().now().strftime("%Y%m%d-%H%M%S")
+            owner = f"-{re.sub(r'[^0-9A-Za-z_.]', '_', uid)}" if uid else ""
+            path = exportDir / (
+                f"{cls.m_sPrefix}{stamp}{owner}{cls.m_pSuffixes[cls.compression()]}"
+            )
+            partial = path.with_name(path.name + ".part")
+
+            start = time.perf_counter()
+            tables = {}
+            try:
+                async with cls.m_pDB.execute("PRAGMA user_version") as cursor:
+                    version = (await cursor.fetchone())[0]
+
+                snapshot = await cls._openSnapshot()
+                try:
+                    stream = await asyncio.to_thread(cls._openStream, partial, "wb")
+                    try:
+                        header = {
+                            "format": cls.m_sFormat,
+                            "version": cls.m_iFormatVersion,
+                            "dbVersion": version,
+                            "uid": uid,
+                            "createdAt": stamp,
+                        }
+                        await asyncio.to_thread(stream.write, cls._encode(header))
+
+                        for table in cls.m_pTables:
+                            tables[table] = 0
+                            async for rows in cls._iterRows(snapshot, table, uid):
+                                data = b"".join(
+                                    cls._encode({"table": table, "row": row})
+                                    for row in rows
+                                )
+                                await asyncio.to_thread(stream.write, data)
+                                tables[table] += len(rows)
+
+                        # 结束标记 导入时据此判断文件是否完整
+                        await asyncio.to_thread(
+                            stream.write, cls._encode({"end": True, "tables": tables})
+                        )
+                    finally:
+                        await asyncio.to_thread(stream.close)
+                finally:
+                    await snapshot.close()
+
+                os.replace(partial, path)
+            except Exception as e:
+                partial.unlink(missing_ok=True)
+                logger.warning(f"真寻农场数据导出失败: {e}")
+                return {}
+
+            result = {
+                "name": path.name,
+                "path": str(path),
+                "rows": sum(tables.values()),
+                "tables": tables,
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+            logger.info(
+                f"真寻农场数据已导出: {path.name}，共 {result['rows']} 行，"
+                f"耗时 {result['seconds']}s"
+            )
+            return result
+
+    @classmethod
+    def _progressPath(cls, path: Path) -> Path:
+        return path.with_name(path.name + ".progress")
+
+    @classmethod
+    def _loadProgress(cls, path: Path) -> int:
+        """读取上次导入已提交的行数，文件已变化时从头导入
+
+        Args:
+            path (Path): 导入文件路径
+
+        Returns:
+            int: 已提交的行数
+        """
+        progressPath = cls._progressPath(path)
+        if not progressPath.exists():
+            return 0
+
+        try:
+            progress = json.loads(progressPath.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+
+        stat = path.stat()
+        if progress.get("size") != stat.st_size or progress.get("mtime") != int(
+            stat.st_mtime
+        ):
+            return 0
+
+        return int(progress.get("lines", 0))
+
+    @classmethod
+    def _saveProgress(cls, path: Path, lines: int):
+        """记录已提交的行数，先写临时文件再替换"""
+        stat = path.stat()
+        progressPath = cls._progressPath(path)
+        temp = progressPath.with_name(progressPath.name + ".tmp")
+        temp.write_text(
+            json.dumps(
+                {"lines": lines, "size": stat.st_size, "mtime": int(stat.st_mtime)}
+            ),
+            encoding="utf-8",
+        )
+        os.replace(temp, progressPath)
+
+    @classmethod
+    async def _importBatch(
+        cls, items: list[dict], columns: dict[str, set[str]], result: dict
+    ):
+        """在一个事务中写入一批记录，已存在的行整行覆盖
+
+        Args:
+            items (list[dict]): 导出文件中的记录
+            columns (dict[str, set[str]]): 数据表 -> 当前的列名，按需填充
+            result (dict): 导入结果，累加各表的行数
+        """
+        tables: dict[str, list[dict]] = {}
+        for item in items:
+            tables.setdefault(item["table"], []).append(item["row"])
+
+        async with cls._transaction():
+            for table, rows in tables.items():
+                if table not in cls.m_pTables:
+                    result["ignored"] += len(rows)
+                    continue
+
+                if table == "userSoil":
+                    await g_pDBService.userSoil.importSoils(rows)
+                else:
+                    if table not in columns:
+                        columns[table] = {
+                            column["name"] for column in await cls.getTableInfo(table)
+                        }
+
+                    # 只写入当前表中存在的列 兼容不同版本导出的文件
+                    groups: dict[tuple, list[tuple]] = {}
+                    for row in rows:
+                        keys = tuple(key for key in row if key in columns[table])
+                        groups.setdefault(keys, []).append(
+                            tuple(row[key] for key in keys)
+                        )
+
+                    for keys, values in groups.items():
+                        names = ", ".join(f'"{key}"' for key in keys)
+                        placeholders = ", ".join("?" for _ in keys)
+                        await cls.m_pDB.executemany(
+                            f'INSERT OR REPLACE INTO "{table}" ({names}) '
+                            f"VALUES ({placeholders})",
+                            values,
+                        )
+
+                result["tables"][table] = result["tables"].get(table, 0) + len(rows)
+                result["rows"] += len(rows)
+
+            # 用户信息被整行覆盖 提交后清空用户缓存
+            cls.addTransactionHook(onCommit=g_pUserCache.clear)
+
+    @classmethod
+    async def importFile(cls, name: str) -> dict:
+        """从导出目录导入农场数据，已存在的行以导入的数据为准
+
+        导入按主键整行覆盖（INSERT OR REPLACE），不会与现有数据合并，
+        例如导入前已有的种子、作物数量会被文件中的数量替换而不是累加；
+        作物与种子按 plantId 保存，导入双方需使用相同的 plant.db
+
+        每批在一个事务中提交，提交后记录进度，中断后再次导入同一文件时跳过已提交的行；
+        文件的数据库版本高于当前版本时不导入任何数据
+
+        Args:
+            name (str): 导出目录中的文件名
+
+        Returns:
+            dict: 导入结果，包含 name, rows, tables, resumed, ignored, complete,
+                seconds，失败时另含 error，版本过高时另含 dbVersion, localVersion；
+                文件不存在时为空字典
+        """
+        path = cls.exportDir() / Path(name).name
+        if not name or not path.is_file():
+            return {}
+
+        async with cls.m_pTransferLock:
+            resumed = cls._loadProgress(path)
+            result = {
+                "name": path.name,
+                "rows": 0,
+                "tables": {},
+                "resumed": max(0, resumed - 1),
+                "ignored": 0,
+                "complete": False,
+            }
+            columns: dict[str, set[str]] = {}
+
+            start = time.perf_counter()
+            reported = 0
+            lineNo = 0
+            try:
+                async with cls.m_pDB.execute("PRAGMA user_version") as cursor:
+                    localVersion = (await cursor.fetchone())[0]
+
+                stream = await asyncio.to_thread(cls._openStream, path, "rb")
+                try:
+                    while lines := await asyncio.to_thread(
+                        cls._readLines, stream, cls.m_iChunkSize
+                    ):
+                        items = []
+                        for line in lines:
+                            lineNo += 1
+                            if lineNo == 1:
+                                header = json.loads(line)
+                                if header.get("format") != cls.m_sFormat:
+                                    raise ValueError("不是农场导出文件")
+
+                                # 较新版本导出的文件可能依赖当前不存在的结构 整个文件不导入
+                                dbVersion = int(header.get("dbVersion", 0))
+                                if dbVersion > localVersion:
+                                    result["dbVersion"] = dbVersion
+                                    result["localVersion"] = localVersion
+                                    result["seconds"] = 0
+                                    logger.warning(
+                                        f"真寻农场数据导入已取消: {path.name} 的数据库版本 "
+                                        f"{dbVersion} 高于当前版本 {localVersion}"
+                                    )
+                                    return result
+                                continue
+
+                            if lineNo <= resumed or not line.strip():
+                                continue
+
+                            item = json.loads(line)
+                            if item.get("end"):
+                                result["complete"] = True
+                                continue
+                            items.append(item)
+
+                        if items:
+                            await cls._importBatch(items, columns, result)
+                            await asyncio.to_thread(cls._saveProgress, path, lineNo)
+
+                        if result["rows"] - reported >= cls.m_iProgressRows:
+                            reported = result["rows"]
+                            elapsed = time.perf_counter() - start
+                            logger.info(
+                                f"真寻农场数据导入中: {path.name} 已导入 {reported} 行，"
+                                f"{reported / elapsed:.0f} 行/s"
+                            )
+                finally:
+                    await asyncio.to_thread(stream.close)
+            except Exception as e:
+                result["error"] = str(e)
+                logger.warning(
+                    f"真寻农场数据导入中断: {path.name} 第 {lineNo} 行 {e}，"
+                    f"再次导入将从已提交的位置继续"
+                )
+
+            result["seconds"] = round(time.perf_counter() - start, 2)
+            if "error" in result:
+                return result
+
+            # 导入完整的文件后不再保留进度 再次导入时从头开始
+            if result["complete"]:
+                cls._progressPath(path).unlink(missing_ok=True)
+
+            logger.info(
+                f"真寻农场数据已导入: {path.name}，共 {result['rows']} 行，"
+                f"跳过已导入的 {result['resumed']} 行，耗时 {result['seconds']}s"
+            )
+            return result
+
+
+g_pTransferManager = CTransferManager()
@@ -5,6 +5,36 @@ from astrbot.api import logger
 
 from ..tool import g_pToolManager
 from .database import CSqlManager
+from .record import CUserRow
+from .statement import g_pStatementRegistry
+from .userCache import g_pUserCache
+
+# 写入语句统一返回完整用户行 用于同步缓存
+_RETURNING = f"RETURNING {CUserRow.columnList()}"
+
+g_pStatementRegistry.register(
+    "user.get", f"SELECT {CUserRow.columnList()} FROM user WHERE uid = ?", CUserRow
+)
+g_pStatementRegistry.register("user.uids", "SELECT uid FROM user")
+g_pStatementRegistry.register(
+    "user.insert",
+    "INSERT INTO user (uid, name, exp, point, soil, stealTime, stealCount) "
+    f"VALUES (?, ?, ?, ?, 3, ?, 5) {_RETURNING}",
+    CUserRow,
+)
+g_pStatementRegistry.register(
+    "user.setStealCount",
+    f"UPDATE user SET stealTime = ?, stealCount = ? WHERE uid = ? {_RETURNING}",
+    CUserRow,
+)
+
+# 单字段更新 每个字段一条固定语句
+for _field in ("name", "point", "vipPoint", "exp", "soil", "stealTime"):
+    g_pStatementRegistry.register(
+        f"user.set.{_field}",
+        f'UPDATE user SET "{_field}" = ? WHERE uid = ? {_RETURNING}',
+        CUserRow,
+    )
 
 
 class CUserDB(CSqlManager):
@@ -39,18 +69,76 @@ class CUserDB(CSqlManager):
             bool | str: False 表示失败，字符串表示成功信息
         """
         nowStr = g_pToolManager.dateTime().date().today().strftime("%Y-%m-%d")
-        sql = (
-            f"INSERT INTO user (uid, name, exp, point, soil, stealTime, stealCount) "
-            f"VALUES ({uid}, '{name}', {exp}, {point}, 3, '{nowStr}', 5)"
-        )
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(sql)
+                await cls._writeUserRow(
+                    uid, "user.insert", (str(uid), name, exp, point, nowStr)
+                )
             return "开通农场成功"
         except Exception as e:
             logger.warning("initUserInfoByUid 事务执行失败！", e=e)
             return False
 
+    @classmethod
+    async def _getUserRow(cls, uid: str) -> CUserRow | None:
+        """获取用户行，优先读取缓存，未命中时查询数据库并放入缓存
+
+        Args:
+            uid (str): 用户Uid
+
+        Returns:
+            CUserRow | None: 用户行，用户不存在返回None
+        """
+        hit, row = g_pUserCache.get(uid)
+        if hit:
+            return row
+
+        generation = g_pUserCache.generation()
+        result = await cls.queryOne("user.get", (uid,))
+
+        # 事务中可能读到尚未提交的数据 不放入缓存
+        if CSqlManager.m_pTransactionDepth.get() == 0:
+            g_pUserCache.fill(uid, result, generation)
+
+        return result
+
+    @classmethod
+    async def _writeUserRow(
+        cls, uid: str, statement: str, params: tuple
+    ) -> CUserRow | None:
+        """在事务中执行写入用户行的语句，并在事务结束时同步缓存
+
+        Args:
+            uid (str): 用户Uid
+            statement (str): 返回完整用户行的具名写入语句
+            params (tuple): 语句参数
+
+        Returns:
+            CUserRow | None: 写入后的用户行，未匹配到用户返回None
+        """
+        uid = str(uid)
+        result = None
+
+        g_pUserCache.beginWrite(uid)
+        try:
+            result = await cls.queryOne(statement, params, cls.m_pDB)
+        finally:
+            cls.addTransactionHook(
+                onCommit=lambda: g_pUserCache.endWrite(uid, result),
+                onRollback=lambda: g_pUserCache.endWrite(uid),
+            )
+
+        return result
+
+    @classmethod
+    def getCacheMetrics(cls) -> dict:
+        """获取用户信息缓存命中指标
+
+        Returns:
+            dict: 命中、未命中、淘汰次数，命中率及当前缓存数量
+        """
+        return g_pUserCache.getMetrics()
+
     @classmethod
     async def getAllUsers(cls) -> List[str]:
         """获取所有用户UID列表
@@ -58,9 +146,7 @@ class CUserDB(CSqlManager):
         Returns:
             List[str]: 用户UID列表
         """
-        cursor = await cls.m_pDB.execute("SELECT uid FROM user")
-        rows = await cursor.fetchall()
-        return [row[0] for row in rows]
+        return [row[0] for row in await cls.queryAll("user.uids")]
 
     @classmethod
     async def isUserExist(cls, uid: str) -> bool:
@@ -75,11 +161,7 @@ class CUserDB(CSqlManager):
         if not uid:
             return False
         try:
-            async with cls.m_pDB.execute(
-                "SELECT 1 FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return row is not None
+            return await cls._getUserRow(uid) is not None
         except Exception as e:
             logger.warning("isUserExist 查询失败！", e=e)
             return False
@@ -97,16 +179,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return {}
         try:
-            async with cls.m_pDB.execute(
-                "SELECT * FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    return {}
-
-                result = dict(row)
-
-            return result
+            row = await cls._getUserRow(uid)
+            return dict(row) if row else {}
         except Exception as e:
             logger.warning("getUserInfoByUid 查询失败！", e=e)
             return {}
@@ -124,11 +198,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return ""
         try:
-            async with cls.m_pDB.execute(
-                "SELECT name FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return row["name"] if row else ""
+            row = await cls._getUserRow(uid)
+            return row.name if row else ""
         except Exception as e:
             logger.warning("getUserNameByUid 查询失败！", e=e)
             return ""
@@ -148,9 +219,7 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET name = ? WHERE uid = ?", (name, uid)
-                )
+                await cls._writeUserRow(uid, "user.set.name", (name, uid))
             return True
         except Exception as e:
             logger.warning("updateUserNameByUid 事务执行失败！", e=e)
@@ -169,11 +238,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return -1
         try:
-            async with cls.m_pDB.execute(
-                "SELECT point FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return int(row[0]) if row and row[0] is not None else -1
+            row = await cls._getUserRow(uid)
+            return int(row.point) if row and row.point is not None else -1
         except Exception as e:
             logger.warning("getUserPointByUid 查询失败！", e=e)
             return -1
@@ -194,14 +260,99 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET point = ? WHERE uid = ?", (point, uid)
-                )
+                await cls._writeUserRow(uid, "user.set.point", (point, uid))
             return True
         except Exception as e:
             logger.error("updateUserPointByUid 事务执行失败！", e=e)
             return False
 
+    @classmethod
+    async def changeUserValuesByUid(
+        cls, uid: str, deltas: dict[str, int]
+    ) -> dict | None:
+        """原子地增减用户的一个或多个数值字段
+
+        在一条语句内完成加减与校验，任一字段变更后小于0则全部不变更
+
+        Args:
+            uid (str): 用户Uid
+            deltas (dict[str, int]): 字段-增减量的字典，负数为扣除
+
+        Returns:
+            dict | None: 变更后各字段的值，用户不存在或余额不足返回None
+        """
+        # 允许增减的数值字段白名单
+        allowedFields = ("exp", "point", "vipPoint", "soil", "stealCount")
+
+        # 按白名单顺序排列 同一组字段始终使用同一条语句
+        fields = [field for field in allowedFields if field in deltas]
+        if not uid or not fields:
+            logger.warning(f"changeUserValuesByUid 参数校验失败！{deltas}")
+            return None
+
+        def build() -> str:
+            setClause = ", ".join(f'"{field}" = "{field}" + ?' for field in fields)
+            guardClause = " AND ".join(f'"{field}" + ? >= 0' for field in fields)
+            return (
+                f"UPDATE user SET {setClause} "
+                f"WHERE uid = ? AND {guardClause} {_RETURNING}"
+            )
+
+        statement = g_pStatementRegistry.require(
+            f"user.change.{','.join(fields)}", build, CUserRow
+        )
+        values = [int(deltas[field]) for field in fields]
+
+        try:
+            async with cls._transaction():
+                row = await cls._writeUserRow(uid, statement, (*values, uid, *values))
+            return {field: row[field] for field in fields} if row else None
+        except Exception as e:
+            logger.error(f"changeUserValuesByUid 事务执行失败！{e}")
+            return None
+
+    @classmethod
+    async def addUserPointByUid(cls, uid: str, point: int) -> int:
+        """原子地增减用户农场币
+
+        Args:
+            uid (str): 用户Uid
+            point (int): 增减数量，负数为扣除
+
+        Returns:
+            int: 变更后的农场币，用户不存在或农场币不足返回 -1
+        """
+        result = await cls.changeUserValuesByUid(uid, {"point": point})
+        return result["point"] if result else -1
+
+    @classmethod
+    async def addUserVipPointByUid(cls, uid: str, vipPoint: int) -> int:
+        """原子地增减用户点券
+
+        Args:
+            uid (str): 用户Uid
+            vipPoint (int): 增减数量，负数为扣除
+
+        Returns:
+            int: 变更后的点券，用户不存在或点券不足返回 -1
+        """
+        result = await cls.changeUserValuesByUid(uid, {"vipPoint": vipPoint})
+        return result["vipPoint"] if result else -1
+
+    @classmethod
+    async def addUserExpByUid(cls, uid: str, exp: int) -> int:
+        """原子地增加用户经验值
+
+        Args:
+            uid (str): 用户Uid
+            exp (int): 增加的经验值
+
+        Returns:
+            int: 变更后的经验值，失败返回 -1
+        """
+        result = await cls.changeUserValuesByUid(uid, {"exp": exp})
+        return result["exp"] if result else -1
+
     @classmethod
     async def getUserVipPointByUid(cls, uid: str) -> int:
         """获取指定用户点券
@@ -215,11 +366,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return -1
         try:
-            async with cls.m_pDB.execute(
-                "SELECT vipPoint FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return int(row[0]) if row and row[0] is not None else -1
+            row = await cls._getUserRow(uid)
+            return int(row.vipPoint) if row and row.vipPoint is not None else -1
         except Exception as e:
             logger.warning("getUservipPointByUid 查询失败！", e=e)
             return -1
@@ -240,9 +388,7 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET vipPoint = ? WHERE uid = ?", (vipPoint, uid)
-                )
+                await cls._writeUserRow(uid, "user.set.vipPoint", (vipPoint, uid))
             return True
         except Exception as e:
             logger.error("updateUservipPointByUid 事务执行失败！", e=e)
@@ -261,11 +407,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return -1
         try:
-            async with cls.m_pDB.execute(
-                "SELECT exp FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return int(row[0]) if row and row[0] is not None else -1
+            row = await cls._getUserRow(uid)
+            return int(row.exp) if row and row.exp is not None else -1
         except Exception as e:
             logger.warning("getUserExpByUid 查询失败！", e=e)
             return -1
@@ -285,9 +428,7 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET exp = ? WHERE uid = ?", (exp, uid)
-                )
+                await cls._writeUserRow(uid, "user.set.exp", (exp, uid))
             return True
         except Exception as e:
             logger.warning("updateUserExpByUid 事务执行失败！", e=e)
@@ -308,32 +449,27 @@ class CUserDB(CSqlManager):
             return -1, -1, -1
 
         try:
-            async with cls.m_pDB.execute(
-                "SELECT exp FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if not row or row[0] is None:
-                    return -1, -1, -1
+            row = await cls._getUserRow(uid)
+            if not row or row.exp is None:
+                return -1, -1, -1
 
-                expVal = int(row[0])
-                levelStep = 200  # 每级经验增量
+            expVal = int(row.exp)
+            levelStep = 200  # 每级经验增量
 
-                discriminant = 1 + 8 * expVal / levelStep
-                level = int((-1 + math.sqrt(discriminant)) // 2)
-                if level < 0:
-                    level = 0
+            discriminant = 1 + 8 * expVal / levelStep
+            level = int((-1 + math.sqrt(discriminant)) // 2)
+            if level < 0:
+                level = 0
 
-                def cumExp(k: int) -> int:
-                    return levelStep * k * (k + 1) // 2
+            def cumExp(k: int) -> int:
+                return levelStep * k * (k + 1) // 2
 
-                totalExpCurrentLevel = cumExp(level)
-                totalExpNextLevel = cumExp(level + 1)
+            totalExpCurrentLevel = cumExp(level)
+            totalExpNextLevel = cumExp(level + 1)
 
-                currentExp = expVal - totalExpCurrentLevel
+            currentExp = expVal - totalExpCurrentLevel
 
-                return level, totalExpNextLevel, currentExp
-
-            return -1, -1, -1
+            return level, totalExpNextLevel, currentExp
         except Exception as e:
             logger.warning("getUserLevelByUid 查询失败！", e=e)
             return -1, -1, -1
@@ -351,11 +487,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return 0
         try:
-            async with cls.m_pDB.execute(
-                "SELECT soil FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return int(row[0]) if row and row[0] is not None else 0
+            row = await cls._getUserRow(uid)
+            return int(row.soil) if row and row.soil is not None else 0
         except Exception as e:
             logger.warning("getUserSoilByUid 查询失败！", e=e)
             return 0
@@ -375,9 +508,7 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET soil = ? WHERE uid = ?", (soil, uid)
-                )
+                await cls._writeUserRow(uid, "user.set.soil", (soil, uid))
             return True
         except Exception as e:
             logger.warning("updateUserSoilByUid 事务执行失败！", e=e)
@@ -396,11 +527,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return ""
         try:
-            async with cls.m_pDB.execute(
-                "SELECT stealTime FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return row[0] if row and row[0] else ""
+            row = await cls._getUserRow(uid)
+            return row.stealTime if row and row.stealTime else ""
         except Exception as e:
             logger.warning("getStealTimeByUid 查询失败！", e=e)
             return ""
@@ -421,9 +549,7 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET stealTime = ? WHERE uid = ?", (stealTime, uid)
-                )
+                await cls._writeUserRow(uid, "user.set.stealTime", (stealTime, uid))
             return True
         except Exception as e:
             logger.warning("updateStealTimeByUid 事务执行失败！", e=e)
@@ -442,11 +568,8 @@ class CUserDB(CSqlManager):
         if not uid:
             return -1
         try:
-            async with cls.m_pDB.execute(
-                "SELECT stealCount FROM user WHERE uid = ?", (uid,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return int(row[0]) if row and row[0] is not None else 0
+            row = await cls._getUserRow(uid)
+            return int(row.stealCount) if row and row.stealCount is not None else 0
         except Exception as e:
             logger.warning("getStealCountByUid 查询失败！", e=e)
             return -1
@@ -470,9 +593,8 @@ class CUserDB(CSqlManager):
             return False
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE user SET stealTime = ?, stealCount = ? WHERE uid = ?",
-                    (stealTime, stealCount, uid),
+                await cls._writeUserRow(
+                    uid, "user.setStealCount", (stealTime, stealCount, uid)
                 )
             return True
         except Exception as e:
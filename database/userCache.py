@@ -0,0 +1,160 @@
+import time
+from collections import OrderedDict
+from typing import ClassVar
+
+from ..cfg import g_pConfigManager
+from .record import CUserRow
+
+
+class CUserCache:
+    # 用户Uid -> 用户行 按最近访问排序 超出容量时淘汰最久未访问的用户
+    m_pRows: ClassVar[OrderedDict[str, CUserRow]] = OrderedDict()
+
+    # 未开通农场的用户Uid -> 过期时间
+    m_pMissing: ClassVar[OrderedDict[str, float]] = OrderedDict()
+
+    # 写事务尚未结束的用户Uid -> 未结束的写入数量 期间查询直接访问数据库
+    m_pDirty: ClassVar[dict[str, int]] = {}
+
+    # 每次写入递增 查询期间发生过写入的结果不再放入缓存 避免覆盖新值
+    m_iGeneration = 0
+
+    # 缓存命中指标
+    m_pMetrics: ClassVar[dict[str, int]] = {
+        "hit": 0,  # 命中用户行
+        "miss": 0,  # 未命中 需查询数据库
+        "negativeHit": 0,  # 命中未开通农场的用户
+        "evicted": 0,  # 因容量淘汰的用户行
+    }
+
+    @classmethod
+    def get(cls, uid: str) -> tuple[bool, CUserRow | None]:
+        """查询缓存
+
+        Args:
+            uid (str): 用户Uid
+
+        Returns:
+            tuple[bool, CUserRow | None]: (是否命中, 用户行)，命中且用户行为None表示用户不存在
+        """
+        if uid in cls.m_pDirty:
+            cls.m_pMetrics["miss"] += 1
+            return False, None
+
+        row = cls.m_pRows.get(uid)
+        if row is not None:
+            cls.m_pRows.move_to_end(uid)
+            cls.m_pMetrics["hit"] += 1
+            return True, row
+
+        expire = cls.m_pMissing.get(uid)
+        if expire is not None:
+            if expire > time.monotonic():
+                cls.m_pMetrics["negativeHit"] += 1
+                return True, None
+
+            del cls.m_pMissing[uid]
+
+        cls.m_pMetrics["miss"] += 1
+        return False, None
+
+    @classmethod
+    def generation(cls) -> int:
+        return cls.m_iGeneration
+
+    @classmethod
+    def fill(cls, uid: str, row: CUserRow | None, generation: int):
+        """将数据库查询结果放入缓存
+
+        查询期间发生过写入或该用户仍有未结束的写事务时放弃
+
+        Args:
+            uid (str): 用户Uid
+            row (CUserRow | None): 用户行，None表示用户不存在
+            generation (int): 查询前通过 generation() 获取的写入版本
+        """
+        if generation != cls.m_iGeneration or uid in cls.m_pDirty:
+            return
+
+        cls._store(uid, row)
+
+    @classmethod
+    def beginWrite(cls, uid: str):
+        """标记用户正在被写入，写事务结束前不使用也不填充该用户的缓存
+
+        Args:
+            uid (str): 用户Uid
+        """
+        cls.m_iGeneration += 1
+        cls.m_pDirty[uid] = cls.m_pDirty.get(uid, 0) + 1
+        cls.m_pRows.pop(uid, None)
+        cls.m_pMissing.pop(uid, None)
+
+    @classmethod
+    def endWrite(cls, uid: str, row: CUserRow | None = None):
+        """写事务结束，提交时传入写入后的用户行以更新缓存
+
+        Args:
+            uid (str): 用户Uid
+            row (CUserRow | None): 写入后的用户行，回滚或未知时为None
+        """
+        cls.m_iGeneration += 1
+
+        count = cls.m_pDirty.get(uid, 0) - 1
+        if count > 0:
+            cls.m_pDirty[uid] = count
+            return
+
+        cls.m_pDirty.pop(uid, None)
+        if row is not None:
+            cls._store(uid, row)
+
+    @classmethod
+    def clear(cls):
+        cls.m_iGeneration += 1
+        cls.m_pRows.clear()
+        cls.m_pMissing.clear()
+
+    @classmethod
+    def getMetrics(cls) -> dict:
+        """获取缓存命中指标
+
+        Returns:
+            dict: 命中、未命中、淘汰次数，命中率及当前缓存数量
+        """
+        metrics = dict(cls.m_pMetrics)
+        total = metrics["hit"] + metrics["negativeHit"] + metrics["miss"]
+        metrics["hitRate"] = (
+            (metrics["hit"] + metrics["negativeHit"]) / total if total else 0.0
+        )
+        metrics["size"] = len(cls.m_pRows)
+        metrics["negativeSize"] = len(cls.m_pMissing)
+
+        return metrics
+
+    @classmethod
+    def _store(cls, uid: str, row: CUserRow | None):
+        capacity = max(0, int(g_pConfigManager.iUserCacheSize))
+        if capacity == 0:
+            return
+
+        if row is None:
+            ttl = float(g_pConfigManager.iUserCacheNegativeTTL)
+            if ttl <= 0:
+                return
+
+            cls.m_pMissing[uid] = time.monotonic() + ttl
+            cls.m_pMissing.move_to_end(uid)
+            while len(cls.m_pMissing) > capacity:
+                cls.m_pMissing.popitem(last=False)
+            return
+
+        cls.m_pMissing.pop(uid, None)
+        cls.m_pRows[uid] = row
+        cls.m_pRows.move_to_end(uid)
+        while len(cls.m_pRows) > capacity:
+            cls.m_pRows.popitem(last=False)
+            cls.m_pMetrics["evicted"] += 1
+
+
+g_pUserCache = CUserCache()
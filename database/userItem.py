@@ -30,7 +30,7 @@ class CUserItemDB(CSqlManager):
         if not uid or not item:
             return None
         try:
-            async with cls.m_pDB.execute(
+            async with cls._readDB().execute(
                 "SELECT count FROM userItem WHERE uid = ? AND item = ?", (uid, item)
             ) as cursor:
                 row = await cursor.fetchone()
@@ -52,10 +52,10 @@ class CUserItemDB(CSqlManager):
         if not uid:
             return {}
         try:
-            cursor = await cls.m_pDB.execute(
+            async with cls._readDB().execute(
                 "SELECT item, count FROM userItem WHERE uid = ?", (uid,)
-            )
-            rows = await cursor.fetchall()
+            ) as cursor:
+                rows = await cursor.fetchall()
             return {row["item"]: row["count"] for row in rows}
         except Exception as e:
             logger.warning("getUserItemByUid查询失败！", e=e)
@@ -128,32 +128,21 @@ class CUserItemDB(CSqlManager):
         """
         if not uid or not item:
             return False
-        try:
-            async with cls._transaction():
-                async with cls.m_pDB.execute(
-                    "SELECT count FROM userItem WHERE uid = ? AND item = ?", (uid, item)
-                ) as cursor:
-                    row = await cursor.fetchone()
-
-                if row:
-                    newCount = row[0] + count
-                    if newCount <= 0:
-                        await cls.m_pDB.execute(
-                            "DELETE FROM userItem WHERE uid = ? AND item = ?",
-                            (uid, item),
-                        )
-                    else:
-                        await cls.m_pDB.execute(
-                            "UPDATE userItem SET count = ? WHERE uid = ? AND item = ?",
-                            (newCount, uid, item),
-                        )
-                else:
-                    if count > 0:
-                        await cls.m_pDB.execute(
-                            "INSERT INTO userItem (uid, item, count) VALUES (?, ?, ?)",
-                            (uid, item, count),
-                        )
-            return True
-        except Exception as e:
-            logger.warning("addUserItemByUid失败！", e=e)
+
+        return await cls.addUserItemsByUid(uid, {item: count})
+
+    @classmethod
+    async def addUserItemsByUid(cls, uid: str, items: dict[str, int]) -> bool:
+        """根据用户uid批量增减道具数量
+
+        Args:
+            uid (str): 用户uid
+            items (dict[str, int]): 道具名称-增减数量的字典，负数为扣除
+
+        Returns:
+            bool: 是否添加成功
+        """
+        if not uid:
             return False
+
+        return await cls._applyCountDeltas("userItem", "item", uid, items)
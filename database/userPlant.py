@@ -2,7 +2,13 @@ from typing import Dict, Optional
 
 from astrbot.api import logger
 
+from ..dbService import g_pDBService
 from .database import CSqlManager
+from .statement import g_pStatementRegistry
+
+g_pStatementRegistry.register(
+    "userPlant.byUid", "SELECT plantId, count FROM userPlant WHERE uid = ?"
+)
 
 
 class CUserPlantDB(CSqlManager):
@@ -10,11 +16,16 @@ class CUserPlantDB(CSqlManager):
     async def initDB(cls):
         userPlant = {
             "uid": "TEXT NOT NULL",  # 用户Uid
-            "plant": "TEXT NOT NULL",  # 作物名称
+            "plantId": "INTEGER NOT NULL",  # 作物ID
             "count": "INTEGER NOT NULL DEFAULT 0",  # 数量
-            "PRIMARY KEY": "(uid, plant)",
+            "PRIMARY KEY": "(uid, plantId)",
+            "WITHOUT ROWID": True,
         }
 
+        # 旧版以作物名称存储的表由迁移转换为作物ID 此处不做结构变更
+        if "plant" in {col["name"] for col in await cls.getTableInfo("userPlant")}:
+            return
+
         await cls.ensureTableSchema("userPlant", userPlant)
 
     @classmethod
@@ -29,32 +40,31 @@ class CUserPlantDB(CSqlManager):
         Returns:
             bool: 是否添加成功
         """
-        try:
-            async with cls._transaction():
-                # 检查是否已存在该作物
-                async with cls.m_pDB.execute(
-                    "SELECT count FROM userPlant WHERE uid = ? AND plant = ?",
-                    (uid, plant),
-                ) as cursor:
-                    row = await cursor.fetchone()
-
-                if row:
-                    # 如果作物已存在，则更新数量
-                    new_count = row[0] + count
-                    await cls.m_pDB.execute(
-                        "UPDATE userPlant SET count = ? WHERE uid = ? AND plant = ?",
-                        (new_count, uid, plant),
-                    )
-                else:
-                    # 如果作物不存在，则插入新记录
-                    await cls.m_pDB.execute(
-                        "INSERT INTO userPlant (uid, plant, count) VALUES (?, ?, ?)",
-                        (uid, plant, count),
-                    )
-            return True
-        except Exception as e:
-            logger.warning("addUserPlantByUid 失败！", e=e)
-            return False
+        return await cls.addUserPlantsByUid(uid, {plant: count})
+
+    @classmethod
+    async def addUserPlantsByUid(cls, uid: str, plants: dict[str, int]) -> bool:
+        """根据用户uid批量增减作物数量
+
+        Args:
+            uid (str): 用户uid
+            plants (dict[str, int]): 作物名称-增减数量的字典，负数为扣除
+
+        Returns:
+            bool: 是否添加成功
+        """
+        catalog = g_pDBService.plant.m_pCatalog
+
+        deltas = {}
+        for plant, count in plants.items():
+            plantId = catalog.plantId(plant)
+            if not plantId:
+                logger.warning(f"未知作物: {plant}")
+                return False
+
+            deltas[plantId] = deltas.get(plantId, 0) + count
+
+        return await cls._applyCountDeltas("userPlant", "plantId", uid, deltas)
 
     @classmethod
     async def getUserPlantByUid(cls, uid: str) -> Dict[str, int]:
@@ -66,11 +76,13 @@ class CUserPlantDB(CSqlManager):
         Returns:
             Dict[str, int]: 作物名称和数量
         """
-        cursor = await cls.m_pDB.execute(
-            "SELECT plant, count FROM userPlant WHERE uid=?", (uid,)
-        )
-        rows = await cursor.fetchall()
-        return {row["plant"]: row["count"] for row in rows}
+        catalog = g_pDBService.plant.m_pCatalog
+
+        rows = await cls.queryAll("userPlant.byUid", (uid,))
+
+        # 按作物名称排序 与以名称为主键时的顺序一致
+        plants = [(catalog.plantName(row["plantId"]), row["count"]) for row in rows]
+        return {plant: count for plant, count in sorted(plants) if plant}
 
     @classmethod
     async def getUserPlantByName(cls, uid: str, plant: str) -> Optional[int]:
@@ -84,8 +96,9 @@ class CUserPlantDB(CSqlManager):
             Optional[int]: 作物数量
         """
         try:
-            async with cls.m_pDB.execute(
-                "SELECT count FROM userPlant WHERE uid = ? AND plant = ?", (uid, plant)
+            async with cls._readDB().execute(
+                "SELECT count FROM userPlant WHERE uid = ? AND plantId = ?",
+                (uid, g_pDBService.plant.m_pCatalog.plantId(plant)),
             ) as cursor:
                 row = await cursor.fetchone()
                 return row[0] if row else None
@@ -111,8 +124,8 @@ class CUserPlantDB(CSqlManager):
 
             async with cls._transaction():
                 await cls.m_pDB.execute(
-                    "UPDATE userPlant SET count = ? WHERE uid = ? AND plant = ?",
-                    (count, uid, plant),
+                    "UPDATE userPlant SET count = ? WHERE uid = ? AND plantId = ?",
+                    (count, uid, g_pDBService.plant.m_pCatalog.plantId(plant)),
                 )
             return True
         except Exception as e:
@@ -133,7 +146,8 @@ class CUserPlantDB(CSqlManager):
         try:
             async with cls._transaction():
                 await cls.m_pDB.execute(
-                    "DELETE FROM userPlant WHERE uid = ? AND plant = ?", (uid, plant)
+                    "DELETE FROM userPlant WHERE uid = ? AND plantId = ?",
+                    (uid, g_pDBService.plant.m_pCatalog.plantId(plant)),
                 )
             return True
         except Exception as e:
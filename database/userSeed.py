@@ -2,7 +2,13 @@ from typing import Optional
 
 from astrbot.api import logger
 
+from ..dbService import g_pDBService
 from .database import CSqlManager
+from .statement import g_pStatementRegistry
+
+g_pStatementRegistry.register(
+    "userSeed.byUid", "SELECT plantId, count FROM userSeed WHERE uid = ?"
+)
 
 
 class CUserSeedDB(CSqlManager):
@@ -10,11 +16,16 @@ class CUserSeedDB(CSqlManager):
     async def initDB(cls):
         userSeed = {
             "uid": "TEXT NOT NULL",  # 用户Uid
-            "seed": "TEXT NOT NULL",  # 种子名称
+            "plantId": "INTEGER NOT NULL",  # 种子对应的作物ID
             "count": "INTEGER NOT NULL DEFAULT 0",  # 数量
-            "PRIMARY KEY": "(uid, seed)",
+            "PRIMARY KEY": "(uid, plantId)",
+            "WITHOUT ROWID": True,
         }
 
+        # 旧版以种子名称存储的表由迁移转换为作物ID 此处不做结构变更
+        if "seed" in {col["name"] for col in await cls.getTableInfo("userSeed")}:
+            return
+
         await cls.ensureTableSchema("userSeed", userSeed)
 
     @classmethod
@@ -29,57 +40,31 @@ class CUserSeedDB(CSqlManager):
         Returns:
             bool: 是否添加成功
         """
-        try:
-            async with cls._transaction():
-                async with cls.m_pDB.execute(
-                    "SELECT count FROM userSeed WHERE uid = ? AND seed = ?", (uid, seed)
-                ) as cursor:
-                    row = await cursor.fetchone()
-
-                if row:
-                    newCount = row[0] + count
-                    await cls.m_pDB.execute(
-                        "UPDATE userSeed SET count = ? WHERE uid = ? AND seed = ?",
-                        (newCount, uid, seed),
-                    )
-                else:
-                    newCount = count
-                    await cls.m_pDB.execute(
-                        "INSERT INTO userSeed (uid, seed, count) VALUES (?, ?, ?)",
-                        (uid, seed, count),
-                    )
-
-                if newCount <= 0:
-                    await cls.m_pDB.execute(
-                        "DELETE FROM userSeed WHERE uid = ? AND seed = ?", (uid, seed)
-                    )
-            return True
-        except Exception as e:
-            logger.warning("addUserSeedByUid 失败！", e=e)
-            return False
+        return await cls.addUserSeedsByUid(uid, {seed: count})
 
     @classmethod
-    async def _addUserSeedByUid(cls, uid: str, seed: str, count: int = 1) -> bool:
-        """根据用户uid添加种子信息（非事务版，复用其他非事务接口）"""
-        try:
-            existing = await cls.getUserSeedByName(uid, seed)
-            newCount = (existing or 0) + count
+    async def addUserSeedsByUid(cls, uid: str, seeds: dict[str, int]) -> bool:
+        """根据用户uid批量增减种子数量
 
-            if existing is not None:
-                await cls._updateUserSeedByName(uid, seed, newCount)
-            else:
-                await cls.m_pDB.execute(
-                    "INSERT INTO userSeed (uid, seed, count) VALUES (?, ?, ?)",
-                    (uid, seed, newCount),
-                )
+        Args:
+            uid (str): 用户uid
+            seeds (dict[str, int]): 种子名称-增减数量的字典，负数为扣除
+
+        Returns:
+            bool: 是否添加成功
+        """
+        catalog = g_pDBService.plant.m_pCatalog
 
-            if newCount <= 0:
-                await cls._deleteUserSeedByName(uid, seed)
+        deltas = {}
+        for seed, count in seeds.items():
+            plantId = catalog.plantId(seed)
+            if not plantId:
+                logger.warning(f"未知种子: {seed}")
+                return False
 
-            return True
-        except Exception as e:
-            logger.warning("_addUserSeedByUid 失败！", e=e)
-            return False
+            deltas[plantId] = deltas.get(plantId, 0) + count
+
+        return await cls._applyCountDeltas("userSeed", "plantId", uid, deltas)
 
     @classmethod
     async def getUserSeedByName(cls, uid: str, seed: str) -> Optional[int]:
@@ -94,8 +79,9 @@ class CUserSeedDB(CSqlManager):
         """
 
         try:
-            async with cls.m_pDB.execute(
-                "SELECT count FROM userSeed WHERE uid = ? AND seed = ?", (uid, seed)
+            async with cls._readDB().execute(
+                "SELECT count FROM userSeed WHERE uid = ? AND plantId = ?",
+                (uid, g_pDBService.plant.m_pCatalog.plantId(seed)),
             ) as cursor:
                 row = await cursor.fetchone()
                 return row[0] if row else None
@@ -114,40 +100,16 @@ class CUserSeedDB(CSqlManager):
             dict: 种子信息
         """
 
-        cursor = await cls.m_pDB.execute(
-            "SELECT seed, count FROM userSeed WHERE uid=?", (uid,)
-        )
-        rows = await cursor.fetchall()
-        return {row["seed"]: row["count"] for row in rows}
+        catalog = g_pDBService.plant.m_pCatalog
 
-    @classmethod
-    async def updateUserSeedByName(cls, uid: str, seed: str, count: int) -> bool:
-        """根据种子名称更新种子数量
+        rows = await cls.queryAll("userSeed.byUid", (uid,))
 
-        Args:
-            uid (str): 用户uid
-            seed (str): 种子名称
-            count (int): 种子数量
-
-        Returns:
-            bool: 是否成功
-        """
-        try:
-            if count <= 0:
-                return await cls.deleteUserSeedByName(uid, seed)
-
-            async with cls._transaction():
-                await cls.m_pDB.execute(
-                    "UPDATE userSeed SET count = ? WHERE uid = ? AND seed = ?",
-                    (count, uid, seed),
-                )
-            return True
-        except Exception as e:
-            logger.warning("updateUserSeedByName失败！", e=e)
-            return False
+        # 按种子名称排序 与以名称为主键时的顺序一致
+        seeds = [(catalog.plantName(row["plantId"]), row["count"]) for row in rows]
+        return {seed: count for seed, count in sorted(seeds) if seed}
 
     @classmethod
-    async def _updateUserSeedByName(cls, uid: str, seed: str, count: int) -> bool:
+    async def updateUserSeedByName(cls, uid: str, seed: str, count: int) -> bool:
         """根据种子名称更新种子数量
 
         Args:
@@ -164,8 +126,8 @@ class CUserSeedDB(CSqlManager):
 
             async with cls._transaction():
                 await cls.m_pDB.execute(
-                    "UPDATE userSeed SET count = ? WHERE uid = ? AND seed = ?",
-                    (count, uid, seed),
+                    "UPDATE userSeed SET count = ? WHERE uid = ? AND plantId = ?",
+                    (count, uid, g_pDBService.plant.m_pCatalog.plantId(seed)),
                 )
             return True
         except Exception as e:
@@ -186,29 +148,10 @@ class CUserSeedDB(CSqlManager):
         try:
             async with cls._transaction():
                 await cls.m_pDB.execute(
-                    "DELETE FROM userSeed WHERE uid = ? AND seed = ?", (uid, seed)
+                    "DELETE FROM userSeed WHERE uid = ? AND plantId = ?",
+                    (uid, g_pDBService.plant.m_pCatalog.plantId(seed)),
                 )
             return True
         except Exception as e:
             logger.warning("deleteUserSeedByName 删除失败！", e=e)
             return False
-
-    @classmethod
-    async def _deleteUserSeedByName(cls, uid: str, seed: str) -> bool:
-        """根据种子名称从种子仓库中删除种子
-
-        Args:
-            uid (str): 用户uid
-            seed (str): 种子名称
-
-        Returns:
-            bool: 是否成功
-        """
-        try:
-            await cls.m_pDB.execute(
-                "DELETE FROM userSeed WHERE uid = ? AND seed = ?", (uid, seed)
-            )
-            return True
-        except Exception as e:
-            logger.warning("deleteUserSeedByName 删除失败！", e=e)
-            return False
@@ -10,6 +10,20 @@ from ..json import g_pJsonManager
 from ..tool import g_pToolManager
 from ..zhenxun_utils._build_image import BuildImage
 from .database import CSqlManager
+from .statement import g_pStatementRegistry
+
+g_pStatementRegistry.register(
+    "userSign.monthCount",
+    # 已归档的月份只剩月度汇总 两部分不会重复
+    "SELECT (SELECT COUNT(*) FROM userSignLog "
+    "WHERE uid = ? AND signDate >= ? AND signDate < ?) + "
+    "IFNULL((SELECT signDays FROM userSignMonth "
+    "WHERE uid = ? AND month = ?), 0)",
+)
+g_pStatementRegistry.register(
+    "userSign.hasSigned",
+    "SELECT 1 FROM userSignLog WHERE uid = ? AND signDate = ? LIMIT 1",
+)
 
 
 class CUserSignDB(CSqlManager):
@@ -38,8 +52,22 @@ class CUserSignDB(CSqlManager):
             "updatedAt": "DATETIME NOT NULL DEFAULT (datetime(CURRENT_TIMESTAMP, 'localtime'))",  # 更新时间  # noqa: E501
         }
 
+        # userSignMonth 表结构，过期的签到记录按用户每月归档为一行
+        userSignMonth = {
+            "uid": "TEXT NOT NULL",  # 用户ID
+            "month": "CHAR(7) NOT NULL",  # 月份（如2025-05）
+            "signDays": "INT NOT NULL DEFAULT 0",  # 当月签到天数
+            "supplementDays": "INT NOT NULL DEFAULT 0",  # 当月补签天数
+            "exp": "INT NOT NULL DEFAULT 0",  # 当月签到经验合计
+            "point": "INT NOT NULL DEFAULT 0",  # 当月签到金币合计
+            "dayMask": "INT NOT NULL DEFAULT 0",  # 签到日期位图 第n位表示n+1日
+            "PRIMARY KEY": "(uid, month)",
+            "WITHOUT ROWID": True,
+        }
+
         await cls.ensureTableSchema("userSignLog", userSignLog)
         await cls.ensureTableSchema("userSignSummary", userSignSummary)
+        await cls.ensureTableSchema("userSignMonth", userSignMonth)
 
     @classmethod
     async def getUserSignRewardByDate(cls, uid: str, date: str) -> tuple[int, int]:
@@ -53,24 +81,41 @@ class CUserSignDB(CSqlManager):
             tuple[int, int]: 经验、金币
         """
         try:
-            async with cls._transaction():
-                async with cls.m_pDB.execute(
-                    "SELECT exp, point FROM userSignLog WHERE uid=? AND signDate=?",
-                    (uid, date),
-                ) as cursor:
-                    row = await cursor.fetchone()
+            async with cls._readDB().execute(
+                "SELECT exp, point FROM userSignLog WHERE uid=? AND signDate=?",
+                (uid, date),
+            ) as cursor:
+                row = await cursor.fetchone()
 
-                if row is None:
-                    return 0, 0
+            if row is None:
+                return 0, 0
 
-                exp = row["exp"]
-                point = row["point"]
+            exp = row["exp"]
+            point = row["point"]
 
-                return exp, point
+            return exp, point
         except Exception as e:
             logger.warning("获取用户签到数据失败", e=e)
             return 0, 0
 
+    @staticmethod
+    def getMonthRange(monthStr: str) -> tuple[str, str]:
+        """获取月份对应的签到日期区间，用于替代 LIKE 前缀匹配以走主键索引
+
+        Args:
+            monthStr (str): 月份 示例: 2025-05
+
+        Returns:
+            tuple[str, str]: 左闭右开区间 示例: ("2025-05-01", "2025-06-01")
+        """
+        year, month = (int(part) for part in monthStr.split("-")[:2])
+        if month == 12:
+            year, month = year + 1, 1
+        else:
+            month += 1
+
+        return f"{monthStr}-01", f"{year:04d}-{month:02d}-01"
+
     @classmethod
     async def getUserSignCountByDate(cls, uid: str, monthStr: str) -> int:
         """根据日期查询用户签到总天数
@@ -83,11 +128,11 @@ class CUserSignDB(CSqlManager):
             int: 查询月总签到天数
         """
         try:
-            sql = "SELECT COUNT(*) FROM userSignLog WHERE uid=? AND signDate LIKE ?"
-            param = f"{monthStr}-%"
-            async with cls.m_pDB.execute(sql, (uid, param)) as cursor:
-                row = await cursor.fetchone()
-                return row[0] if row else 0
+            start, end = cls.getMonthRange(monthStr)
+            row = await cls.queryOne(
+                "userSign.monthCount", (uid, start, end, uid, monthStr[:7])
+            )
+            return row[0] if row else 0
         except Exception as e:
             logger.warning("统计用户月签到次数失败", e=e)
             return 0
@@ -104,14 +149,90 @@ class CUserSignDB(CSqlManager):
             bool: True=已签到，False=未签到
         """
         try:
-            sql = "SELECT 1 FROM userSignLog WHERE uid=? AND signDate=? LIMIT 1"
-            async with cls.m_pDB.execute(sql, (uid, signDate)) as cursor:
-                row = await cursor.fetchone()
-                return row is not None
+            if await cls.queryOne("userSign.hasSigned", (uid, signDate)):
+                return True
+
+            # 补签较早的日期时 该日可能已归档到月度汇总
+            return int(signDate[8:10]) in await cls.getArchivedSignDays(
+                uid, signDate[:7]
+            )
         except Exception as e:
             logger.warning("查询是否已签到失败", e=e)
             return False
 
+    @classmethod
+    async def getArchivedSignDays(cls, uid: str, monthStr: str) -> set[int]:
+        """获取已归档月份中签到的日期
+
+        Args:
+            uid (str): 用户Uid
+            monthStr (str): 月份 示例: 2025-05
+
+        Returns:
+            set[int]: 签到的日期，月份未归档返回空集合
+        """
+        async with cls._readDB().execute(
+            "SELECT dayMask FROM userSignMonth WHERE uid=? AND month=?",
+            (uid, monthStr),
+        ) as cursor:
+            row = await cursor.fetchone()
+
+        mask = row[0] if row else 0
+        return {day for day in range(1, 32) if mask & (1 << (day - 1))}
+
+    @classmethod
+    async def archiveSignLog(cls, before: str, limit: int) -> int:
+        """将指定日期之前的签到记录按用户每月归档，并删除已归档的记录
+
+        每次最多处理 limit 条，在同一事务中完成，需循环调用直到返回0
+
+        Args:
+            before (str): 日期 'YYYY-MM-DD'，早于该日期的记录会被归档
+            limit (int): 本次最多归档的记录数
+
+        Returns:
+            int: 本次归档的记录数
+        """
+        async with cls._transaction():
+            # 以 rowid 上限划定本批记录 汇总与删除使用同一范围
+            async with cls.m_pDB.execute(
+                "SELECT MAX(rowid) FROM ("
+                "SELECT rowid FROM userSignLog WHERE signDate < ? "
+                "ORDER BY rowid LIMIT ?)",
+                (before, limit),
+            ) as cursor:
+                row = await cursor.fetchone()
+
+            maxRowid = row[0] if row else None
+            if maxRowid is None:
+                return 0
+
+            await cls.m_pDB.execute(
+                """
+                INSERT INTO userSignMonth
+                    (uid, month, signDays, supplementDays, exp, point, dayMask)
+                SELECT uid, substr(signDate, 1, 7), COUNT(*), SUM(isSupplement),
+                       SUM(exp), SUM(point),
+                       SUM(1 << (CAST(substr(signDate, 9, 2) AS INTEGER) - 1))
+                FROM userSignLog
+                WHERE signDate < ? AND rowid <= ?
+                GROUP BY uid, substr(signDate, 1, 7)
+                ON CONFLICT(uid, month) DO UPDATE SET
+                    signDays = signDays + excluded.signDays,
+                    supplementDays = supplementDays + excluded.supplementDays,
+                    exp = exp + excluded.exp,
+                    point = point + excluded.point,
+                    dayMask = dayMask | excluded.dayMask
+                """,
+                (before, maxRowid),
+            )
+
+            cursor = await cls.m_pDB.execute(
+                "DELETE FROM userSignLog WHERE signDate < ? AND rowid <= ?",
+                (before, maxRowid),
+            )
+            return cursor.rowcount
+
     @classmethod
     async def sign(cls, uid: str, signDate: str = "") -> int:
         """签到
@@ -147,6 +268,7 @@ class CUserSignDB(CSqlManager):
             point = random.randint(pointMin, pointMax)
             vipPoint = 0
 
+            # 签到记录、累签奖励与资源发放在同一事务中完成
             async with cls._transaction():
                 await cls.m_pDB.execute(
                     "INSERT INTO userSignLog (uid, signDate, isSupplement, exp, point) VALUES (?, ?, ?, ?, ?)",
@@ -218,39 +340,35 @@ class CUserSignDB(CSqlManager):
                         ),
                     )
 
-            # 计算累签奖励
-            reward = g_pJsonManager.m_pSign["continuou"].get(f"{totalSignDays}", None)
-
-            if reward:
-                point += reward.get("point", 0)
-                exp += reward.get("exp", 0)
-                vipPoint = reward.get("vipPoint", 0)
-
-                plant = reward.get("plant", {})
+                # 计算累签奖励
+                reward = g_pJsonManager.m_pSign["continuou"].get(
+                    f"{totalSignDays}", None
+                )
 
-                if plant:
-                    for key, value in plant.items():
-                        await g_pDBService.userSeed.addUserSeedByUid(uid, key, value)
+                if reward:
+                    point += reward.get("point", 0)
+                    exp += reward.get("exp", 0)
+                    vipPoint = reward.get("vipPoint", 0)
 
-            if g_pConfigManager.bIsDebug:
-                exp += 9999
+                    plant = reward.get("plant", {})
 
-            # 向数据库更新
-            currentExp = await g_pDBService.user.getUserExpByUid(uid)
-            await g_pDBService.user.updateUserExpByUid(uid, currentExp + exp)
+                    if plant and not await g_pDBService.userSeed.addUserSeedsByUid(
+                        uid, plant
+                    ):
+                        raise RuntimeError(f"发放累签种子失败: {uid}")
 
-            currentPoint = await g_pDBService.user.getUserPointByUid(uid)
-            await g_pDBService.user.updateUserPointByUid(uid, currentPoint + point)
+                if g_pConfigManager.bIsDebug:
+                    exp += 9999
 
-            if vipPoint > 0:
-                currentVipPoint = await g_pDBService.user.getUserVipPointByUid(uid)
-                await g_pDBService.user.updateUserVipPointByUid(
-                    uid, currentVipPoint + vipPoint
-                )
+                # 向数据库更新 发放失败时签到记录一并回滚
+                if not await g_pDBService.user.changeUserValuesByUid(
+                    uid, {"exp": exp, "point": point, "vipPoint": max(vipPoint, 0)}
+                ):
+                    raise RuntimeError(f"发放签到奖励失败: {uid}")
 
             return 1
         except Exception as e:
-            logger.warning("执行签到失败", e=e)
+            logger.warning(f"执行签到失败: {e}")
             return 0
 
     @classmethod
@@ -270,10 +388,16 @@ class CUserSignDB(CSqlManager):
         firstWeekday, totalDays = calendar.monthrange(year, month)
         monthStr = f"{year:04d}-{month:02d}"
         try:
-            sql = "SELECT signDate FROM userSignLog WHERE uid=? AND signDate LIKE ?"
-            async with cls.m_pDB.execute(sql, (uid, f"{monthStr}-%")) as cursor:
+            sql = (
+                "SELECT signDate FROM userSignLog "
+                "WHERE uid=? AND signDate >= ? AND signDate < ?"
+            )
+            start, end = cls.getMonthRange(monthStr)
+            async with cls._readDB().execute(sql, (uid, start, end)) as cursor:
                 rows = await cursor.fetchall()
                 signedDays = {int(r[0][-2:]) for r in rows if r[0][-2:].isdigit()}
+
+            signedDays |= await cls.getArchivedSignDays(uid, monthStr)
         except Exception as e:
             logger.warning("绘制签到图时数据库查询失败", e=e)
             signedDays = set()
@@ -6,15 +6,166 @@ from ..cfg import g_pConfigManager
 from ..dbService import g_pDBService
 from ..tool import g_pToolManager
 from .database import CSqlManager
+from .record import CSoilRow
+from .statement import g_pStatementRegistry
+
+# 允许直接修改的地块字段 被偷统计随偷菜记录维护
+_UPDATABLE_FIELDS = (
+    "plantId",
+    "plantTime",
+    "matureTime",
+    "soilLevel",
+    "wiltStatus",
+    "fertilizerStatus",
+    "bugStatus",
+    "weedStatus",
+    "waterStatus",
+    "harvestCount",
+    "isSoilPlanted",
+)
+
+g_pStatementRegistry.register(
+    "userSoil.get",
+    f"SELECT {CSoilRow.columnList()} FROM userSoil WHERE uid = ? AND soilIndex = ?",
+    CSoilRow,
+)
+g_pStatementRegistry.register(
+    "userSoil.countByLevel",
+    "SELECT COUNT(*) FROM userSoil WHERE uid = ? AND soilLevel = ?",
+)
+g_pStatementRegistry.register(
+    "userSoil.insert",
+    """
+    INSERT INTO userSoil
+      (uid, soilIndex, plantId, plantTime, matureTime,
+       soilLevel, wiltStatus, fertilizerStatus, bugStatus,
+       weedStatus, waterStatus, harvestCount, isSoilPlanted)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """,
+)
+g_pStatementRegistry.register(
+    "userSoil.delete", "DELETE FROM userSoil WHERE uid = ? AND soilIndex = ?"
+)
+g_pStatementRegistry.register(
+    "userSoil.soilNumber", "SELECT soil FROM user WHERE uid = ?"
+)
+g_pStatementRegistry.register(
+    "userSoil.harvestable",
+    """
+    SELECT s.soilIndex, s.plantId, s.plantTime, s.matureTime,
+           s.soilLevel, s.harvestCount, s.stolenTotal
+    FROM userSoil s
+    JOIN user u ON u.uid = s.uid
+    WHERE s.uid = ? AND s.soilIndex <= u.soil
+      AND IFNULL(s.isSoilPlanted, 1) != 0
+      AND IFNULL(s.wiltStatus, 0) != 1
+      AND s.plantId != 0
+      AND s.matureTime <= ?
+    ORDER BY s.soilIndex
+    """,
+)
+g_pStatementRegistry.register(
+    "userSoil.harvest",
+    "UPDATE userSoil SET wiltStatus = ?, harvestCount = ?, "
+    "plantTime = ?, matureTime = ? WHERE uid = ? AND soilIndex = ?",
+)
+g_pStatementRegistry.register(
+    "userSoil.sowable",
+    "SELECT soilIndex, plantId, soilLevel FROM userSoil "
+    "WHERE uid = ? AND soilIndex <= ?",
+)
+g_pStatementRegistry.register(
+    "userSoil.sow",
+    """
+    INSERT INTO userSoil
+      (uid, soilIndex, plantId, plantTime, matureTime, soilLevel,
+       wiltStatus, fertilizerStatus, bugStatus, weedStatus,
+       waterStatus, harvestCount, isSoilPlanted,
+       stolenTotal, stealerCount)
+    VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, 0, 0, 0, 1, 0, 0)
+    ON CONFLICT(uid, soilIndex) DO UPDATE SET
+      plantId = excluded.plantId,
+      plantTime = excluded.plantTime,
+      matureTime = excluded.matureTime,
+      wiltStatus = 0, fertilizerStatus = 0, bugStatus = 0,
+      weedStatus = 0, waterStatus = 0, harvestCount = 0,
+      isSoilPlanted = 1, stolenTotal = 0, stealerCount = 0
+    """,
+)
+g_pStatementRegistry.register(
+    "userSoil.eradicate",
+    """
+    UPDATE userSoil
+    SET plantId = 0, plantTime = 0, matureTime = 0, wiltStatus = 0,
+        isSoilPlanted = 0, stolenTotal = 0, stealerCount = 0
+    WHERE uid = ?
+      AND soilIndex <= (SELECT soil FROM user WHERE uid = ?)
+      AND IFNULL(isSoilPlanted, 1) != 0
+      AND IFNULL(wiltStatus, 0) != 0
+    RETURNING soilIndex
+    """,
+)
+g_pStatementRegistry.register(
+    "userSoil.replace",
+    f"INSERT OR REPLACE INTO userSoil ({CSoilRow.columnList()}) "
+    f"VALUES ({', '.join('?' for _ in CSoilRow.columns())})",
+)
+g_pStatementRegistry.register(
+    "userSoil.matureTimes", "SELECT soilIndex, matureTime FROM userSoil WHERE uid = ?"
+)
+g_pStatementRegistry.register(
+    "userSoil.snapshot",
+    """
+    SELECT s.*, 0 AS isStolenByStealer
+    FROM userSoil s
+    WHERE s.uid = ? AND s.soilIndex <= ?
+    """,
+)
+g_pStatementRegistry.register(
+    "userSoil.snapshotByStealer",
+    """
+    SELECT s.*,
+           EXISTS (
+               SELECT 1 FROM userSteal t
+               WHERE t.uid = s.uid AND t.soilIndex = s.soilIndex
+                 AND t.stealerUid = ?
+           ) AS isStolenByStealer
+    FROM userSoil s
+    WHERE s.uid = ? AND s.soilIndex <= ?
+    """,
+)
+g_pStatementRegistry.register(
+    "userSoil.changeStolen",
+    "UPDATE userSoil SET stolenTotal = stolenTotal + ?, "
+    "stealerCount = stealerCount + ? WHERE uid = ? AND soilIndex = ?",
+)
+g_pStatementRegistry.register(
+    "userSoil.resetStolen",
+    "UPDATE userSoil SET stolenTotal = 0, stealerCount = 0 "
+    "WHERE uid = ? AND soilIndex = ?",
+)
+
+# 单字段更新 每个字段一条固定语句
+for _field in _UPDATABLE_FIELDS:
+    g_pStatementRegistry.register(
+        f"userSoil.set.{_field}",
+        f'UPDATE userSoil SET "{_field}" = ? WHERE uid = ? AND soilIndex = ?',
+    )
 
 
 class CUserSoilDB(CSqlManager):
+    # 地块存储方式 与配置项 sSoilEngine 对应
+    m_sEngine = "row"
+
+    # 允许直接修改的地块字段
+    m_pUpdatableFields = _UPDATABLE_FIELDS
+
     @classmethod
     async def initDB(cls):
         userSoil = {
             "uid": "TEXT NOT NULL",
             "soilIndex": "INTEGER NOT NULL",  # 地块索引从1开始
-            "plantName": "TEXT DEFAULT ''",  # 作物名称
+            "plantId": "INTEGER DEFAULT 0",  # 作物ID 0表示未种植
             "plantTime": "INTEGER DEFAULT 0",  # 播种时间
             "matureTime": "INTEGER DEFAULT 0",  # 成熟时间
             "soilLevel": "INTEGER DEFAULT 0",  # 土地等级 0=普通地，1=红土地，2=黑土地，3=金土地
@@ -25,11 +176,50 @@ class CUserSoilDB(CSqlManager):
             "waterStatus": "INTEGER DEFAULT 0",  # 缺水状态 0=不缺水，1=缺水
             "harvestCount": "INTEGER DEFAULT 0",  # 收获次数
             "isSoilPlanted": "INTEGER DEFAULT NULL",  # 是否种植作物
+            "stolenTotal": "INTEGER DEFAULT 0",  # 被偷总数量 随偷菜记录同步维护
+            "stealerCount": "INTEGER DEFAULT 0",  # 偷菜人数 随偷菜记录同步维护
             "PRIMARY KEY": "(uid, soilIndex)",
+            "WITHOUT ROWID": True,
         }
 
+        # 旧版以作物名称存储的表由迁移转换为作物ID 此处不做结构变更
+        if "plantName" in {col["name"] for col in await cls.getTableInfo("userSoil")}:
+            return
+
         await cls.ensureTableSchema("userSoil", userSoil)
 
+    @classmethod
+    def _soilRow(cls, soil: CSoilRow) -> CSoilRow:
+        """由作物ID补充地块记录的作物名称
+
+        Args:
+            soil (CSoilRow): 地块记录
+
+        Returns:
+            CSoilRow: 同一记录，未种植或作物不存在时作物名称为空字符串
+        """
+        soil.plantName = g_pDBService.plant.m_pCatalog.plantName(soil.plantId)
+        return soil
+
+    @classmethod
+    def _soilValues(cls, values: dict) -> dict:
+        """将待写入字段中的作物名称转换为作物ID
+
+        Args:
+            values (dict): 字段-值字典
+
+        Returns:
+            dict: 以 plantId 替换 plantName 后的新字典
+        """
+        if "plantName" not in values:
+            return values
+
+        values = dict(values)
+        values["plantId"] = g_pDBService.plant.m_pCatalog.plantId(
+            values.pop("plantName")
+        )
+        return values
+
     @classmethod
     async def nextPhase(cls, uid: str, soilIndex: int):
         """将指定地块的作物进入下个阶段
@@ -109,13 +299,14 @@ class CUserSoilDB(CSqlManager):
         Returns:
             dict: 包含字段名-值的字典; 若无数据则返回空字典
         """
-        cursor = await cls.m_pDB.execute("SELECT * FROM soil WHERE uid = ?", (uid,))
-        row = await cursor.fetchone()
+        async with cls._readDB().execute(
+            "SELECT * FROM soil WHERE uid = ?", (uid,)
+        ) as cursor:
+            row = await cursor.fetchone()
 
         if not row:
             return {}
-        columns = [description[0] for description in cursor.description]
-        return dict(zip(columns, row))
+        return dict(row)
 
     @classmethod
     async def migrateOldFarmData(cls) -> bool:
@@ -131,36 +322,52 @@ class CUserSoilDB(CSqlManager):
         if not await cursor.fetchone():
             return False
 
+        # 只迁移已开通农场的用户 旧表一次读出后批量写入
+        async with cls.m_pDB.execute(
+            "SELECT soil.* FROM soil JOIN user ON user.uid = soil.uid"
+        ) as cursor:
+            farms = await cursor.fetchall()
+
+        rows = []
+        for farmInfo in farms:
+            farmInfo = dict(farmInfo)
+            uid = farmInfo["uid"]
+            for i in range(1, 31):
+                key = f"soil{i}"
+                data = farmInfo.get(key)
+                if not data:
+                    continue
+
+                if data == ",,,4,":
+                    continue
+
+                parts = data.split(",")
+                if len(parts) < 3:
+                    continue
+
+                name = parts[0]
+                pt = int(parts[1])
+                mt = int(parts[2])
+
+                rows.append((uid, i, name, pt, mt, 0))
+
+        # 新建的地块表以作物ID存储 旧版地块表仍以名称存储 由后续迁移统一转换
+        columns = {col["name"] for col in await cls.getTableInfo("userSoil")}
+        plantColumn = "plantName" if "plantName" in columns else "plantId"
+        if plantColumn == "plantId":
+            catalog = g_pDBService.plant.m_pCatalog
+            rows = [(r[0], r[1], catalog.plantId(r[2]), *r[3:]) for r in rows]
+
         async with cls._transaction():
-            users = await g_pDBService.user.getAllUsers()
-
-            for uid in users:
-                farmInfo = await cls.getUserFarmByUid(uid)
-                for i in range(1, 31):
-                    key = f"soil{i}"
-                    data = farmInfo.get(key)
-                    if not data:
-                        continue
-
-                    if data == ",,,4,":
-                        continue
-
-                    parts = data.split(",")
-                    if len(parts) < 3:
-                        continue
-
-                    name = parts[0]
-                    pt = int(parts[1])
-                    mt = int(parts[2])
-
-                    await cls.m_pDB.execute(
-                        """
-                        INSERT INTO userSoil
-                        (uid,soilIndex,plantName,plantTime,matureTime,harvestCount)
-                        VALUES (?,?,?,?,?,?)
-                        """,
-                        (uid, i, name, pt, mt, 0),
-                    )
+            # 迁移可能被中断后重跑 已迁移的地块直接跳过
+            await cls.m_pDB.executemany(
+                f"""
+                INSERT OR IGNORE INTO userSoil
+                (uid,soilIndex,{plantColumn},plantTime,matureTime,harvestCount)
+                VALUES (?,?,?,?,?,?)
+                """,
+                rows,
+            )
 
             await cls.m_pDB.execute("DROP TABLE soil")
 
@@ -177,19 +384,14 @@ class CUserSoilDB(CSqlManager):
         Returns:
             None
         """
+        soilInfo = cls._soilValues(soilInfo)
         async with cls._transaction():
-            await cls.m_pDB.execute(
-                """
-                INSERT INTO userSoil
-                  (uid, soilIndex, plantName, plantTime, matureTime,
-                   soilLevel, wiltStatus, fertilizerStatus, bugStatus,
-                   weedStatus, waterStatus, harvestCount, isSoilPlanted)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """,
+            await cls.executeStatement(
+                "userSoil.insert",
                 (
                     soilInfo["uid"],
                     soilInfo["soilIndex"],
-                    soilInfo.get("plantName", ""),
+                    soilInfo.get("plantId", 0),
                     soilInfo.get("plantTime", 0),
                     soilInfo.get("matureTime", 0),
                     soilInfo.get("soilLevel", 0),
@@ -213,18 +415,13 @@ class CUserSoilDB(CSqlManager):
         Returns:
             None
         """
-        await cls.m_pDB.execute(
-            """
-                INSERT INTO userSoil
-                  (uid, soilIndex, plantName, plantTime, matureTime,
-                   soilLevel, wiltStatus, fertilizerStatus, bugStatus,
-                   weedStatus, waterStatus, harvestCount, isSoilPlanted)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """,
+        soilInfo = cls._soilValues(soilInfo)
+        await cls.executeStatement(
+            "userSoil.insert",
             (
                 soilInfo["uid"],
                 soilInfo["soilIndex"],
-                soilInfo.get("plantName", ""),
+                soilInfo.get("plantId", 0),
                 soilInfo.get("plantTime", 0),
                 soilInfo.get("matureTime", 0),
                 soilInfo.get("soilLevel", 0),
@@ -239,7 +436,7 @@ class CUserSoilDB(CSqlManager):
         )
 
     @classmethod
-    async def getUserSoil(cls, uid: str, soilIndex: int) -> dict:
+    async def getUserSoil(cls, uid: str, soilIndex: int) -> CSoilRow | dict:
         """获取指定用户某块土地的详细信息
 
         Args:
@@ -247,21 +444,15 @@ class CUserSoilDB(CSqlManager):
             soilIndex (int): 土地索引
 
         Returns:
-            dict: 记录存在返回字段-值字典，否则返回 None
+            CSoilRow | dict: 记录存在返回地块记录，否则返回空字典
         """
-        async with cls._transaction():
-            cursor = await cls.m_pDB.execute(
-                "SELECT * FROM userSoil WHERE uid = ? AND soilIndex = ?",
-                (uid, soilIndex),
-            )
-            row = await cursor.fetchone()
-            if not row:
-                return {}
-            columns = [description[0] for description in cursor.description]
-            return dict(zip(columns, row))
+        row = await cls.queryOne("userSoil.get", (uid, soilIndex))
+        if not row:
+            return {}
+        return cls._soilRow(row)
 
     @classmethod
-    async def _getUserSoil(cls, uid: str, soilIndex: int) -> dict | None:
+    async def _getUserSoil(cls, uid: str, soilIndex: int) -> CSoilRow | None:
         """获取指定用户某块土地的详细信息
 
         Args:
@@ -269,17 +460,12 @@ class CUserSoilDB(CSqlManager):
             soilIndex (int): 土地索引
 
         Returns:
-            dict | None: 记录存在返回字段-值字典，否则返回 None
+            CSoilRow | None: 记录存在返回地块记录，否则返回 None
         """
-        cursor = await cls.m_pDB.execute(
-            "SELECT * FROM userSoil WHERE uid = ? AND soilIndex = ?",
-            (uid, soilIndex),
-        )
-        row = await cursor.fetchone()
+        row = await cls.queryOne("userSoil.get", (uid, soilIndex))
         if not row:
             return None
-        columns = [description[0] for description in cursor.description]
-        return dict(zip(columns, row))
+        return cls._soilRow(row)
 
     @classmethod
     async def countSoilByLevel(cls, uid: str, soilLevel: int) -> int:
@@ -292,13 +478,8 @@ class CUserSoilDB(CSqlManager):
         Returns:
             int: 符合条件的土地数量
         """
-        async with cls._transaction():
-            cursor = await cls.m_pDB.execute(
-                "SELECT COUNT(*) FROM userSoil WHERE uid = ? AND soilLevel = ?",
-                (uid, soilLevel),
-            )
-            row = await cursor.fetchone()
-            return row[0] if row else 0
+        row = await cls.queryOne("userSoil.countByLevel", (uid, soilLevel))
+        return row[0] if row else 0
 
     @classmethod
     async def updateUserSoil(cls, uid: str, soilIndex: int, field: str, value):
@@ -314,10 +495,7 @@ class CUserSoilDB(CSqlManager):
             None
         """
         async with cls._transaction():
-            await cls.m_pDB.execute(
-                f"UPDATE userSoil SET {field} = ? WHERE uid = ? AND soilIndex = ?",
-                (value, uid, soilIndex),
-            )
+            await cls._updateUserSoil(uid, soilIndex, field, value)
 
     @classmethod
     async def _updateUserSoil(cls, uid: str, soilIndex: int, field: str, value):
@@ -331,11 +509,15 @@ class CUserSoilDB(CSqlManager):
 
         Returns:
             None
+
+        Raises:
+            ValueError: 字段不允许修改
         """
-        await cls.m_pDB.execute(
-            f"UPDATE userSoil SET {field} = ? WHERE uid = ? AND soilIndex = ?",
-            (value, uid, soilIndex),
-        )
+        ((field, value),) = cls._soilValues({field: value}).items()
+        if field not in cls.m_pUpdatableFields:
+            raise ValueError(f"未知的土地字段: {field}")
+
+        await cls.executeStatement(f"userSoil.set.{field}", (value, uid, soilIndex))
 
     @classmethod
     async def updateUserSoilFields(
@@ -351,36 +533,24 @@ class CUserSoilDB(CSqlManager):
         Returns:
             bool: 如果无可更新字段则返回 False，否则更新成功返回 True
         """
-        # 允许更新的列白名单
-        allowedFields = {
-            "plantName",
-            "plantTime",
-            "matureTime",
-            "soilLevel",
-            "wiltStatus",
-            "fertilizerStatus",
-            "bugStatus",
-            "weedStatus",
-            "waterStatus",
-            "harvestCount",
-            "isSoilPlanted",
-        }
-        setClauses = []
-        values = []
-        for field, value in updates.items():
-            if field not in allowedFields:
-                continue
-            setClauses.append(f'"{field}" = ?')
-            values.append(value)
-        if not setClauses:
+        # 只取白名单字段 并按白名单顺序排列 同一组字段始终使用同一条语句
+        updates = cls._soilValues(updates)
+        fields = [field for field in cls.m_pUpdatableFields if field in updates]
+        if not fields:
             return False
 
-        values.extend([uid, soilIndex])
-        sql = f"UPDATE userSoil SET {', '.join(setClauses)} WHERE uid = ? AND soilIndex = ?"
+        def build() -> str:
+            setClause = ", ".join(f'"{field}" = ?' for field in fields)
+            return f"UPDATE userSoil SET {setClause} WHERE uid = ? AND soilIndex = ?"
+
+        statement = g_pStatementRegistry.require(
+            f"userSoil.update.{','.join(fields)}", build
+        )
+        values = (*(updates[field] for field in fields), uid, soilIndex)
 
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(sql, tuple(values))
+                await cls.executeStatement(statement, values)
             return True
         except Exception as e:
             logger.error(f"批量更新土地字段失败: {e}")
@@ -398,9 +568,7 @@ class CUserSoilDB(CSqlManager):
             None
         """
         async with cls._transaction():
-            await cls.m_pDB.execute(
-                "DELETE FROM userSoil WHERE uid = ? AND soilIndex = ?", (uid, soilIndex)
-            )
+            await cls._deleteUserSoil(uid, soilIndex)
 
     @classmethod
     async def _deleteUserSoil(cls, uid: str, soilIndex: int):
@@ -413,9 +581,107 @@ class CUserSoilDB(CSqlManager):
         Returns:
             None
         """
-        await cls.m_pDB.execute(
-            "DELETE FROM userSoil WHERE uid = ? AND soilIndex = ?", (uid, soilIndex)
-        )
+        await cls.executeStatement("userSoil.delete", (uid, soilIndex))
+
+    @classmethod
+    async def harvestMany(cls, uid: str) -> list[dict]:
+        """一次收获用户全部成熟地块
+
+        一条语句取出已开垦、已种植、未枯萎且已成熟的地块，结合内存中的作物目录
+        计算收获数量与枯萎/再生长后的状态，再以一次 executemany 写回
+
+        Args:
+            uid (str): 用户Uid
+
+        Returns:
+            list[dict]: 按地块索引升序的收获结果，
+                每项包含 soilIndex, plantName, number, experience, soilLevel
+        """
+        nowTs = int(g_pToolManager.dateTime().now().timestamp())
+
+        async with cls._transaction():
+            rows = await cls.queryAll("userSoil.harvestable", (uid, nowTs), cls.m_pDB)
+
+            harvested, updates = await cls._harvestPlots(rows, nowTs)
+
+            if updates:
+                await cls.executeStatementMany(
+                    "userSoil.harvest",
+                    [(*update[1:], uid, update[0]) for update in updates],
+                )
+
+            # 重新生长的地块进入新的一季 与偷光后再生长一样清空被偷统计与偷菜记录
+            regrown = [(uid, update[0]) for update in updates if update[1] == 0]
+            if regrown:
+                await cls.executeStatementMany("userSoil.resetStolen", regrown)
+                await cls.executeStatementMany("userSteal.deletePlot", regrown)
+
+        return harvested
+
+    @classmethod
+    async def _harvestPlots(cls, rows, nowTs: int) -> tuple[list[dict], list[tuple]]:
+        """计算成熟地块的收获数量与收获后的地块状态
+
+        Args:
+            rows: 已开垦、已种植、未枯萎且已成熟的地块，按地块索引升序
+            nowTs (int): 当前时间戳
+
+        Returns:
+            tuple[list[dict], list[tuple]]: (收获结果, 地块更新)，
+                地块更新每项为 (soilIndex, wiltStatus, harvestCount, plantTime, matureTime)
+        """
+        catalog = g_pDBService.plant.m_pCatalog
+
+        numberPercent = {}  # 土地等级 -> 收获数量增加比例
+        harvested = []
+        updates = []
+        for row in rows:
+            plantInfo = catalog.plantById(row["plantId"])
+            if not plantInfo:
+                continue
+
+            plantName = plantInfo["name"]
+            level = row["soilLevel"] or 0
+            if level not in numberPercent:
+                numberPercent[level] = await cls.getSoilLevelHarvestNumber(level)
+
+            # 扣除被偷数量后按土地等级增长 向下取整
+            number = plantInfo["harvest"] - (row["stolenTotal"] or 0)
+            number = math.floor(number * (100 + numberPercent[level]) // 100)
+            if number <= 0:
+                continue
+
+            soilIndex = row["soilIndex"]
+            harvestCount = row["harvestCount"] or 0
+
+            # 到达收获次数上限则枯萎 否则回到成熟前的阶段重新生长
+            if harvestCount + 1 >= plantInfo["crop"]:
+                updates.append(
+                    (soilIndex, 1, harvestCount, row["plantTime"], row["matureTime"])
+                )
+            else:
+                p1, p2, *rest = catalog.phase(plantName)
+                updates.append(
+                    (
+                        soilIndex,
+                        0,
+                        harvestCount + 1,
+                        nowTs - p1 - p2,
+                        nowTs + p2 + sum(rest),
+                    )
+                )
+
+            harvested.append(
+                {
+                    "soilIndex": soilIndex,
+                    "plantName": plantName,
+                    "number": number,
+                    "experience": plantInfo["experience"],
+                    "soilLevel": level,
+                }
+            )
+
+        return harvested, updates
 
     @classmethod
     async def isSoilPlanted(cls, uid: str, soilIndex: int) -> bool:
@@ -435,87 +701,269 @@ class CUserSoilDB(CSqlManager):
         return bool(soilInfo.get("plantName")) and soilInfo.get("plantTime", 0) > 0
 
     @classmethod
-    async def sowingByPlantName(cls, uid: str, soilIndex: int, plantName: str) -> bool:
-        """播种指定作物到用户土地区
+    async def sowMany(cls, uid: str, plantName: str, count: int) -> list[int]:
+        """批量播种指定作物到用户的空闲土地，并扣除相应种子
+
+        选地、按土地等级计算成熟时间、写入地块与扣除种子在同一事务中完成
 
         Args:
             uid (str): 用户ID
-            soilIndex (int): 土地区索引
             plantName (str): 植物名
+            count (int): 最多播种的土地数量，超过仓库种子数量时以种子数量为准
 
         Returns:
-            bool: 播种成功返回 True，否则返回 False
+            list[int]: 成功播种的土地索引，按升序排列
         """
-        # 校验土地区是否已种植
-        soilInfo = await cls.getUserSoil(uid, soilIndex)
-        if soilInfo and soilInfo.get("plantName"):
-            return False
-
-        # 获取植物配置
-        plantCfg = await g_pDBService.plant.getPlantByName(plantName)
+        plantCfg = g_pDBService.plant.m_pCatalog.plant(plantName)
         if not plantCfg:
             logger.error(f"未知植物: {plantName}")
-            return False
+            return []
 
         nowTs = int(g_pToolManager.dateTime().now().timestamp())
-
         time = int(plantCfg.get("time", 0))
-        percent = await cls.getSoilLevelTime(soilInfo.get("soilLevel", 0))
+        plantId = int(plantCfg["id"])
 
-        # 处理土地等级带来的时间缩短
-        time = math.floor(time * (100 + percent) // 100)
+        async with cls._transaction():
+            row = await cls.queryOne("userSoil.soilNumber", (uid,), cls.m_pDB)
+            soilNumber = row[0] if row else 0
+
+            seedCount = await g_pDBService.userSeed.getUserSeedByName(uid, plantName)
+            count = min(count, seedCount or 0)
+            if soilNumber <= 0 or count <= 0:
+                return []
+
+            soils = {
+                row["soilIndex"]: row
+                for row in await cls.queryAll(
+                    "userSoil.sowable", (uid, soilNumber), cls.m_pDB
+                )
+            }
 
-        matureTs = nowTs + time * 3600
+            rows = [
+                (uid, soilIndex, plantId, plantTime, matureTime, level)
+                for soilIndex, plantTime, matureTime, level in await cls._sowPlots(
+                    soils, soilNumber, count, time, nowTs
+                )
+            ]
 
-        try:
-            async with cls._transaction():
-                prev = soilInfo or {}
-                await cls._deleteUserSoil(uid, soilIndex)
-                await cls._insertUserSoil(
-                    {
-                        "uid": uid,
-                        "soilIndex": soilIndex,
-                        "plantName": plantName,
-                        "plantTime": nowTs,
-                        "matureTime": matureTs,
-                        "soilLevel": prev.get("soilLevel", 0),
-                        "wiltStatus": 0,
-                        "fertilizerStatus": 0,
-                        "bugStatus": 0,
-                        "weedStatus": 0,
-                        "waterStatus": 0,
-                        "harvestCount": 0,
-                        "isSoilPlanted": 1,
-                    }
+            if not rows:
+                return []
+
+            # 除土地等级外其余状态全部重置 与逐块删除后重新插入等价
+            await cls.executeStatementMany("userSoil.sow", rows)
+
+            if not await g_pDBService.userSeed.addUserSeedsByUid(
+                uid, {plantName: -len(rows)}
+            ):
+                raise RuntimeError(f"扣除种子失败: {uid} {plantName}")
+
+        return [row[1] for row in rows]
+
+    @classmethod
+    async def _sowPlots(
+        cls, soils: dict, soilNumber: int, count: int, time: int, nowTs: int
+    ) -> list[tuple]:
+        """按地块索引升序选出空闲土地，并按土地等级计算成熟时间
+
+        Args:
+            soils (dict): 地块索引 -> 地块，无记录的土地视为空闲的普通土地
+            soilNumber (int): 已开垦土地数量
+            count (int): 最多播种的土地数量
+            time (int): 作物成熟所需小时数
+            nowTs (int): 当前时间戳
+
+        Returns:
+            list[tuple]: 每项为 (soilIndex, plantTime, matureTime, soilLevel)
+        """
+        timePercent = {}  # 土地等级 -> 播种时间变化比例
+        plots = []
+        for i in range(1, soilNumber + 1):
+            if len(plots) >= count:
+                break
+
+            soil = soils.get(i)
+            if soil and soil["plantId"]:
+                continue
+
+            level = (soil["soilLevel"] or 0) if soil else 0
+            if level not in timePercent:
+                timePercent[level] = await cls.getSoilLevelTime(level)
+
+            # 处理土地等级带来的时间缩短
+            matureTs = (
+                nowTs + math.floor(time * (100 + timePercent[level]) // 100) * 3600
+            )
+
+            plots.append((i, nowTs, matureTs, level))
+
+        return plots
+
+    @classmethod
+    async def eradicateWithered(cls, uid: str) -> list[int]:
+        """铲除用户全部枯萎作物并清空对应地块的偷菜记录
+
+        地块只重置作物相关状态，土地等级保留
+
+        Args:
+            uid (str): 用户ID
+
+        Returns:
+            list[int]: 被铲除的土地索引，按升序排列
+        """
+        async with cls._transaction():
+            indices = sorted(
+                row[0]
+                for row in await cls.queryAll(
+                    "userSoil.eradicate", (uid, uid), cls.m_pDB
                 )
-            return True
-        except Exception as e:
-            logger.error("播种失败！", e=e)
-            return False
+            )
+
+            if indices:
+                await cls.executeStatementMany(
+                    "userSteal.deletePlot", [(uid, i) for i in indices]
+                )
+
+        return indices
+
+    @classmethod
+    async def getMatureTimes(cls, uid: str) -> dict[int, int]:
+        """获取用户全部地块的成熟时间，用于判断偷菜记录是否属于本季之前
+
+        Args:
+            uid (str): 用户Uid
+
+        Returns:
+            dict[int, int]: 地块索引 -> 成熟时间
+        """
+        rows = await cls.queryAll("userSoil.matureTimes", (uid,), cls.m_pDB)
+        return {row[0]: row[1] or 0 for row in rows}
+
+    @classmethod
+    async def importSoils(cls, rows: list[dict]):
+        """导入地块，已存在的地块整块覆盖，需在事务中调用
+
+        Args:
+            rows (list[dict]): 地块字段字典，字段与 userSoil 表一致，缺少的字段取0
+        """
+        columns = CSoilRow.columns()
+        await cls.executeStatementMany(
+            "userSoil.replace",
+            [tuple(row.get(column, 0) for column in columns) for row in rows],
+        )
+
+    @classmethod
+    async def getSnapshotSoils(
+        cls, db, uid: str, soilNumber: int, stealerUid: str = ""
+    ) -> list:
+        """读取农场快照所需的全部已开垦地块
+
+        Args:
+            db (aiosqlite.Connection): 读取用户信息所用的连接
+            uid (str): 用户Uid
+            soilNumber (int): 已开垦土地数量
+            stealerUid (str): 偷菜用户Uid 不为空时标记其偷过的地块
+
+        Returns:
+            list: 地块记录，额外包含 isStolenByStealer
+        """
+        # 被偷统计直接取自地块 仅偷菜时才查询偷菜记录判断是否偷过
+        if stealerUid:
+            return await cls.queryAll(
+                "userSoil.snapshotByStealer", (stealerUid, uid, soilNumber), db
+            )
+
+        return await cls.queryAll("userSoil.snapshot", (uid, soilNumber), db)
+
+    @classmethod
+    async def _changeStolen(
+        cls, uid: str, soilIndex: int, stolenDelta: int, stealerDelta: int
+    ):
+        """增减地块的被偷数量与偷菜人数，随偷菜记录在同一事务中调用
+
+        Args:
+            uid (str): 用户Uid
+            soilIndex (int): 土地索引
+            stolenDelta (int): 被偷数量变化
+            stealerDelta (int): 偷菜人数变化
+        """
+        await cls.executeStatement(
+            "userSoil.changeStolen", (stolenDelta, stealerDelta, uid, soilIndex)
+        )
+
+    @classmethod
+    async def _resetStolen(cls, uid: str, soilIndex: int):
+        """清零地块的被偷数量与偷菜人数
+
+        Args:
+            uid (str): 用户Uid
+            soilIndex (int): 土地索引
+        """
+        await cls.executeStatement("userSoil.resetStolen", (uid, soilIndex))
+
+    @classmethod
+    async def convertStorage(cls) -> int:
+        """将打包存储中的农场转换为逐块存储，切换存储方式后启动时调用
+
+        Returns:
+            int: 转换的用户数量
+        """
+        from .userSoilPacked import CUserSoilPackedDB
+
+        return await CUserSoilPackedDB.unpackFarms()
 
     @classmethod
     async def getUserSoilStatus(cls, uid: str, soilIndex: int) -> str:
-        status = []
         soilInfo = await g_pDBService.userSoil.getUserSoil(uid, soilIndex)
 
         if not soilInfo:
             return ""
 
-        if soilInfo.get("wiltStatus", 0) == 1:
+        return await cls.getSoilStatusText(
+            soilInfo.get("wiltStatus", 0),
+            soilInfo.get("fertilizerStatus", 0),
+            soilInfo.get("bugStatus", 0),
+            soilInfo.get("weedStatus", 0),
+            soilInfo.get("waterStatus", 0),
+        )
+
+    @classmethod
+    async def getSoilStatusText(
+        cls,
+        wiltStatus: int,
+        fertilizerStatus: int,
+        bugStatus: int,
+        weedStatus: int,
+        waterStatus: int,
+    ) -> str:
+        """根据土地各项状态获取状态文本
+
+        Args:
+            wiltStatus (int): 枯萎状态
+            fertilizerStatus (int): 施肥状态
+            bugStatus (int): 虫害状态
+            weedStatus (int): 杂草状态
+            waterStatus (int): 缺水状态
+
+        Returns:
+            str:
+        """
+        status = []
+
+        if wiltStatus == 1:
             return "枯萎"
 
-        if soilInfo.get("fertilizerStatus", 0) == 1:
+        if fertilizerStatus == 1:
             status.append("施肥")
-        elif soilInfo.get("fertilizerStatus", 0) == 2:
+        elif fertilizerStatus == 2:
             status.append("增肥")
 
-        if soilInfo.get("bugStatus", 0) == 1:
+        if bugStatus == 1:
             status.append("虫害")
 
-        if soilInfo.get("weedStatus", 0) == 1:
+        if weedStatus == 1:
             status.append("杂草")
 
-        if soilInfo.get("waterStatus", 0) == 1:
+        if waterStatus == 1:
             status.append("缺水")
 
         return ",".join(status)
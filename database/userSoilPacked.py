@@ -0,0 +1,782 @@
+import struct
+from contextlib import asynccontextmanager
+from typing import ClassVar
+
+from astrbot.api import logger
+
+from ..dbService import g_pDBService
+from ..tool import g_pToolManager
+from .record import CSoilRow
+from .statement import g_pStatementRegistry
+from .userSoil import CUserSoilDB
+
+g_pStatementRegistry.register(
+    "userSoilPacked.load", "SELECT soils FROM userSoilPacked WHERE uid = ?"
+)
+g_pStatementRegistry.register(
+    "userSoilPacked.save",
+    "INSERT INTO userSoilPacked (uid, soils) VALUES (?, ?) "
+    "ON CONFLICT(uid) DO UPDATE SET soils = excluded.soils",
+)
+g_pStatementRegistry.register(
+    "userSoilPacked.delete", "DELETE FROM userSoilPacked WHERE uid = ?"
+)
+
+
+class CUserSoilPackedDB(CUserSoilDB):
+    """以打包方式存储地块的存储引擎
+
+    每个用户的全部地块编码为一条定长记录存放在 userSoilPacked 的一行中，
+    读取整块农场只需按主键读取一行，接口与 CUserSoilDB 一致，调用方无需区分
+    """
+
+    m_sEngine = "packed"
+
+    # 当前写入的记录布局版本 读取时按记录头中的版本解码 旧版本记录在下次写入时升级
+    m_iLayout = 1
+
+    # 记录头 (布局版本, 地块数量)
+    m_pHeader = struct.Struct("<BB")
+
+    # 布局版本 -> (地块结构, 字段名) 每块地按字段顺序定长编码
+    m_pLayouts: ClassVar[dict[int, tuple[struct.Struct, tuple[str, ...]]]] = {
+        1: (
+            struct.Struct("<BHqqBBBBBBHbHH"),
+            (
+                "soilIndex",
+                "plantId",
+                "plantTime",
+                "matureTime",
+                "soilLevel",
+                "wiltStatus",
+                "fertilizerStatus",
+                "bugStatus",
+                "weedStatus",
+                "waterStatus",
+                "harvestCount",
+                "isSoilPlanted",  # 空值编码为 -1
+                "stolenTotal",
+                "stealerCount",
+            ),
+        ),
+    }
+
+    # 地块表中除 uid 外的全部字段 转换存储方式时按此顺序读写
+    m_pColumns = m_pLayouts[1][1]
+
+    # 每批转换的用户数量
+    m_iConvertBatch = 500
+
+    @classmethod
+    async def initDB(cls):
+        userSoilPacked = {
+            # 每条记录约1KB 超过 WITHOUT ROWID 适合的行大小 故使用普通表
+            "uid": "TEXT PRIMARY KEY",  # 用户Uid
+            "soils": "BLOB NOT NULL",  # 全部地块的打包记录
+        }
+        await cls.ensureTableSchema("userSoilPacked", userSoilPacked)
+
+    @classmethod
+    def packPlots(cls, plots: dict[int, dict]) -> bytes:
+        """将用户全部地块编码为当前布局的打包记录
+
+        Args:
+            plots (dict[int, dict]): 地块索引 -> 地块字段字典
+
+        Returns:
+            bytes: 打包记录
+        """
+        plot, fields = cls.m_pLayouts[cls.m_iLayout]
+
+        data = bytearray(cls.m_pHeader.pack(cls.m_iLayout, len(plots)))
+        for soilIndex in sorted(plots):
+            soil = plots[soilIndex]
+            values = []
+            for field in fields:
+                value = soil.get(field)
+                if field == "isSoilPlanted":
+                    values.append(-1 if value is None else int(value))
+                else:
+                    values.append(int(value or 0))
+            data += plot.pack(*values)
+
+        return bytes(data)
+
+    @classmethod
+    def unpackPlots(cls, uid: str, data: bytes) -> dict[int, dict]:
+        """解码打包记录
+
+        Args:
+            uid (str): 用户Uid
+            data (bytes): 打包记录
+
+        Returns:
+            dict[int, dict]: 地块索引 -> 地块字段字典，字段与 userSoil 表一致
+        """
+        layout, count = cls.m_pHeader.unpack_from(data)
+        if layout not in cls.m_pLayouts:
+            raise ValueError(f"未知的地块记录布局: {uid} {layout}")
+
+        plot, fields = cls.m_pLayouts[layout]
+
+        plots = {}
+        for values in plot.iter_unpack(
+            data[cls.m_pHeader.size : cls.m_pHeader.size + plot.size * count]
+        ):
+            soil = {"uid": uid, **dict(zip(fields, values))}
+            if soil["isSoilPlanted"] == -1:
+                soil["isSoilPlanted"] = None
+            plots[soil["soilIndex"]] = soil
+
+        return plots
+
+    @classmethod
+    def _newPlot(cls, uid: str, soilIndex: int) -> dict:
+        """生成全部字段为默认值的地块"""
+        soil = {field: 0 for field in cls.m_pColumns}
+        soil.update(uid=uid, soilIndex=soilIndex)
+        return soil
+
+    @classmethod
+    async def _loadPlots(cls, uid: str) -> dict[int, dict]:
+        """读取用户全部地块，事务内读取写连接
+
+        Args:
+            uid (str): 用户Uid
+
+        Returns:
+            dict[int, dict]: 地块索引 -> 地块字段字典，无记录返回空字典
+        """
+        row = await cls.queryOne("userSoilPacked.load", (uid,))
+        return cls.unpackPlots(uid, row[0]) if row else {}
+
+    @classmethod
+    async def _savePlots(cls, uid: str, plots: dict[int, dict]):
+        """写回用户全部地块，无地块时删除整条记录
+
+        Args:
+            uid (str): 用户Uid
+            plots (dict[int, dict]): 地块索引 -> 地块字段字典
+        """
+        if not plots:
+            await cls.executeStatement("userSoilPacked.delete", (uid,))
+            return
+
+        await cls.executeStatement("userSoilPacked.save", (uid, cls.packPlots(plots)))
+
+    @classmethod
+    @asynccontextmanager
+    async def _modifyPlots(cls, uid: str):
+        """在事务中读出用户全部地块，退出时写回
+
+        Args:
+            uid (str): 用户Uid
+
+        Yields:
+            dict[int, dict]: 可直接修改的地块索引 -> 地块字段字典
+        """
+        async with cls._transaction():
+            plots = await cls._loadPlots(uid)
+            packed = cls.packPlots(plots)
+
+            yield plots
+
+            # 未发生变化的农场不再写回
+            if cls.packPlots(plots) != packed:
+                await cls._savePlots(uid, plots)
+
+    @classmethod
+    async def _getSoilNumber(cls, uid: str) -> int:
+        row = await cls.queryOne("userSoil.soilNumber", (uid,), cls.m_pDB)
+        return row[0] if row else 0
+
+    @classmethod
+    async def insertUserSoil(cls, soilInfo: dict):
+        """插入一条新的地块记录
+
+        Args:
+            soilInfo (dict): 新土地数据
+        """
+        await cls._insertUserSoil(soilInfo)
+
+    @classmethod
+    async def _insertUserSoil(cls, soilInfo: dict):
+        """插入一条新的地块记录
+
+        Args:
+            soilInfo (dict): 新土地数据
+
+        Raises:
+            ValueError: 地块已存在
+        """
+        soilInfo = cls._soilValues(soilInfo)
+        uid = soilInfo["uid"]
+        soilIndex = soilInfo["soilIndex"]
+
+        async with cls._modifyPlots(uid) as plots:
+            if soilIndex in plots:
+                raise ValueError(f"地块已存在: {uid} {soilIndex}")
+
+            soil = cls._newPlot(uid, soilIndex)
+            soil.update(
+                {k: v for k, v in soilInfo.items() if k in cls.m_pColumns},
+            )
+            plots[soilIndex] = soil
+
+    @classmethod
+    async def getUserSoil(cls, uid: str, soilIndex: int) -> CSoilRow | dict:
+        """获取指定用户某块土地的详细信息
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+
+        Returns:
+            CSoilRow | dict: 记录存在返回地块记录，否则返回空字典
+        """
+        return await cls._getUserSoil(uid, soilIndex) or {}
+
+    @classmethod
+    async def _getUserSoil(cls, uid: str, soilIndex: int) -> CSoilRow | None:
+        """获取指定用户某块土地的详细信息
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+
+        Returns:
+            CSoilRow | None: 记录存在返回地块记录，否则返回 None
+        """
+        soil = (await cls._loadPlots(uid)).get(soilIndex)
+        if not soil:
+            return None
+        return cls._soilRow(CSoilRow(**soil))
+
+    @classmethod
+    async def countSoilByLevel(cls, uid: str, soilLevel: int) -> int:
+        """统计指定用户在指定土地等级的土地数量
+
+        Args:
+            uid (str): 用户ID
+            soilLevel (int): 土地等级
+
+        Returns:
+            int: 符合条件的土地数量
+        """
+        plots = await cls._loadPlots(uid)
+        return sum(1 for soil in plots.values() if soil["soilLevel"] == soilLevel)
+
+    @classmethod
+    async def updateUserSoil(cls, uid: str, soilIndex: int, field: str, value):
+        """更新指定用户土地的单个字段
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+            field (str): 需更新的字段名
+            value: 新值
+        """
+        await cls._updateUserSoil(uid, soilIndex, field, value)
+
+    @classmethod
+    async def _updateUserSoil(cls, uid: str, soilIndex: int, field: str, value):
+        """更新指定用户土地的单个字段
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+            field (str): 需更新的字段名
+            value: 新值
+
+        Raises:
+            ValueError: 字段不允许修改
+        """
+        ((field, value),) = cls._soilValues({field: value}).items()
+        if field not in cls.m_pUpdatableFields:
+            raise ValueError(f"未知的土地字段: {field}")
+
+        async with cls._modifyPlots(uid) as plots:
+            if soilIndex in plots:
+                plots[soilIndex][field] = value
+
+    @classmethod
+    async def updateUserSoilFields(
+        cls, uid: str, soilIndex: int, updates: dict
+    ) -> bool:
+        """批量更新指定用户土地的多个字段
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+            updates (dict): 字段-新值的字典
+
+        Returns:
+            bool: 如果无可更新字段则返回 False，否则更新成功返回 True
+        """
+        updates = cls._soilValues(updates)
+        values = {
+            field: updates[field]
+            for field in cls.m_pUpdatableFields
+            if field in updates
+        }
+        if not values:
+            return False
+
+        try:
+            async with cls._modifyPlots(uid) as plots:
+                if soilIndex in plots:
+                    plots[soilIndex].update(values)
+            return True
+        except Exception as e:
+            logger.error(f"批量更新土地字段失败: {e}")
+            return False
+
+    @classmethod
+    async def deleteUserSoil(cls, uid: str, soilIndex: int):
+        """删除指定用户的土地记录
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+        """
+        await cls._deleteUserSoil(uid, soilIndex)
+
+    @classmethod
+    async def _deleteUserSoil(cls, uid: str, soilIndex: int):
+        """删除指定用户的土地记录
+
+        Args:
+            uid (str): 用户ID
+            soilIndex (int): 土地索引
+        """
+        async with cls._modifyPlots(uid) as plots:
+            plots.pop(soilIndex, None)
+
+    @classmethod
+    async def harvestMany(cls, uid: str) -> list[dict]:
+        """一次收获用户全部成熟地块
+
+        读出整块农场后筛选已开垦、已种植、未枯萎且已成熟的地块，
+        收获计算与逐块存储一致，结果随农场一次写回
+
+        Args:
+            uid (str): 用户Uid
+
+        Returns:
+            list[dict]: 按地块索引升序的收获结果，
+                每项包含 soilIndex, plantName, number, experience, soilLevel
+        """
+        nowTs = int(g_pToolManager.dateTime().now().timestamp())
+
+        async with cls._transaction():
+            soilNumber = await cls._getSoilNumber(uid)
+
+            async with cls._modifyPlots(uid) as plots:
+                rows = [
+                    soil
+                    for soilIndex, soil in sorted(plots.items())
+                    if soilIndex <= soilNumber
+                    and (soil["isSoilPlanted"] is None or soil["isSoilPlanted"] != 0)
+                    and soil["wiltStatus"] != 1
+                    and soil["plantId"] != 0
+                    and soil["matureTime"] <= nowTs
+                ]
+
+                harvested, updates = await cls._harvestPlots(rows, nowTs)
+
+                regrown = []
+                for soilIndex, wilt, harvestCount, plantTime, matureTime in updates:
+                    plots[soilIndex].update(
+                        wiltStatus=wilt,
+                        harvestCount=harvestCount,
+                        plantTime=plantTime,
+                        matureTime=matureTime,
+                    )
+
+                    # 重新生长的地块进入新的一季 清空被偷统计与偷菜记录
+                    if wilt == 0:
+                        plots[soilIndex].update(stolenTotal=0, stealerCount=0)
+                        regrown.append((uid, soilIndex))
+
+                if regrown:
+                    await cls.executeStatementMany("userSteal.deletePlot", regrown)
+
+        return harvested
+
+    @classmethod
+    async def sowMany(cls, uid: str, plantName: str, count: int) -> list[int]:
+        """批量播种指定作物到用户的空闲土地，并扣除相应种子
+
+        选地、按土地等级计算成熟时间、写入地块与扣除种子在同一事务中完成
+
+        Args:
+            uid (str): 用户ID
+            plantName (str): 植物名
+            count (int): 最多播种的土地数量，超过仓库种子数量时以种子数量为准
+
+        Returns:
+            list[int]: 成功播种的土地索引，按升序排列
+        """
+        plantCfg = g_pDBService.plant.m_pCatalog.plant(plantName)
+        if not plantCfg:
+            logger.error(f"未知植物: {plantName}")
+            return []
+
+        nowTs = int(g_pToolManager.dateTime().now().timestamp())
+        time = int(plantCfg.get("time", 0))
+        plantId = int(plantCfg["id"])
+
+        async with cls._transaction():
+            soilNumber = await cls._getSoilNumber(uid)
+
+            seedCount = await g_pDBService.userSeed.getUserSeedByName(uid, plantName)
+            count = min(count, seedCount or 0)
+            if soilNumber <= 0 or count <= 0:
+                return []
+
+            async with cls._modifyPlots(uid) as plots:
+                sown = await cls._sowPlots(plots, soilNumber, count, time, nowTs)
+
+                # 除土地等级外其余状态全部重置 与逐块删除后重新插入等价
+                for soilIndex, plantTime, matureTime, level in sown:
+                    soil = cls._newPlot(uid, soilIndex)
+                    soil.update(
+                        plantId=plantId,
+                        plantTime=plantTime,
+                        matureTime=matureTime,
+                        soilLevel=level,
+                        isSoilPlanted=1,
+                    )
+                    plots[soilIndex] = soil
+
+            if not sown:
+                return []
+
+            if not await g_pDBService.userSeed.addUserSeedsByUid(
+                uid, {plantName: -len(sown)}
+            ):
+                raise RuntimeError(f"扣除种子失败: {uid} {plantName}")
+
+        return [plot[0] for plot in sown]
+
+    @classmethod
+    async def eradicateWithered(cls, uid: str) -> list[int]:
+        """铲除用户全部枯萎作物并清空对应地块的偷菜记录
+
+        地块只重置作物相关状态，土地等级保留
+
+        Args:
+            uid (str): 用户ID
+
+        Returns:
+            list[int]: 被铲除的土地索引，按升序排列
+        """
+        async with cls._transaction():
+            soilNumber = await cls._getSoilNumber(uid)
+
+            async with cls._modifyPlots(uid) as plots:
+                indices = [
+                    soilIndex
+                    for soilIndex, soil in sorted(plots.items())
+                    if soilIndex <= soilNumber
+                    and (soil["isSoilPlanted"] is None or soil["isSoilPlanted"] != 0)
+                    and soil["wiltStatus"] != 0
+                ]
+
+                for soilIndex in indices:
+                    plots[soilIndex].update(
+                        plantId=0,
+                        plantTime=0,
+                        matureTime=0,
+                        wiltStatus=0,
+                        isSoilPlanted=0,
+                        stolenTotal=0,
+                        stealerCount=0,
+                    )
+
+            if indices:
+                await cls.executeStatementMany(
+                    "userSteal.deletePlot", [(uid, i) for i in indices]
+                )
+
+        return indices
+
+    @classmethod
+    async def stealMany(cls, uid: str, stealerUid: str, random) -> dict:
+        """偷取用户全部可偷的成熟地块
+
+        在写事务中读出整块农场后逐块扣减，事务期间其他写入无法穿插，
+        无需逐块带条件更新，偷菜记录与地块在同一事务中写入
+
+        Args:
+            uid (str): 被偷用户Uid
+            stealerUid (str): 偷菜用户Uid
+            random: 偷取数量的随机源
+
+        Returns:
+            dict: {"stolen": [(soilIndex, plantName, number), ...], "repeat": 已偷过的地块数}
+        """
+        catalog = g_pDBService.plant.m_pCatalog
+        nowTs = int(g_pToolManager.dateTime().now().timestamp())
+
+        async with cls._transaction():
+            soilNumber = await cls._getSoilNumber(uid)
+
+            rows = await cls.queryAll(
+                "userSteal.byStealer", (uid, stealerUid), cls.m_pDB
+            )
+            stolenBefore = {row[0] for row in rows}
+
+            repeat = 0
+            stolen = []
+            ledger = []
+            cleared = []
+            async with cls._modifyPlots(uid) as plots:
+                for soilIndex, soil in sorted(plots.items()):
+                    if (
+                        soilIndex > soilNumber
+                        or soil["isSoilPlanted"] == 0
+                        or soil["wiltStatus"] == 1
+                        or not soil["plantId"]
+                        or soil["matureTime"] > nowTs
+                    ):
+                        continue
+
+                    plantInfo = catalog.plantById(soil["plantId"])
+                    if not plantInfo:
+                        continue
+
+                    # 如果偷过，则跳过该土地
+                    if soilIndex in stolenBefore:
+                        repeat += 1
+                        continue
+
+                    remaining = plantInfo["harvest"] - soil["stolenTotal"]
+                    number = min(random.choice([1, 2]), remaining)
+                    if number <= 0:
+                        continue
+
+                    plantName = plantInfo["name"]
+                    stolen.append((soilIndex, plantName, number))
+                    soil["stolenTotal"] += number
+                    soil["stealerCount"] += 1
+
+                    # 未偷完只记录偷菜用户
+                    if soil["stolenTotal"] < plantInfo["harvest"]:
+                        ledger.append((uid, soilIndex, stealerUid, number, nowTs))
+                        continue
+
+                    # 偷完后 最后一季直接枯萎 否则进入下一季并清空本季偷菜统计
+                    if soil["harvestCount"] + 1 >= plantInfo["crop"]:
+                        ledger.append((uid, soilIndex, stealerUid, number, nowTs))
+                        soil["wiltStatus"] = 1
+                    else:
+                        p1, p2, *rest = catalog.phase(plantName)
+                        soil.update(
+                            harvestCount=soil["harvestCount"] + 1,
+                            plantTime=nowTs - p1 - p2,
+                            matureTime=nowTs + p2 + sum(rest),
+                            stolenTotal=0,
+                            stealerCount=0,
+                        )
+                        cleared.append((uid, soilIndex))
+
+            if ledger:
+                await cls.executeStatementMany("userSteal.insert", ledger)
+
+            if cleared:
+                await cls.executeStatementMany("userSteal.deletePlot", cleared)
+
+        return {"stolen": stolen, "repeat": repeat}
+
+    @classmethod
+    async def getMatureTimes(cls, uid: str) -> dict[int, int]:
+        plots = await cls._loadPlots(uid)
+        return {soilIndex: soil["matureTime"] for soilIndex, soil in plots.items()}
+
+    @classmethod
+    async def importSoils(cls, rows: list[dict]):
+        # 同一用户的地块合并到已有的打包记录中 每个用户只写回一次
+        farms: dict[str, list[dict]] = {}
+        for row in rows:
+            farms.setdefault(row["uid"], []).append(row)
+
+        for uid, soils in farms.items():
+            plots = await cls._loadPlots(uid)
+            for soil in soils:
+                plot = cls._newPlot(uid, soil["soilIndex"])
+                plot.update(
+                    {field: soil[field] for field in cls.m_pColumns if field in soil}
+                )
+                plots[plot["soilIndex"]] = plot
+
+            await cls._savePlots(uid, plots)
+
+    @classmethod
+    async def getSnapshotSoils(
+        cls, db, uid: str, soilNumber: int, stealerUid: str = ""
+    ) -> list:
+        """读取农场快照所需的全部已开垦地块
+
+        Args:
+            db (aiosqlite.Connection): 读取用户信息所用的连接
+            uid (str): 用户Uid
+            soilNumber (int): 已开垦土地数量
+            stealerUid (str): 偷菜用户Uid 不为空时标记其偷过的地块
+
+        Returns:
+            list: 地块字段字典，额外包含 isStolenByStealer
+        """
+        row = await cls.queryOne("userSoilPacked.load", (uid,), db)
+        if not row:
+            return []
+
+        stolenBefore = set()
+        if stealerUid:
+            rows = await cls.queryAll("userSteal.byStealer", (uid, stealerUid), db)
+            stolenBefore = {stolen[0] for stolen in rows}
+
+        soils = []
+        for soilIndex, soil in sorted(cls.unpackPlots(uid, row[0]).items()):
+            if soilIndex > soilNumber:
+                break
+
+            soil["isStolenByStealer"] = soilIndex in stolenBefore
+            soils.append(soil)
+
+        return soils
+
+    @classmethod
+    async def _changeStolen(
+        cls, uid: str, soilIndex: int, stolenDelta: int, stealerDelta: int
+    ):
+        """增减地块的被偷数量与偷菜人数，随偷菜记录在同一事务中调用
+
+        Args:
+            uid (str): 用户Uid
+            soilIndex (int): 土地索引
+            stolenDelta (int): 被偷数量变化
+            stealerDelta (int): 偷菜人数变化
+        """
+        async with cls._modifyPlots(uid) as plots:
+            soil = plots.get(soilIndex)
+            if soil:
+                soil["stolenTotal"] += stolenDelta
+                soil["stealerCount"] += stealerDelta
+
+    @classmethod
+    async def _resetStolen(cls, uid: str, soilIndex: int):
+        """清零地块的被偷数量与偷菜人数
+
+        Args:
+            uid (str): 用户Uid
+            soilIndex (int): 土地索引
+        """
+        async with cls._modifyPlots(uid) as plots:
+            soil = plots.get(soilIndex)
+            if soil:
+                soil.update(stolenTotal=0, stealerCount=0)
+
+    @classmethod
+    async def convertStorage(cls) -> int:
+        """将逐块存储中的地块转换为打包存储，切换存储方式后启动时调用
+
+        Returns:
+            int: 转换的用户数量
+        """
+        return await cls.packFarms()
+
+    @classmethod
+    async def packFarms(cls) -> int:
+        """将 userSoil 中的地块按用户打包写入 userSoilPacked
+
+        按批次转换，每批在一个事务中写入打包记录并删除原地块，中断后重启可继续
+
+        Returns:
+            int: 转换的用户数量
+        """
+        columns = ", ".join(cls.m_pColumns)
+        total = 0
+
+        while True:
+            async with cls._transaction():
+                async with cls.m_pDB.execute(
+                    "SELECT DISTINCT uid FROM userSoil LIMIT ?",
+                    (cls.m_iConvertBatch,),
+                ) as cursor:
+                    uids = [row[0] for row in await cursor.fetchall()]
+                if not uids:
+                    break
+
+                placeholders = ", ".join("?" for _ in uids)
+                async with cls.m_pDB.execute(
+                    f"SELECT uid, {columns} FROM userSoil WHERE uid IN ({placeholders})",
+                    uids,
+                ) as cursor:
+                    rows = await cursor.fetchall()
+
+                farms: dict[str, dict[int, dict]] = {}
+                for row in rows:
+                    farms.setdefault(row["uid"], {})[row["soilIndex"]] = dict(row)
+
+                await cls.m_pDB.executemany(
+                    "INSERT INTO userSoilPacked (uid, soils) VALUES (?, ?) "
+                    "ON CONFLICT(uid) DO UPDATE SET soils = excluded.soils",
+                    [(uid, cls.packPlots(plots)) for uid, plots in farms.items()],
+                )
+                await cls.m_pDB.execute(
+                    f"DELETE FROM userSoil WHERE uid IN ({placeholders})", uids
+                )
+
+            total += len(uids)
+
+        if total:
+            logger.info(f"真寻农场已将 {total} 个用户的土地转换为打包存储")
+        return total
+
+    @classmethod
+    async def unpackFarms(cls) -> int:
+        """将 userSoilPacked 中的打包记录展开写回 userSoil
+
+        按批次转换，每批在一个事务中写入地块并删除打包记录，中断后重启可继续
+
+        Returns:
+            int: 转换的用户数量
+        """
+        # 尚未建立打包表时无需转换
+        if not await cls.getTableInfo("userSoilPacked"):
+            return 0
+
+        columns = ", ".join(cls.m_pColumns)
+        values = ", ".join("?" for _ in cls.m_pColumns)
+        total = 0
+
+        while True:
+            async with cls._transaction():
+                async with cls.m_pDB.execute(
+                    "SELECT uid, soils FROM userSoilPacked LIMIT ?",
+                    (cls.m_iConvertBatch,),
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                if not rows:
+                    break
+
+                await cls.m_pDB.executemany(
+                    f"INSERT OR REPLACE INTO userSoil (uid, {columns}) "
+                    f"VALUES (?, {values})",
+                    [
+                        (uid, *(soil[field] for field in cls.m_pColumns))
+                        for uid, data in rows
+                        for soil in cls.unpackPlots(uid, data).values()
+                    ],
+                )
+                await cls.m_pDB.executemany(
+                    "DELETE FROM userSoilPacked WHERE uid = ?",
+                    [(row[0],) for row in rows],
+                )
+
+            total += len(rows)
+
+        if total:
+            logger.info(f"真寻农场已将 {total} 个用户的土地转换为逐块存储")
+        return total
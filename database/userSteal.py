@@ -1,9 +1,89 @@
+import random
+
 from astrbot.api import logger
 
+from ..dbService import g_pDBService
+from ..tool import g_pToolManager
 from .database import CSqlManager
+from .statement import g_pStatementRegistry
+
+g_pStatementRegistry.register(
+    "userSteal.insert",
+    'INSERT INTO "userSteal"(uid, soilIndex, stealerUid, stealCount, stealTime) '
+    "VALUES(?, ?, ?, ?, ?)",
+)
+g_pStatementRegistry.register(
+    "userSteal.deletePlot", 'DELETE FROM "userSteal" WHERE uid = ? AND soilIndex = ?'
+)
+g_pStatementRegistry.register(
+    "userSteal.deleteOne",
+    'DELETE FROM "userSteal" WHERE uid = ? AND soilIndex = ? AND stealerUid = ?',
+)
+g_pStatementRegistry.register(
+    "userSteal.uidsAfter",
+    'SELECT DISTINCT uid FROM "userSteal" WHERE uid > ? ORDER BY uid LIMIT ?',
+)
+g_pStatementRegistry.register(
+    "userSteal.byUid",
+    'SELECT soilIndex, stealerUid, stealCount, stealTime FROM "userSteal" WHERE uid = ?',
+)
+g_pStatementRegistry.register(
+    "userSteal.byPlot",
+    'SELECT stealerUid, stealCount, stealTime FROM "userSteal" '
+    "WHERE uid = ? AND soilIndex = ?",
+)
+g_pStatementRegistry.register(
+    "userSteal.byStealer",
+    'SELECT soilIndex FROM "userSteal" WHERE uid = ? AND stealerUid = ?',
+)
+g_pStatementRegistry.register(
+    "userSteal.exists",
+    'SELECT 1 FROM "userSteal" WHERE uid = ? AND soilIndex = ? AND stealerUid = ? LIMIT 1',
+)
+g_pStatementRegistry.register(
+    "userSteal.stealCount",
+    'SELECT stealCount FROM "userSteal" '
+    "WHERE uid = ? AND soilIndex = ? AND stealerUid = ?",
+)
+g_pStatementRegistry.register(
+    "userSteal.update",
+    'UPDATE "userSteal" SET stealCount = ?, stealTime = ? '
+    "WHERE uid = ? AND soilIndex = ? AND stealerUid = ?",
+)
+g_pStatementRegistry.register(
+    "userSteal.stealable",
+    """
+    SELECT s.soilIndex, s.plantId, s.stolenTotal,
+           EXISTS (
+               SELECT 1 FROM userSteal t
+               WHERE t.uid = s.uid AND t.soilIndex = s.soilIndex
+                 AND t.stealerUid = ?
+           ) AS isStolenByStealer
+    FROM userSoil s
+    JOIN user u ON u.uid = s.uid
+    WHERE s.uid = ? AND s.soilIndex <= u.soil
+      AND IFNULL(s.isSoilPlanted, 1) != 0
+      AND IFNULL(s.wiltStatus, 0) != 1
+      AND s.plantId != 0
+      AND s.matureTime <= ?
+    ORDER BY s.soilIndex
+    """,
+)
+g_pStatementRegistry.register(
+    "userSteal.wilt",
+    "UPDATE userSoil SET wiltStatus = 1 WHERE uid = ? AND soilIndex = ?",
+)
+g_pStatementRegistry.register(
+    "userSteal.regrow",
+    "UPDATE userSoil SET harvestCount = ?, plantTime = ?, matureTime = ?, "
+    "stolenTotal = 0, stealerCount = 0 WHERE uid = ? AND soilIndex = ?",
+)
 
 
 class CUserStealDB(CSqlManager):
+    # 偷取数量的随机源 测试时可替换为固定种子的 random.Random
+    m_pRandom = random
+
     @classmethod
     async def initDB(cls):
         userSteal = {
@@ -16,11 +96,19 @@ class CUserStealDB(CSqlManager):
         }
         await cls.ensureTableSchema("userSteal", userSteal)
 
+    @classmethod
+    async def initIndex(cls):
+        userStealIndex = {
+            # 按地块统计被偷数量、偷菜人数及是否偷过 覆盖索引无需回表
+            "idxUserStealPlot": "(uid, soilIndex, stealerUid, stealCount)",
+        }
+        await cls.ensureTableIndexes("userSteal", userStealIndex)
+
     @classmethod
     async def addStealRecord(
         cls, uid: str, soilIndex: int, stealerUid: str, stealCount: int, stealTime: int
     ) -> bool:
-        """添加偷菜记录
+        """添加偷菜记录，并在同一事务中累加地块的被偷数量与偷菜人数
 
         Args:
             uid (str): 被偷用户Uid
@@ -34,15 +122,152 @@ class CUserStealDB(CSqlManager):
         """
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    'INSERT INTO "userSteal"(uid, soilIndex, stealerUid, stealCount, stealTime) VALUES(?, ?, ?, ?, ?);',
+                await cls.executeStatement(
+                    "userSteal.insert",
                     (uid, soilIndex, stealerUid, stealCount, stealTime),
                 )
+                await g_pDBService.userSoil._changeStolen(uid, soilIndex, stealCount, 1)
             return True
         except Exception as e:
             logger.warning("添加偷菜记录失败", e=e)
             return False
 
+    @classmethod
+    def stealStatement(cls, count: int) -> str:
+        """获取一次扣减 count 块地的偷菜语句，首次使用时登记
+
+        语句按地块数量登记 数量不超过土地上限 语句数量有限
+
+        Args:
+            count (int): 地块数量
+
+        Returns:
+            str: 语句名称
+        """
+
+        def build() -> str:
+            values = ", ".join("(?, ?, ?)" for _ in range(count))
+            return f"""
+            UPDATE userSoil
+            SET stolenTotal = stolenTotal + v.column2,
+                stealerCount = stealerCount + 1
+            FROM (VALUES {values}) AS v
+            WHERE userSoil.uid = ? AND userSoil.soilIndex = v.column1
+              AND v.column3 - userSoil.stolenTotal >= v.column2
+              AND IFNULL(userSoil.wiltStatus, 0) != 1
+              AND userSoil.matureTime <= ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM userSteal t
+                  WHERE t.uid = userSoil.uid AND t.soilIndex = userSoil.soilIndex
+                    AND t.stealerUid = ?
+              )
+            RETURNING soilIndex, plantId, harvestCount, stolenTotal
+            """
+
+        return g_pStatementRegistry.require(f"userSteal.steal.{count}", build)
+
+    @classmethod
+    async def stealMany(cls, uid: str, stealerUid: str) -> dict:
+        """偷取用户全部可偷的成熟地块
+
+        剩余数量以带条件的更新扣减，只有剩余数量仍足够且未被该用户偷过的地块才会成功，
+        偷菜记录、偷完后的枯萎/再生长在同一事务中写入
+
+        Args:
+            uid (str): 被偷用户Uid
+            stealerUid (str): 偷菜用户Uid
+
+        Returns:
+            dict: {"stolen": [(soilIndex, plantName, number), ...], "repeat": 已偷过的地块数}
+        """
+        # 打包存储的地块无法按行条件更新 由存储引擎在读出整块农场后扣减
+        if g_pDBService.userSoil.m_sEngine == "packed":
+            return await g_pDBService.userSoil.stealMany(uid, stealerUid, cls.m_pRandom)
+
+        catalog = g_pDBService.plant.m_pCatalog
+        nowTs = int(g_pToolManager.dateTime().now().timestamp())
+
+        async with cls._transaction():
+            rows = await cls.queryAll(
+                "userSteal.stealable", (stealerUid, uid, nowTs), cls.m_pDB
+            )
+
+            repeat = 0
+            plans = []  # (soilIndex, 偷取数量, 作物收获数量)
+            for row in rows:
+                plantInfo = catalog.plantById(row["plantId"])
+                if not plantInfo:
+                    continue
+
+                # 如果偷过，则跳过该土地
+                if row["isStolenByStealer"]:
+                    repeat += 1
+                    continue
+
+                remaining = plantInfo["harvest"] - (row["stolenTotal"] or 0)
+                number = min(cls.m_pRandom.choice([1, 2]), remaining)
+                if number > 0:
+                    plans.append((row["soilIndex"], number, plantInfo["harvest"]))
+
+            if not plans:
+                return {"stolen": [], "repeat": repeat}
+
+            # 一条语句扣减全部地块 剩余数量不足或已被偷过的地块不会被更新
+            statement = cls.stealStatement(len(plans))
+            params = [value for plan in plans for value in plan]
+            rows = await cls.queryAll(
+                statement, (*params, uid, nowTs, stealerUid), cls.m_pDB
+            )
+            updated = {row["soilIndex"]: row for row in rows}
+
+            numbers = {soilIndex: number for soilIndex, number, _ in plans}
+            stolen = []
+            ledger = []
+            wilted = []
+            regrown = []
+            for soilIndex in sorted(updated):
+                row = updated[soilIndex]
+                number = numbers[soilIndex]
+                plantInfo = catalog.plantById(row["plantId"])
+                plantName = plantInfo["name"]
+
+                stolen.append((soilIndex, plantName, number))
+
+                # 未偷完只记录偷菜用户
+                if row["stolenTotal"] < plantInfo["harvest"]:
+                    ledger.append((uid, soilIndex, stealerUid, number, nowTs))
+                    continue
+
+                # 偷完后 最后一季直接枯萎 否则进入下一季并清空本季偷菜统计
+                if row["harvestCount"] + 1 >= plantInfo["crop"]:
+                    ledger.append((uid, soilIndex, stealerUid, number, nowTs))
+                    wilted.append((uid, soilIndex))
+                else:
+                    p1, p2, *rest = catalog.phase(plantName)
+                    regrown.append(
+                        (
+                            row["harvestCount"] + 1,
+                            nowTs - p1 - p2,
+                            nowTs + p2 + sum(rest),
+                            uid,
+                            soilIndex,
+                        )
+                    )
+
+            if ledger:
+                await cls.executeStatementMany("userSteal.insert", ledger)
+
+            if wilted:
+                await cls.executeStatementMany("userSteal.wilt", wilted)
+
+            if regrown:
+                await cls.executeStatementMany("userSteal.regrow", regrown)
+                await cls.executeStatementMany(
+                    "userSteal.deletePlot", [(uid, plan[4]) for plan in regrown]
+                )
+
+        return {"stolen": stolen, "repeat": repeat}
+
     @classmethod
     async def getStealRecordsByUid(cls, uid: str) -> list:
         """根据用户Uid获取所有偷菜记录
@@ -54,12 +279,7 @@ class CUserStealDB(CSqlManager):
             list: 偷菜记录字典列表，每条包含 soilIndex, stealerUid, stealCount, stealTime
         """
         try:
-            async with cls._transaction():
-                cursor = await cls.m_pDB.execute(
-                    'SELECT soilIndex, stealerUid, stealCount, stealTime FROM "userSteal" WHERE uid=?;',
-                    (uid,),
-                )
-                rows = await cursor.fetchall()
+            rows = await cls.queryAll("userSteal.byUid", (uid,))
             return [
                 {
                     "uid": uid,
@@ -86,12 +306,7 @@ class CUserStealDB(CSqlManager):
             list: 偷菜记录字典列表，每条包含 stealerUid, stealCount, stealTime
         """
         try:
-            async with cls._transaction():
-                cursor = await cls.m_pDB.execute(
-                    'SELECT stealerUid, stealCount, stealTime FROM "userSteal" WHERE uid=? AND soilIndex=?;',
-                    (uid, soilIndex),
-                )
-                rows = await cursor.fetchall()
+            rows = await cls.queryAll("userSteal.byPlot", (uid, soilIndex))
             return [
                 {
                     "uid": uid,
@@ -108,7 +323,7 @@ class CUserStealDB(CSqlManager):
 
     @classmethod
     async def getTotalStolenCount(cls, uid: str, soilIndex: int) -> int:
-        """计算指定地块被偷的总数量（所有用户偷取数量之和）
+        """获取指定地块被偷的总数量（所有用户偷取数量之和）
 
         Args:
             uid (str): 被偷用户Uid
@@ -118,20 +333,15 @@ class CUserStealDB(CSqlManager):
             int: 被偷的总数量，如果无记录则返回 0
         """
         try:
-            async with cls._transaction():
-                cursor = await cls.m_pDB.execute(
-                    'SELECT SUM(stealCount) FROM "userSteal" WHERE uid=? AND soilIndex=?;',
-                    (uid, soilIndex),
-                )
-                row = await cursor.fetchone()
-            return row[0] or 0  # type: ignore
+            soil = await g_pDBService.userSoil._getUserSoil(uid, soilIndex)
+            return (soil["stolenTotal"] or 0) if soil else 0
         except Exception as e:
             logger.warning("计算总偷菜数量失败", e=e)
             return 0
 
     @classmethod
     async def getStealerCount(cls, uid: str, soilIndex: int) -> int:
-        """计算指定地块被多少人偷过（不同偷菜用户数量）
+        """获取指定地块被多少人偷过（不同偷菜用户数量）
 
         Args:
             uid (str): 被偷用户Uid
@@ -141,13 +351,8 @@ class CUserStealDB(CSqlManager):
             int: 偷菜者总数，如果无记录则返回 0
         """
         try:
-            async with cls._transaction():
-                cursor = await cls.m_pDB.execute(
-                    'SELECT COUNT(DISTINCT stealerUid) FROM "userSteal" WHERE uid=? AND soilIndex=?;',
-                    (uid, soilIndex),
-                )
-                row = await cursor.fetchone()
-            return row[0] or 0  # type: ignore
+            soil = await g_pDBService.userSoil._getUserSoil(uid, soilIndex)
+            return (soil["stealerCount"] or 0) if soil else 0
         except Exception as e:
             logger.warning("计算偷菜者数量失败", e=e)
             return 0
@@ -165,12 +370,7 @@ class CUserStealDB(CSqlManager):
             bool: 若存在记录返回 True，否则返回 False
         """
         try:
-            async with cls._transaction():
-                cursor = await cls.m_pDB.execute(
-                    'SELECT 1 FROM "userSteal" WHERE uid=? AND soilIndex=? AND stealerUid=? LIMIT 1;',
-                    (uid, soilIndex, stealerUid),
-                )
-                row = await cursor.fetchone()
+            row = await cls.queryOne("userSteal.exists", (uid, soilIndex, stealerUid))
             return bool(row)
         except Exception as e:
             logger.warning("检查偷菜记录失败", e=e)
@@ -180,7 +380,7 @@ class CUserStealDB(CSqlManager):
     async def updateStealRecord(
         cls, uid: str, soilIndex: int, stealerUid: str, stealCount: int, stealTime: int
     ) -> bool:
-        """更新偷菜记录的数量和时间
+        """更新偷菜记录的数量和时间，地块被偷数量按差值同步
 
         Args:
             uid (str): 被偷用户Uid
@@ -194,8 +394,16 @@ class CUserStealDB(CSqlManager):
         """
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    'UPDATE "userSteal" SET stealCount=?, stealTime=? WHERE uid=? AND soilIndex=? AND stealerUid=?;',
+                row = await cls.queryOne(
+                    "userSteal.stealCount", (uid, soilIndex, stealerUid), cls.m_pDB
+                )
+
+                if row:
+                    await g_pDBService.userSoil._changeStolen(
+                        uid, soilIndex, stealCount - row[0], 0
+                    )
+                await cls.executeStatement(
+                    "userSteal.update",
                     (stealCount, stealTime, uid, soilIndex, stealerUid),
                 )
             return True
@@ -205,7 +413,7 @@ class CUserStealDB(CSqlManager):
 
     @classmethod
     async def deleteStealRecord(cls, uid: str, soilIndex: int) -> bool:
-        """删除指定偷菜记录（只需被偷用户Uid和地块索引）
+        """删除指定偷菜记录（只需被偷用户Uid和地块索引），同时清零地块被偷统计
 
         Args:
             uid (str): 被偷用户Uid
@@ -216,11 +424,76 @@ class CUserStealDB(CSqlManager):
         """
         try:
             async with cls._transaction():
-                await cls.m_pDB.execute(
-                    'DELETE FROM "userSteal" WHERE uid=? AND soilIndex=?;',
-                    (uid, soilIndex),
-                )
+                await cls.executeStatement("userSteal.deletePlot", (uid, soilIndex))
+                await g_pDBService.userSoil._resetStolen(uid, soilIndex)
             return True
         except Exception as e:
             logger.warning("删除偷菜记录失败", e=e)
             return False
+
+    @classmethod
+    async def purgeStaleRecords(cls, afterUid: str, limit: int) -> tuple[int, str]:
+        """清理已重新生长地块上的过期偷菜记录，并同步扣减地块的被偷统计
+
+        偷菜只能发生在地块成熟之后，记录的偷菜时间早于地块当前的成熟时间，
+        说明地块已收获后重新生长或重新播种，该记录属于之前的季节；
+        地块未种植或已不存在时其记录同样过期
+
+        Args:
+            afterUid (str): 从该用户Uid之后开始处理，首次调用传空字符串
+            limit (int): 本次最多处理的被偷用户数量
+
+        Returns:
+            tuple[int, str]: (删除的记录数, 本次处理的最后一个用户Uid)，
+                用户Uid为空表示已全部处理完毕
+        """
+        userSoil = g_pDBService.userSoil
+        purged = 0
+        lastUid = ""
+
+        async with cls._transaction():
+            uids = await cls.queryAll(
+                "userSteal.uidsAfter", (afterUid, limit), cls.m_pDB
+            )
+
+            for (uid,) in uids:
+                lastUid = uid
+                matureTimes = await userSoil.getMatureTimes(uid)
+
+                plots: dict[int, list] = {}
+                for row in await cls.queryAll("userSteal.byUid", (uid,), cls.m_pDB):
+                    plots.setdefault(row["soilIndex"], []).append(row)
+
+                for soilIndex, rows in plots.items():
+                    matureTime = matureTimes.get(soilIndex)
+                    stale = [
+                        row
+                        for row in rows
+                        if not matureTime or row["stealTime"] < matureTime
+                    ]
+                    if not stale:
+                        continue
+
+                    purged += len(stale)
+
+                    # 未种植的地块不保留任何记录 地块已不存在时只删除记录
+                    if len(stale) == len(rows):
+                        await cls.executeStatement(
+                            "userSteal.deletePlot", (uid, soilIndex)
+                        )
+                        if matureTime is not None:
+                            await userSoil._resetStolen(uid, soilIndex)
+                        continue
+
+                    await cls.executeStatementMany(
+                        "userSteal.deleteOne",
+                        [(uid, soilIndex, row["stealerUid"]) for row in stale],
+                    )
+                    await userSoil._changeStolen(
+                        uid,
+                        soilIndex,
+                        -sum(row["stealCount"] for row in stale),
+                        -len(stale),
+                    )
+
+        return purged, lastUid
@@ -1,45 +1,73 @@
+from .cfg import g_pConfigManager
+from .database.database import CSqlManager
+
+
 class CDBService:
     @classmethod
     async def init(cls):
+        from .database.backup import g_pBackupManager
+        from .database.benchmark import g_pQueryBenchmark
+        from .database.farmSnapshot import CFarmSnapshotDB
+        from .database.migration import g_pMigrationManager
         from .database.plant import CPlantManager
+        from .database.retention import g_pRetentionManager
+        from .database.statement import g_pStatementRegistry
         from .database.user import CUserDB
         from .database.userItem import CUserItemDB
         from .database.userPlant import CUserPlantDB
         from .database.userSeed import CUserSeedDB
         from .database.userSign import CUserSignDB
         from .database.userSoil import CUserSoilDB
+        from .database.userSoilPacked import CUserSoilPackedDB
         from .database.userSteal import CUserStealDB
 
         cls.plant = CPlantManager()
         await cls.plant.init()
 
         cls.user = CUserDB()
-        await cls.user.initDB()
-
-        cls.userSoil = CUserSoilDB()
-        await cls.userSoil.initDB()
-
+        if g_pConfigManager.sSoilEngine == "packed":
+            cls.userSoil = CUserSoilPackedDB()
+        else:
+            cls.userSoil = CUserSoilDB()
         cls.userPlant = CUserPlantDB()
-        await cls.userPlant.initDB()
-
         cls.userSeed = CUserSeedDB()
-        await cls.userSeed.initDB()
-
         cls.userItem = CUserItemDB()
-        await cls.userItem.initDB()
-
         cls.userSteal = CUserStealDB()
-        await cls.userSteal.initDB()
-
         cls.userSign = CUserSignDB()
-        await cls.userSign.initDB()
+        cls.farmSnapshot = CFarmSnapshotDB()
 
-        # 迁移旧数据库
-        await cls.userSoil.migrateOldFarmData()
+        # 按版本号执行数据库迁移 已是最新版本时直接跳过
+        await g_pMigrationManager.migrate()
+
+        # 切换地块存储方式后 将另一种方式中的已有地块转换过来
+        await cls.userSoil.convertStorage()
+
+        # 编译全部具名语句 表结构与语句不一致时及早告警
+        await g_pStatementRegistry.validate(CSqlManager.m_pDB)
+
+        # 调试模式下输出单条查询开销 热点查询的查询计划由测试检查
+        if g_pConfigManager.bIsDebug:
+            await g_pQueryBenchmark.run()
+
+        # 按配置定时在线备份数据库
+        g_pBackupManager.start()
+
+        # 按配置在空闲时段归档过期记录并回收空闲页
+        g_pRetentionManager.start()
 
     @classmethod
     async def cleanup(cls):
+        from .database.backup import g_pBackupManager
+        from .database.retention import g_pRetentionManager
+
+        await g_pBackupManager.cleanup()
+        await g_pRetentionManager.cleanup()
         await cls.plant.cleanup()
 
+    @classmethod
+    def unitOfWork(cls):
+        """开启一次指令级事务，详见 CSqlManager.unitOfWork"""
+        return CSqlManager.unitOfWork()
+
 
 g_pDBService = CDBService()
@@ -1,13 +1,14 @@
 import math
-import random
 from typing import List
 
 from astrbot.api import logger
 
 from ..cfg import g_pConfigManager
+from ..database.farmSnapshot import CFarmSnapshot
 from ..dbService import g_pDBService
 from ..event.event import g_pEventManager
 from ..json import g_pJsonManager
+from ..lock import g_pUserLockManager
 from ..tool import g_pToolManager
 from ..zhenxun_utils._build_image import BuildImage
 from ..zhenxun_utils.image_utils import ImageTemplate
@@ -15,15 +16,23 @@ from ..zhenxun_utils.image_utils import ImageTemplate
 
 class CFarmManager:
     @classmethod
-    async def drawFarmByUid(cls, uid: str) -> str:
+    async def drawFarmByUid(
+        cls, uid: str, snapshot: CFarmSnapshot | None = None
+    ) -> str:
         """绘制用户农场
 
         Args:
             uid (str): 用户UID
+            snapshot (CFarmSnapshot | None): 农场快照，为空时自动读取
 
         Returns:
             str: 返回绘制图片base64
         """
+        if snapshot is None:
+            snapshot = await g_pDBService.farmSnapshot.loadFarmSnapshot(uid)
+            if not snapshot:
+                return ""
+
         img = BuildImage(
             background=g_pConfigManager.sResourcePath / "background/background.jpg"
         )
@@ -37,8 +46,8 @@ class CFarmManager:
 
         soilPos = g_pJsonManager.m_pSoil["soil"]
 
-        userInfo = await g_pDBService.user.getUserInfoByUid(uid)
-        soilUnlock = int(userInfo["soil"])
+        userInfo = snapshot.user
+        soilUnlock = snapshot.soilNumber
 
         x = 0
         y = 0
@@ -53,12 +62,12 @@ class CFarmManager:
             if index < soilUnlock:
                 soilUrl = ""
                 # TODO 缺少判断用户土地资源状况
-                soilInfo = await g_pDBService.userSoil.getUserSoil(uid, index + 1)
+                soilInfo = snapshot.soil(index + 1)
 
                 if not soilInfo:
                     soilUrl = "soil/普通土地.png"
                 else:
-                    soilLevel = soilInfo.get("soilLevel", 0)
+                    soilLevel = soilInfo.soilLevel
 
                     if soilLevel == 1:
                         soilUrl = "soil/红土地.png"
@@ -75,7 +84,7 @@ class CFarmManager:
                 await img.paste(soil, (x, y))
 
                 isPlant, plant, isRipe, offsetX, offsetY = await cls.drawSoilPlant(
-                    uid, index + 1
+                    snapshot, index + 1
                 )
 
                 if isPlant:
@@ -191,7 +200,11 @@ class CFarmManager:
     async def drawDetailFarmByUid(cls, uid: str) -> list:
         info = []
 
-        farm = await cls.drawFarmByUid(uid)
+        snapshot = await g_pDBService.farmSnapshot.loadFarmSnapshot(uid)
+        if not snapshot:
+            return info
+
+        farm = await cls.drawFarmByUid(uid, snapshot)
 
         info.append(farm)
 
@@ -208,13 +221,13 @@ class CFarmManager:
         ]
 
         icon = ""
-        soilNumber = await g_pDBService.user.getUserSoilByUid(uid)
+        soilNumber = snapshot.soilNumber
 
         for i in range(1, soilNumber + 1):
-            soilInfo = await g_pDBService.userSoil.getUserSoil(uid, i)
+            soilInfo = snapshot.soil(i)
 
             if soilInfo:
-                match soilInfo.get("soilLevel", 0):
+                match soilInfo.soilLevel:
                     case 1:
                         name = "红土地.png"
                     case 2:
@@ -228,9 +241,10 @@ class CFarmManager:
                 if iconPath.exists():
                     icon = (iconPath, 33, 33)
 
-                plantName = soilInfo.get("plantName", "-")
+                plantName = soilInfo.plantName
 
-                if plantName == "-":
+                # 铲除后保留土地等级的空地块与未种植同样处理
+                if not plantName or plantName == "-":
                     matureTime = "-"
                     soilStatus = "-"
                     totalNumber = "-"
@@ -238,15 +252,19 @@ class CFarmManager:
                 else:
                     matureTime = (
                         g_pToolManager.dateTime()
-                        .fromtimestamp(int(soilInfo.get("matureTime", 0)))
+                        .fromtimestamp(soilInfo.matureTime)
                         .strftime("%Y-%m-%d %H:%M:%S")
                     )
-                    soilStatus = await g_pDBService.userSoil.getUserSoilStatus(uid, i)
-
-                    totalNumber = await g_pDBService.userSteal.getTotalStolenCount(
-                        uid, i
+                    soilStatus = await g_pDBService.userSoil.getSoilStatusText(
+                        soilInfo.wiltStatus,
+                        soilInfo.fertilizerStatus,
+                        soilInfo.bugStatus,
+                        soilInfo.weedStatus,
+                        soilInfo.waterStatus,
                     )
-                    planInfo = await g_pDBService.plant.getPlantByName(plantName)
+
+                    totalNumber = soilInfo.stolenCount
+                    planInfo = snapshot.plant(plantName)
 
                     if not planInfo:
                         plantNumber = "None"
@@ -258,7 +276,7 @@ class CFarmManager:
                         icon,
                         i,
                         await g_pDBService.userSoil.getSoilLevelText(
-                            soilInfo["soilLevel"]
+                            soilInfo.soilLevel
                         ),
                         plantName,
                         matureTime,
@@ -294,12 +312,12 @@ class CFarmManager:
 
     @classmethod
     async def drawSoilPlant(
-        cls, uid: str, soilIndex: int
+        cls, snapshot: CFarmSnapshot, soilIndex: int
     ) -> tuple[bool, BuildImage, bool, int, int]:
         """绘制植物资源
 
         Args:
-            uid (str): 用户Uid
+            snapshot (CFarmSnapshot): 农场快照
             soilIndex (int): 土地索引 从1开始
 
         Returns:
@@ -307,13 +325,14 @@ class CFarmManager:
         """
 
         plant = None
-        soilInfo = await g_pDBService.userSoil.getUserSoil(uid, soilIndex)
+        soilInfo = snapshot.soil(soilIndex)
 
-        if not soilInfo:
+        # 无记录或已铲除的空地块
+        if not soilInfo or not soilInfo.plantName:
             return False, None, False, 0, 0  # type: ignore
 
         # 是否枯萎
-        if int(soilInfo.get("wiltStatus", 0)) == 1:
+        if soilInfo.wiltStatus == 1:
             plant = BuildImage(
                 background=g_pConfigManager.sResourcePath / "plant/basic/9.png"
             )
@@ -321,9 +340,10 @@ class CFarmManager:
             return True, plant, False, 0, 0
 
         # 获取作物详细信息
-        plantInfo = await g_pDBService.plant.getPlantByName(soilInfo["plantName"])
+        plantName = soilInfo.plantName
+        plantInfo = snapshot.plant(plantName)
         if not plantInfo:
-            logger.error(f"绘制植物资源失败: {soilInfo['plantName']}")
+            logger.error(f"绘制植物资源失败: {plantName}")
             return False, None, False, 0, 0  # type: ignore
 
         offsetX = plantInfo.get("officX", 0)
@@ -332,13 +352,13 @@ class CFarmManager:
         offsetH = plantInfo.get("officH", 0)
 
         currentTime = g_pToolManager.dateTime().now().timestamp()
-        phaseList = await g_pDBService.plant.getPlantPhaseByName(soilInfo["plantName"])
+        phaseList = snapshot.phase(plantName)
 
         # 如果当前时间大于成熟时间 说明作物成熟
-        if currentTime >= soilInfo["matureTime"]:
+        if currentTime >= soilInfo.matureTime:
             plant = BuildImage(
                 background=g_pConfigManager.sResourcePath
-                / f"plant/{soilInfo['plantName']}/{len(phaseList)}.png"
+                / f"plant/{plantName}/{len(phaseList)}.png"
             )
 
             return True, plant, True, offsetX, offsetY
@@ -353,14 +373,14 @@ class CFarmManager:
             #     return True, plant, False, offsetX, offsetY
 
             # 如果没有成熟 则根据当前阶段进行绘制
-            elapsedTime = currentTime - soilInfo["plantTime"]
-            currentStage = sum(1 for thr in phaseList if elapsedTime >= thr)
+            elapsedTime = currentTime - soilInfo.plantTime
+            currentStage = snapshot.catalog.stageOf(plantName, elapsedTime)
 
             if currentStage <= 0:
                 if not plantInfo.get("general", False):
                     plant = BuildImage(
                         background=g_pConfigManager.sResourcePath
-                        / f"plant/{soilInfo['plantName']}/0.png"
+                        / f"plant/{plantName}/0.png"
                     )
                 else:
                     plant = BuildImage(
@@ -371,7 +391,7 @@ class CFarmManager:
             else:
                 plant = BuildImage(
                     background=g_pConfigManager.sResourcePath
-                    / f"plant/{soilInfo['plantName']}/{currentStage}.png"
+                    / f"plant/{plantName}/{currentStage}.png"
                 )
 
         return True, plant, False, offsetX, offsetY
@@ -437,6 +457,7 @@ class CFarmManager:
         return result.pic2base64()
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def sowing(cls, uid: str, name: str, num: int = -1) -> str:
         """播种
 
@@ -465,9 +486,6 @@ class CFarmManager:
                     name=name, num=count
                 )
 
-            # 获取用户土地数量
-            soilNumber = await g_pDBService.user.getUserSoilByUid(uid)
-
             # 如果播种数量为 -1，表示播种所有可播种的土地
             if num == -1:
                 num = count
@@ -475,29 +493,18 @@ class CFarmManager:
             # 发送播种前信号
             await g_pEventManager.m_beforePlant.emit(uid=uid, name=name, num=num)  # type: ignore
 
-            # 记录是否成功播种
-            successCount = 0
-            for i in range(1, soilNumber + 1):
-                if count > 0 and num > 0:
-                    success = await g_pDBService.userSoil.sowingByPlantName(
-                        uid, i, name
-                    )
-                    if success:
-                        # 更新种子数量
-                        num -= 1
-                        count -= 1
-
-                        # 记录种子消耗数量
-                        successCount += 1
+            # 选地、播种与扣除种子在同一事务中批量完成，播种后信号待提交后再发送
+            sownSoils = await g_pDBService.userSoil.sowMany(uid, name, num)
 
-                        # 发送播种后信号
-                        await g_pEventManager.m_afterPlant.emit(  # type: ignore
-                            uid=uid, name=name, soilIndex=i
-                        )
+            # 更新种子数量
+            num -= len(sownSoils)
+            count -= len(sownSoils)
 
-            # 确保用户仓库数量更新
-            if successCount > 0:
-                await g_pDBService.userSeed.updateUserSeedByName(uid, name, count)
+            # 发送播种后信号
+            for i in sownSoils:
+                await g_pEventManager.m_afterPlant.emit(  # type: ignore
+                    uid=uid, name=name, soilIndex=i
+                )
 
             # 根据播种结果给出反馈
             if num == 0:
@@ -514,6 +521,7 @@ class CFarmManager:
             return g_pConfigManager.sTranslation["sowing"]["error"]
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def harvest(cls, uid: str) -> str:
         """收获作物
 
@@ -526,110 +534,64 @@ class CFarmManager:
         try:
             await g_pEventManager.m_beforeHarvest.emit(uid=uid)  # type: ignore
 
-            soilNumber = await g_pDBService.user.getUserSoilByUid(uid)
-
-            harvestRecords = []  # 收获日志记录
-            experience = 0  # 总经验值
-            harvestCount = 0  # 成功收获数量
-
-            for i in range(1, soilNumber + 1):
-                soilInfo = await g_pDBService.userSoil.getUserSoil(uid, i)
-                if not soilInfo:
-                    continue
-
-                # 如果没有种植
-                if soilInfo.get("isSoilPlanted", 1) == 0:
-                    continue
-
-                level = soilInfo.get("soilLevel", 0)
-
-                # 如果是枯萎状态
-                if soilInfo.get("wiltStatus", 1) == 1:
-                    continue
-
-                plantInfo = await g_pDBService.plant.getPlantByName(
-                    soilInfo["plantName"]
-                )
-                if not plantInfo:
-                    continue
-
-                currentTime = g_pToolManager.dateTime().now()
-                matureTime = g_pToolManager.dateTime().fromtimestamp(
-                    int(soilInfo["matureTime"])
-                )
-
-                if currentTime >= matureTime:
-                    number = plantInfo["harvest"]
-
-                    # 处理偷菜扣除数量
-                    stealNum = await g_pDBService.userSteal.getTotalStolenCount(uid, i)
-                    number -= stealNum
-
-                    # 处理土地等级带来的数量增长 向下取整
-                    percent = await g_pDBService.userSoil.getSoilLevelHarvestNumber(
-                        level
-                    )
-                    number = math.floor(number * (100 + percent) // 100)
+            # 整次收获在同一事务中完成，收获后信号待提交后再发送
+            harvestEvents = []
+            async with g_pDBService.unitOfWork():
+                # 一次取出并结算全部成熟地块 枯萎与再生长状态已批量写回
+                harvested = await g_pDBService.userSoil.harvestMany(uid)
 
-                    if number <= 0:
-                        continue
+                harvestRecords = []  # 收获日志记录
+                experience = 0  # 总经验值
+                harvestCount = 0  # 成功收获数量
+                harvestPlants: dict[str, int] = {}  # 待入库的作物数量
 
+                for soil in harvested:
                     harvestCount += 1
-                    experience += plantInfo["experience"]
+                    experience += soil["experience"]
 
                     # 处理土地等级带来的经验增长 向下取整
-                    percent = await g_pDBService.userSoil.getSoilLevelHarvestExp(level)
+                    percent = await g_pDBService.userSoil.getSoilLevelHarvestExp(
+                        soil["soilLevel"]
+                    )
                     experience = math.floor(experience * (100 + percent) // 100)
 
                     harvestRecords.append(
                         g_pConfigManager.sTranslation["harvest"]["append"].format(
-                            name=soilInfo["plantName"],
-                            num=number,
-                            exp=plantInfo["experience"],
+                            name=soil["plantName"],
+                            num=soil["number"],
+                            exp=soil["experience"],
                         )
                     )
 
-                    await g_pDBService.userPlant.addUserPlantByUid(
-                        uid, soilInfo["plantName"], number
+                    harvestPlants[soil["plantName"]] = (
+                        harvestPlants.get(soil["plantName"], 0) + soil["number"]
                     )
 
-                    # 如果到达收获次数上限
-                    if soilInfo["harvestCount"] + 1 >= plantInfo["crop"]:
-                        await g_pDBService.userSoil.updateUserSoil(
-                            uid, i, "wiltStatus", 1
-                        )
-                    else:
-                        phase = await g_pDBService.plant.getPlantPhaseByName(
-                            soilInfo["plantName"]
-                        )
-
-                        ts, hc = (
-                            int(currentTime.timestamp()),
-                            soilInfo["harvestCount"] + 1,
-                        )
-                        p1, p2, *rest = phase
-
-                        await g_pDBService.userSoil.updateUserSoilFields(
-                            uid,
-                            i,
-                            {
-                                "harvestCount": hc,
-                                "plantTime": ts - p1 - p2,
-                                "matureTime": ts + p2 + sum(rest),
-                            },
-                        )
+                    harvestEvents.append(
+                        (soil["plantName"], soil["number"], soil["soilIndex"])
+                    )
 
-                    await g_pEventManager.m_afterHarvest.emit(  # type: ignore
-                        uid=uid, name=soilInfo["plantName"], num=number, soilIndex=i
+                # 收获的作物一次性批量入库 失败时整次收获回滚
+                if (
+                    harvestPlants
+                    and not await g_pDBService.userPlant.addUserPlantsByUid(
+                        uid, harvestPlants
                     )
+                ):
+                    raise RuntimeError(f"收获作物入库失败: {uid}")
 
-            if experience > 0:
-                exp = await g_pDBService.user.getUserExpByUid(uid)
-                await g_pDBService.user.updateUserExpByUid(uid, exp + experience)
-                harvestRecords.append(
-                    g_pConfigManager.sTranslation["harvest"]["exp"].format(
-                        exp=experience,
+                if experience > 0:
+                    if await g_pDBService.user.addUserExpByUid(uid, experience) < 0:
+                        raise RuntimeError(f"增加收获经验失败: {uid}")
+                    harvestRecords.append(
+                        g_pConfigManager.sTranslation["harvest"]["exp"].format(
+                            exp=experience,
+                        )
                     )
+
+            for plantName, number, i in harvestEvents:
+                await g_pEventManager.m_afterHarvest.emit(  # type: ignore
+                    uid=uid, name=plantName, num=number, soilIndex=i
                 )
 
             if harvestCount <= 0:
@@ -638,10 +600,11 @@ class CFarmManager:
                 return "\n".join(harvestRecords)
 
         except Exception as e:
-            logger.warning("收获操作失败！", e=e)
+            logger.warning(f"收获操作失败！{e}")
             return g_pConfigManager.sTranslation["harvest"]["error"]
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def eradicate(cls, uid: str) -> str:
         """铲除作物
         TODO 缺少随意铲除作物 目前只能铲除荒废作物
@@ -651,58 +614,36 @@ class CFarmManager:
         Returns:
             str: 返回
         """
-        soilNumber = await g_pDBService.user.getUserSoilByUid(uid)
-
         await g_pEventManager.m_beforeEradicate.emit(uid=uid)  # type: ignore
 
-        experience = 0
-        for i in range(1, soilNumber + 1):
-            soilInfo = await g_pDBService.userSoil.getUserSoil(uid, i)
-            if not soilInfo:
-                continue
-
-            # 如果没有种植
-            if soilInfo.get("isSoilPlanted", 1) == 0:
-                continue
-
-            # 如果不是枯萎状态
-            if soilInfo.get("wiltStatus", 0) == 0:
-                continue
-
-            experience += 3
-
-            if g_pConfigManager.bIsDebug:
-                experience += 999
-
-            # 更新数据库操作
-            await g_pDBService.userSoil.deleteUserSoil(uid, i)
-
-            await g_pDBService.userSoil.updateUserSoilFields(
-                uid,
-                i,
-                {
-                    "plantName": "",
-                    "plantTime": 0,
-                    "matureTime": 0,
-                    "wiltStatus": 0,
-                    "isSoilPlanted": 0,
-                },
-            )
-
-            # 铲除作物会将偷菜记录清空
-            await g_pDBService.userSteal.deleteStealRecord(uid, i)
+        try:
+            # 整次铲除在同一事务中完成，铲除后信号待提交后再发送
+            async with g_pDBService.unitOfWork():
+                # 一次重置全部枯萎地块并清空其偷菜记录
+                eradicated = await g_pDBService.userSoil.eradicateWithered(uid)
+
+                experience = 3 * len(eradicated)
+                if g_pConfigManager.bIsDebug:
+                    experience += 999 * len(eradicated)
+
+                if (
+                    experience > 0
+                    and await g_pDBService.user.addUserExpByUid(uid, experience) < 0
+                ):
+                    raise RuntimeError(f"增加铲除经验失败: {uid}")
+        except Exception as e:
+            logger.warning(f"铲除操作失败！{e}")
+            return g_pConfigManager.sTranslation["eradicate"]["error"]
 
+        for i in eradicated:
             await g_pEventManager.m_afterEradicate.emit(uid=uid, soilIndex=i)  # type: ignore
 
         if experience > 0:
-            exp = await g_pDBService.user.getUserExpByUid(uid)
-            await g_pDBService.user.updateUserExpByUid(uid, exp + experience)
-
             return g_pConfigManager.sTranslation["eradicate"]["success"].format(
                 exp=experience
             )
         else:
-            return g_pConfigManager.sTranslation["eradicate"]["error"]
+            return g_pConfigManager.sTranslation["eradicate"]["no"]
 
     @classmethod
     async def getUserPlantByUid(cls, uid: str) -> str:
@@ -758,6 +699,7 @@ class CFarmManager:
         return result.pic2base64()
 
     @classmethod
+    @g_pUserLockManager.serialize("uid", "target")
     async def stealing(cls, uid: str, target: str) -> str:
         """偷菜
 
@@ -768,134 +710,70 @@ class CFarmManager:
         Returns:
             str: 返回
         """
-        # 用户信息
-        userInfo = await g_pDBService.user.getUserInfoByUid(uid)
-
-        stealTime = userInfo.get("stealTime", "")
-        stealCount = int(userInfo["stealCount"])
-
-        if stealTime == "" or not stealTime:
-            stealTime = g_pToolManager.dateTime().date().today().strftime("%Y-%m-%d")
-            stealCount = 5
-        elif (
-            g_pToolManager.dateTime().date().fromisoformat(stealTime)
-            != g_pToolManager.dateTime().date().today()
-        ):
-            stealTime = g_pToolManager.dateTime().date().today().strftime("%Y-%m-%d")
-            stealCount = 5
-
-        if stealCount <= 0:
-            return g_pConfigManager.sTranslation["stealing"]["max"]
-
-        # 获取用户解锁地块数量
-        soilNumber = await g_pDBService.user.getUserSoilByUid(target)
-        harvestRecords: List[str] = []
-        isStealingNumber = 0
-        isStealingPlant = 0
-
-        for i in range(1, soilNumber + 1):
-            soilInfo = await g_pDBService.userSoil.getUserSoil(target, i)
-            if not soilInfo:
-                continue
-
-            # 如果没有种植
-            if soilInfo.get("isSoilPlanted", 1) == 0:
-                continue
-
-            # 如果是枯萎状态
-            if soilInfo.get("wiltStatus", 1) == 1:
-                continue
+        try:
+            # 次数校验、偷取与扣减次数在同一事务中完成
+            async with g_pDBService.unitOfWork():
+                # 用户信息
+                userInfo = await g_pDBService.user.getUserInfoByUid(uid)
 
-            # 作物信息
-            plantInfo = await g_pDBService.plant.getPlantByName(soilInfo["plantName"])
-            if not plantInfo:
-                continue
+                stealTime = userInfo.get("stealTime", "")
+                stealCount = int(userInfo["stealCount"])
 
-            currentTime = g_pToolManager.dateTime().now()
-            matureTime = g_pToolManager.dateTime().fromtimestamp(
-                int(soilInfo["matureTime"])
-            )
+                if stealTime == "" or not stealTime:
+                    stealTime = (
+                        g_pToolManager.dateTime().date().today().strftime("%Y-%m-%d")
+                    )
+                    stealCount = 5
+                elif (
+                    g_pToolManager.dateTime().date().fromisoformat(stealTime)
+                    != g_pToolManager.dateTime().date().today()
+                ):
+                    stealTime = (
+                        g_pToolManager.dateTime().date().today().strftime("%Y-%m-%d")
+                    )
+                    stealCount = 5
 
-            if currentTime >= matureTime:
-                # 如果偷过，则跳过该土地
-                if await g_pDBService.userSteal.hasStealed(target, i, uid):
-                    isStealingNumber += 1
-                    continue
+                if stealCount <= 0:
+                    return g_pConfigManager.sTranslation["stealing"]["max"]
 
-                stealingNumber = plantInfo[
-                    "harvest"
-                ] - await g_pDBService.userSteal.getTotalStolenCount(target, i)
-                randomNumber = random.choice([1, 2])
-                randomNumber = min(randomNumber, stealingNumber)
+                # 一次偷取目标全部可偷地块 剩余数量以条件更新扣减
+                result = await g_pDBService.userSteal.stealMany(target, uid)
+                harvestRecords: List[str] = []
+                isStealingNumber = result["repeat"]
+                isStealingPlant = len(result["stolen"])
+                stealPlants: dict[str, int] = {}  # 待入库的作物数量
 
-                if randomNumber > 0:
-                    await g_pDBService.userPlant.addUserPlantByUid(
-                        uid, soilInfo["plantName"], randomNumber
-                    )
+                for _, plantName, number in result["stolen"]:
+                    stealPlants[plantName] = stealPlants.get(plantName, 0) + number
 
                     harvestRecords.append(
                         g_pConfigManager.sTranslation["stealing"]["info"].format(
-                            name=soilInfo["plantName"], num=randomNumber
+                            name=plantName, num=number
                         )
                     )
 
-                    isStealingPlant += 1
-
-                    # 如果将作物偷完，就直接更新状态 并记录用户偷取过
-                    if plantInfo["harvest"] - randomNumber + stealingNumber == 0:
-                        # 如果作物 是最后一阶段作物且偷完 则直接枯萎
-                        if soilInfo["harvestCount"] + 1 >= plantInfo["crop"]:
-                            await g_pDBService.userSoil.updateUserSoil(
-                                target, i, "wiltStatus", 1
-                            )
-                        else:
-                            phase = await g_pDBService.plant.getPlantPhaseByName(
-                                soilInfo["plantName"]
-                            )
-
-                            ts, hc = (
-                                int(currentTime.timestamp()),
-                                soilInfo["harvestCount"] + 1,
-                            )
-                            p1, p2, *rest = phase
-
-                            await g_pDBService.userSoil.updateUserSoilFields(
-                                uid,
-                                i,
-                                {
-                                    "harvestCount": hc,
-                                    "plantTime": ts - p1 - p2,
-                                    "matureTime": ts + p2 + sum(rest),
-                                },
-                            )
-
-                            await g_pDBService.userSteal.addStealRecord(
-                                target,
-                                i,
-                                uid,
-                                randomNumber,
-                                int(g_pToolManager.dateTime().now().timestamp()),
-                            )
-
-                    else:
-                        await g_pDBService.userSteal.addStealRecord(
-                            target,
-                            i,
-                            uid,
-                            randomNumber,
-                            int(g_pToolManager.dateTime().now().timestamp()),
-                        )
+                # 偷到的作物一次性批量入库 失败时整次偷菜回滚
+                if stealPlants and not await g_pDBService.userPlant.addUserPlantsByUid(
+                    uid, stealPlants
+                ):
+                    raise RuntimeError(f"偷到的作物入库失败: {uid}")
 
-        if isStealingPlant <= 0 and isStealingNumber <= 0:
-            return g_pConfigManager.sTranslation["stealing"]["noPlant"]
-        elif isStealingPlant <= 0 and isStealingNumber > 0:
-            return g_pConfigManager.sTranslation["stealing"]["repeat"]
-        else:
-            stealCount -= 1
+                if isStealingPlant <= 0 and isStealingNumber <= 0:
+                    return g_pConfigManager.sTranslation["stealing"]["noPlant"]
+                elif isStealingPlant <= 0 and isStealingNumber > 0:
+                    return g_pConfigManager.sTranslation["stealing"]["repeat"]
+                else:
+                    stealCount -= 1
 
-            await g_pDBService.user.updateStealCountByUid(uid, stealTime, stealCount)
+                    if not await g_pDBService.user.updateStealCountByUid(
+                        uid, stealTime, stealCount
+                    ):
+                        raise RuntimeError(f"扣减偷菜次数失败: {uid}")
 
-            return "\n".join(harvestRecords)
+                    return "\n".join(harvestRecords)
+        except Exception as e:
+            logger.warning(f"偷菜操作失败！{e}")
+            return g_pConfigManager.sTranslation["stealing"]["error"]
 
     @classmethod
     async def reclamationCondition(cls, uid: str) -> str:
@@ -935,6 +813,7 @@ class CFarmManager:
             return g_pConfigManager.sTranslation["reclamation"]["error"]
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def reclamation(cls, uid: str) -> str:
         """开垦
 
@@ -963,15 +842,15 @@ class CFarmManager:
                     level=level[0], next=levelFileter
                 )
 
-            if userInfo["point"] < point:
+            # TODO 缺少判断消耗的item
+            # 扣除农场币与增加土地在同一条语句内完成，农场币不足时不变更
+            if not await g_pDBService.user.changeUserValuesByUid(
+                uid, {"point": -point, "soil": 1}
+            ):
                 return g_pConfigManager.sTranslation["reclamation"]["noNum"].format(
                     num=point
                 )
 
-            # TODO 缺少判断消耗的item
-            await g_pDBService.user.updateUserPointByUid(uid, userInfo["point"] - point)
-            await g_pDBService.user.updateUserSoilByUid(uid, userInfo["soil"] + 1)
-
             return g_pConfigManager.sTranslation["reclamation"]["success"]
         except Exception:
             return g_pConfigManager.sTranslation["reclamation"]["error1"]
@@ -1026,6 +905,7 @@ class CFarmManager:
         return "\n".join(lines)
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def soilUpgrade(cls, uid: str, soilIndex: int) -> str:
         """土地升级
 
@@ -1072,20 +952,24 @@ class CFarmManager:
 
         # 缺少item判断
 
-        # 更新数据库字段
-        await g_pDBService.userSoil.updateUserSoil(
-            uid, soilIndex, "soilLevel", soilLevel
-        )
-
-        # 如果有作物的话直接成熟
-        await g_pDBService.userSoil.matureNow(uid, soilIndex)
+        async with g_pDBService.unitOfWork():
+            # 扣除农场币与点券，余额不足时不变更
+            if not await g_pDBService.user.changeUserValuesByUid(
+                uid,
+                {
+                    "point": -fileter.get("point", 0),
+                    "vipPoint": -fileter.get("vipPoint", 0),
+                },
+            ):
+                return f"你的{requirements['point']}不够哦~"
 
-        # 更新数据库字段
-        point = userInfo.get("point", 0) - fileter.get("point", 0)
-        await g_pDBService.user.updateUserPointByUid(uid, point)
+            # 更新数据库字段
+            await g_pDBService.userSoil.updateUserSoil(
+                uid, soilIndex, "soilLevel", soilLevel
+            )
 
-        vipPoint = userInfo.get("vipPoint", 0) - fileter.get("vipPoint", 0)
-        await g_pDBService.user.updateUserVipPointByUid(uid, vipPoint)
+            # 如果有作物的话直接成熟
+            await g_pDBService.userSoil.matureNow(uid, soilIndex)
 
         return g_pConfigManager.sTranslation["soilInfo"]["success"].format(
             name=await g_pDBService.userSoil.getSoilLevelText(soilLevel),
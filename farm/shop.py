@@ -5,6 +5,7 @@ from ..zhenxun_utils.image_utils import ImageTemplate
 
 from ..cfg import g_pConfigManager
 from ..dbService import g_pDBService
+from ..lock import g_pUserLockManager
 
 
 class CShopManager:
@@ -103,6 +104,7 @@ class CShopManager:
         return result.pic2base64()
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def buySeed(cls, uid: str, name: str, num: int = 1) -> str:
         """购买种子
 
@@ -127,28 +129,32 @@ class CShopManager:
         if level[0] < int(plantInfo["level"]):
             return g_pConfigManager.sTranslation["buySeed"]["noLevel"]
 
-        point = await g_pDBService.user.getUserPointByUid(uid)
         total = int(plantInfo["buy"]) * num
 
-        logger.debug(
-            f"用户：{uid}购买{name}，数量为{num}。用户农场币为{point}，购买需要{total}"
-        )
+        logger.debug(f"用户：{uid}购买{name}，数量为{num}。购买需要{total}")
 
-        if point < total:
-            return g_pConfigManager.sTranslation["buySeed"]["noPoint"]
-        else:
-            await g_pDBService.user.updateUserPointByUid(uid, point - total)
+        try:
+            async with g_pDBService.unitOfWork():
+                # 扣款与余额校验在同一条语句内完成
+                point = await g_pDBService.user.addUserPointByUid(uid, -total)
+                if point < 0:
+                    return g_pConfigManager.sTranslation["buySeed"]["noPoint"]
 
-            if not await g_pDBService.userSeed.addUserSeedByUid(uid, name, num):
-                return g_pConfigManager.sTranslation["buySeed"]["errorSql"]
+                # 种子入库失败时回滚整次购买 扣款随之撤销
+                if not await g_pDBService.userSeed.addUserSeedByUid(uid, name, num):
+                    raise RuntimeError(f"购买的种子入库失败: {uid} {name}")
+        except Exception as e:
+            logger.warning(f"购买种子失败！{e}")
+            return g_pConfigManager.sTranslation["buySeed"]["errorSql"]
 
-            text = g_pConfigManager.sTranslation["buySeed"]["success"].format(
-                name=name, total=total, point=point - total
-            )
+        text = g_pConfigManager.sTranslation["buySeed"]["success"].format(
+            name=name, total=total, point=point
+        )
 
-            return text
+        return text
 
     @classmethod
+    @g_pUserLockManager.serialize("uid")
     async def sellPlantByUid(cls, uid: str, name: str = "", num: int = 1) -> str:
         """出售作物
 
@@ -161,59 +167,76 @@ class CShopManager:
         if not isinstance(name, str) or name.strip() == "":
             name = ""
 
-        plant = await g_pDBService.userPlant.getUserPlantByUid(uid)
-        if not plant:
-            return g_pConfigManager.sTranslation["sellPlant"]["no"]
-
-        point = 0
-        totalSold = 0
-        isAll = num == -1
-
-        if name == "":
-            for plantName, count in plant.items():
-                plantInfo = await g_pDBService.plant.getPlantByName(plantName)
-                if not plantInfo:
-                    continue
-
-                point += plantInfo["price"] * count
-                await g_pDBService.userPlant.updateUserPlantByName(uid, plantName, 0)
-        else:
-            if name not in plant:
-                return g_pConfigManager.sTranslation["sellPlant"]["error"].format(
-                    name=name
-                )
-            available = plant[name]
-            sellAmount = available if isAll else min(available, num)
-            if sellAmount <= 0:
-                return g_pConfigManager.sTranslation["sellPlant"]["error1"].format(
-                    name=name
+        try:
+            # 扣除作物与入账在同一事务中完成
+            async with g_pDBService.unitOfWork():
+                plant = await g_pDBService.userPlant.getUserPlantByUid(uid)
+                if not plant:
+                    return g_pConfigManager.sTranslation["sellPlant"]["no"]
+
+                point = 0
+                totalSold = 0
+                isAll = num == -1
+
+                if name == "":
+                    soldPlants = {}
+                    for plantName, count in plant.items():
+                        plantInfo = await g_pDBService.plant.getPlantByName(plantName)
+                        if not plantInfo:
+                            continue
+
+                        point += plantInfo["price"] * count
+                        soldPlants[plantName] = -count
+
+                    # 一次性扣除全部出售的作物 扣除失败时不入账
+                    if not await g_pDBService.userPlant.addUserPlantsByUid(
+                        uid, soldPlants
+                    ):
+                        raise RuntimeError(f"扣除出售的作物失败: {uid}")
+                else:
+                    if name not in plant:
+                        return g_pConfigManager.sTranslation["sellPlant"][
+                            "error"
+                        ].format(name=name)
+                    available = plant[name]
+                    sellAmount = available if isAll else min(available, num)
+                    if sellAmount <= 0:
+                        return g_pConfigManager.sTranslation["sellPlant"][
+                            "error1"
+                        ].format(name=name)
+                    if not await g_pDBService.userPlant.addUserPlantsByUid(
+                        uid, {name: -sellAmount}
+                    ):
+                        raise RuntimeError(f"扣除出售的作物失败: {uid} {name}")
+                    totalSold = sellAmount
+
+                if name == "":
+                    totalPoint = point
+                else:
+                    plantInfo = await g_pDBService.plant.getPlantByName(name)
+                    if not plantInfo:
+                        price = 0
+                    else:
+                        price = plantInfo["price"]
+
+                    totalPoint = totalSold * price
+
+                currentPoint = await g_pDBService.user.addUserPointByUid(
+                    uid, totalPoint
                 )
-            await g_pDBService.userPlant.updateUserPlantByName(
-                uid, name, available - sellAmount
-            )
-            totalSold = sellAmount
-
-        if name == "":
-            totalPoint = point
-        else:
-            plantInfo = await g_pDBService.plant.getPlantByName(name)
-            if not plantInfo:
-                price = 0
-            else:
-                price = plantInfo["price"]
-
-            totalPoint = totalSold * price
-
-        currentPoint = await g_pDBService.user.getUserPointByUid(uid)
-        await g_pDBService.user.updateUserPointByUid(uid, currentPoint + totalPoint)
+                if currentPoint < 0:
+                    raise RuntimeError(f"出售作物入账失败: {uid}")
+        except Exception as e:
+            logger.warning(f"出售作物失败！{e}")
+            return g_pConfigManager.sTranslation["sellPlant"]["error2"]
 
         if name == "":
             return g_pConfigManager.sTranslation["sellPlant"]["success"].format(
-                point=totalPoint, num=currentPoint + totalPoint
+                point=totalPoint, num=currentPoint
             )
         else:
             return g_pConfigManager.sTranslation["sellPlant"]["success1"].format(
-                name=name, point=totalPoint, num=currentPoint + totalPoint
+                name=name, point=totalPoint, num=currentPoint
             )
 
 
@@ -0,0 +1,152 @@
+import asyncio
+import functools
+import inspect
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import ClassVar
+
+from astrbot.api import logger
+
+
+class CUserLockEntry:
+    """单个用户的锁记录，引用计数归零即从注册表中移除"""
+
+    __slots__ = ("m_iRefCount", "m_pLock")
+
+    def __init__(self):
+        self.m_pLock = asyncio.Lock()
+        self.m_iRefCount = 0
+
+
+class CUserLockManager:
+    # 用户Uid -> 锁记录 仅保存正在持有或等待中的用户
+    m_pLocks: ClassVar[dict[str, CUserLockEntry]] = {}
+
+    # 当前协程已持有的用户锁 用于同一指令内的重入
+    m_pHeldKeys: ContextVar[frozenset] = ContextVar(
+        "farmHeldUserLocks", default=frozenset()
+    )
+
+    # 锁等待指标
+    m_pMetrics: ClassVar[dict[str, int | float]] = {
+        "acquired": 0,  # 加锁总次数
+        "contended": 0,  # 需要等待的加锁次数
+        "waitTotal": 0.0,  # 累计等待时间 单位秒
+        "waitMax": 0.0,  # 最长等待时间 单位秒
+    }
+
+    @classmethod
+    @asynccontextmanager
+    async def lock(cls, *uids: str):
+        """按用户Uid串行化指令，多个Uid按固定顺序加锁以避免死锁
+
+        同一协程内已持有的Uid会被跳过，因此嵌套调用不会自锁
+
+        Args:
+            *uids (str): 需要加锁的用户Uid
+        """
+        held = cls.m_pHeldKeys.get()
+        keys = sorted({str(uid) for uid in uids if uid} - held)
+
+        acquired = []
+        token = None
+        try:
+            for key in keys:
+                await cls._acquire(key)
+                acquired.append(key)
+
+            token = cls.m_pHeldKeys.set(held | frozenset(keys))
+            yield
+        finally:
+            if token is not None:
+                cls.m_pHeldKeys.reset(token)
+
+            for key in reversed(acquired):
+                cls._release(key)
+
+    @classmethod
+    def serialize(cls, *argNames: str):
+        """装饰器：以指定参数作为用户Uid，为整个方法加用户锁
+
+        Args:
+            *argNames (str): 作为用户Uid的参数名
+
+        Returns:
+            Callable: 装饰器
+        """
+
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                uids = [bound.arguments.get(name, "") for name in argNames]
+
+                async with cls.lock(*uids):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def getMetrics(cls) -> dict:
+        """获取锁等待指标
+
+        Returns:
+            dict: 加锁次数、等待次数、累计/平均/最长等待时间及当前锁数量
+        """
+        metrics = dict(cls.m_pMetrics)
+        metrics["waitAvg"] = (
+            metrics["waitTotal"] / metrics["contended"] if metrics["contended"] else 0.0
+        )
+        metrics["active"] = len(cls.m_pLocks)
+
+        return metrics
+
+    @classmethod
+    async def _acquire(cls, key: str):
+        entry = cls.m_pLocks.get(key)
+        if entry is None:
+            entry = cls.m_pLocks[key] = CUserLockEntry()
+
+        entry.m_iRefCount += 1
+
+        contended = entry.m_pLock.locked()
+        start = time.perf_counter()
+        try:
+            await entry.m_pLock.acquire()
+        except BaseException:
+            cls._dropRef(key, entry)
+            raise
+
+        cls.m_pMetrics["acquired"] += 1
+        if contended:
+            wait = time.perf_counter() - start
+
+            cls.m_pMetrics["contended"] += 1
+            cls.m_pMetrics["waitTotal"] += wait
+            cls.m_pMetrics["waitMax"] = max(cls.m_pMetrics["waitMax"], wait)
+
+            logger.debug(f"用户 {key} 等待指令锁 {wait * 1000:.1f}ms")
+
+    @classmethod
+    def _release(cls, key: str):
+        entry = cls.m_pLocks.get(key)
+        if entry is None:
+            return
+
+        entry.m_pLock.release()
+        cls._dropRef(key, entry)
+
+    @classmethod
+    def _dropRef(cls, key: str, entry: CUserLockEntry):
+        # 无人持有也无人等待时立即回收 保证注册表大小受在线指令数约束
+        entry.m_iRefCount -= 1
+        if entry.m_iRefCount <= 0 and cls.m_pLocks.get(key) is entry:
+            del cls.m_pLocks[key]
+
+
+g_pUserLockManager = CUserLockManager()
@@ -17,11 +17,15 @@ from astrbot.core.utils.session_waiter import (
 )
 
 from . import cfg
+from .database.backup import g_pBackupManager
 from .database.database import g_pSqlManager
+from .database.retention import g_pRetentionManager
+from .database.transfer import g_pTransferManager
 from .dbService import g_pDBService
 from .farm.farm import g_pFarmManager
 from .farm.shop import g_pShopManager
 from .json import g_pJsonManager
+from .lock import g_pUserLockManager
 from .request import g_pRequestManager
 from .tool import g_pToolManager
 
@@ -36,6 +40,41 @@ class CAstrbotPluginFarm(Star):
         )
         cfg.g_pConfigManager.sFarmPrefix = config.get("FarmPrefix", "")
 
+        cfg.g_pConfigManager.sDBJournalMode = config.get("FarmDBJournalMode", "WAL")
+        cfg.g_pConfigManager.sDBSynchronous = config.get("FarmDBSynchronous", "NORMAL")
+        cfg.g_pConfigManager.iDBCacheSize = config.get("FarmDBCacheSize", -16000)
+        cfg.g_pConfigManager.iDBMmapSize = config.get("FarmDBMmapSize", 134217728)
+        cfg.g_pConfigManager.sDBTempStore = config.get("FarmDBTempStore", "MEMORY")
+        cfg.g_pConfigManager.iDBBusyTimeout = config.get("FarmDBBusyTimeout", 5000)
+        cfg.g_pConfigManager.iDBReaderCount = config.get("FarmDBReaderCount", 2)
+        cfg.g_pConfigManager.sDBBackend = config.get("FarmDBBackend", "sqlite")
+        cfg.g_pConfigManager.iDBCheckpointInterval = config.get(
+            "FarmDBCheckpointInterval", 300
+        )
+        cfg.g_pConfigManager.iDBBackupInterval = config.get("FarmDBBackupInterval", 24)
+        cfg.g_pConfigManager.iDBBackupKeep = config.get("FarmDBBackupKeep", 7)
+        cfg.g_pConfigManager.iDBBackupPages = config.get("FarmDBBackupPages", 256)
+        cfg.g_pConfigManager.sDBQuietHours = config.get("FarmDBQuietHours", "4-6")
+        cfg.g_pConfigManager.iSignLogRetentionMonths = config.get(
+            "FarmSignLogRetentionMonths", 3
+        )
+        cfg.g_pConfigManager.iDBVacuumPages = config.get("FarmDBVacuumPages", 256)
+        cfg.g_pConfigManager.sDBExportCompression = config.get(
+            "FarmDBExportCompression", "gzip"
+        )
+        cfg.g_pConfigManager.bDBGroupCommit = config.get("FarmDBGroupCommit", False)
+        cfg.g_pConfigManager.iDBGroupCommitDelay = config.get(
+            "FarmDBGroupCommitDelay", 5
+        )
+        cfg.g_pConfigManager.iDBGroupCommitSize = config.get(
+            "FarmDBGroupCommitSize", 32
+        )
+        cfg.g_pConfigManager.iUserCacheSize = config.get("FarmUserCacheSize", 1024)
+        cfg.g_pConfigManager.iUserCacheNegativeTTL = config.get(
+            "FarmUserCacheNegativeTTL", 30
+        )
+        cfg.g_pConfigManager.sSoilEngine = config.get("FarmSoilEngine", "row")
+
         self.commands = {
             "开通农场": self.registerFarm,
             "我的农场": self.myFarm,
@@ -55,6 +94,13 @@ class CAstrbotPluginFarm(Star):
             "农场签到": self.signIn,
             "农场下阶段": self.god,
             "土地升级": self.soilUpgrade,
+            "农场备份": self.backup,
+            "农场备份列表": self.backupList,
+            "农场备份恢复": self.backupRestore,
+            "农场数据整理": self.retention,
+            "农场导出": self.exportFarm,
+            "农场导入": self.importFarm,
+            "农场指标": self.metrics,
         }
 
     async def initialize(self):
@@ -704,7 +750,8 @@ class CAstrbotPluginFarm(Star):
 
         toDay = g_pToolManager.dateTime().date().today()
         message = ""
-        status = await g_pDBService.userSign.sign(uid, toDay.strftime("%Y-%m-%d"))
+        async with g_pUserLockManager.lock(uid):
+            status = await g_pDBService.userSign.sign(uid, toDay.strftime("%Y-%m-%d"))
 
         # 如果完成签到
         if status == 1 or status == 2:
@@ -831,8 +878,151 @@ class CAstrbotPluginFarm(Star):
                 cfg.g_pConfigManager.sTranslation["soilInfo"]["error2"].format(e=e)
             )
 
+    async def backup(self, event: AstrMessageEvent, params: List[str]):
+        """农场备份"""
+        translation = cfg.g_pConfigManager.sTranslation["backup"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        path = await g_pBackupManager.backup()
+        if path is None:
+            yield event.plain_result(translation["error"])
+            return
+
+        yield event.plain_result(translation["success"].format(name=path.name))
+
+    async def backupList(self, event: AstrMessageEvent, params: List[str]):
+        """农场备份列表"""
+        translation = cfg.g_pConfigManager.sTranslation["backup"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        snapshots = g_pBackupManager.listSnapshots()
+        if not snapshots:
+            yield event.plain_result(translation["empty"])
+            return
+
+        names = "\n".join(path.name for path in snapshots)
+        yield event.plain_result(translation["list"].format(names=names))
+
+    async def backupRestore(self, event: AstrMessageEvent, params: List[str]):
+        """农场备份恢复"""
+        translation = cfg.g_pConfigManager.sTranslation["backup"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        name = params[0] if params else ""
+        result = await g_pBackupManager.restoreToStaging(name)
+        if not result:
+            yield event.plain_result(translation["notFound"].format(name=name))
+            return
+
+        if result["integrity"] != "ok":
+            yield event.plain_result(translation["restoreError"].format(**result))
+            return
+
+        yield event.plain_result(translation["restore"].format(**result))
+
+    async def retention(self, event: AstrMessageEvent, params: List[str]):
+        """农场数据整理"""
+        translation = cfg.g_pConfigManager.sTranslation["retention"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        if g_pRetentionManager.m_pRetentionLock.locked():
+            yield event.plain_result(translation["busy"])
+            return
+
+        result = await g_pRetentionManager.run()
+        yield event.plain_result(translation["success"].format(**result))
+
+    async def exportFarm(self, event: AstrMessageEvent, params: List[str]):
+        """农场导出"""
+        translation = cfg.g_pConfigManager.sTranslation["transfer"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        if g_pTransferManager.m_pTransferLock.locked():
+            yield event.plain_result(translation["busy"])
+            return
+
+        uid = params[0] if params else ""
+        result = await g_pTransferManager.export(uid)
+        if not result:
+            yield event.plain_result(translation["exportError"])
+            return
+
+        yield event.plain_result(translation["exportSuccess"].format(**result))
+
+    async def importFarm(self, event: AstrMessageEvent, params: List[str]):
+        """农场导入"""
+        translation = cfg.g_pConfigManager.sTranslation["transfer"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        if not params:
+            yield event.plain_result(translation["noName"])
+            return
+
+        if g_pTransferManager.m_pTransferLock.locked():
+            yield event.plain_result(translation["busy"])
+            return
+
+        result = await g_pTransferManager.importFile(params[0])
+        if not result:
+            yield event.plain_result(translation["notFound"].format(name=params[0]))
+            return
+
+        if "dbVersion" in result:
+            yield event.plain_result(translation["importNewer"].format(**result))
+        elif "error" in result:
+            yield event.plain_result(translation["importError"].format(**result))
+        elif not result["complete"]:
+            yield event.plain_result(translation["importIncomplete"].format(**result))
+        else:
+            yield event.plain_result(translation["importSuccess"].format(**result))
+
+    async def metrics(self, event: AstrMessageEvent, params: List[str]):
+        """农场指标"""
+        translation = cfg.g_pConfigManager.sTranslation["metrics"]
+        if not event.is_admin():
+            yield event.plain_result(translation["noAdmin"])
+            return
+
+        lock = g_pUserLockManager.getMetrics()
+        commit = g_pSqlManager.getCommitMetrics()
+        cache = g_pDBService.user.getCacheMetrics()
+
+        yield event.plain_result(
+            translation["success"].format(
+                lockAcquired=lock["acquired"],
+                lockContended=lock["contended"],
+                lockWaitAvg=f"{lock['waitAvg'] * 1000:.2f}",
+                lockWaitMax=f"{lock['waitMax'] * 1000:.2f}",
+                lockActive=lock["active"],
+                commits=commit["commits"],
+                commitFailed=commit["failed"],
+                batchAvg=f"{commit['batchAvg']:.1f}",
+                batchMax=commit["batchMax"],
+                commitAvg=f"{commit['commitAvg'] * 1000:.2f}",
+                commitMode="合并提交" if commit["groupCommit"] else "逐次提交",
+                cacheHitRate=f"{cache['hitRate'] * 100:.1f}",
+                cacheHit=cache["hit"] + cache["negativeHit"],
+                cacheMiss=cache["miss"],
+                cacheEvicted=cache["evicted"],
+                cacheSize=cache["size"],
+            )
+        )
+
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
-        await g_pSqlManager.cleanup()
-
+        # 先停止备份与整理等后台任务 再关闭数据库连接
         await g_pDBService.cleanup()
+
+        await g_pSqlManager.cleanup()
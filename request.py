@@ -242,15 +242,15 @@ class CRequestManager:
             f"发现新版本 plant.db（远程: {remoteVersion} / 本地: {localVersion}），开始更新..."
         )
 
-        # 先断开数据库连接
-        await g_pDBService.cleanup()
-
         return await cls.downloadPlantDBFile(remoteVersion)
 
     @classmethod
     async def downloadPlantDBFile(cls, remoteVersion: float) -> bool:
         """下载最新版 plant.db 并更新本地 version.json
 
+        新文件先下载到 plantTemp.db 并校验，通过后再替换正式文件，
+        更新过程中旧数据库始终可用
+
         Args:
             remoteVersion (float): 远程版本号
 
@@ -269,20 +269,37 @@ class CRequestManager:
         if not success:
             return False
 
-        # 重命名为 sign_in.json
-        g_pToolManager.renameFile(f"{savePath}/plantTemp.db", "plant.db")
+        tempPath = os.path.join(savePath, "plantTemp.db")
+        catalog = await g_pDBService.plant.validatePlantDB(tempPath)
+        if not catalog:
+            logger.warning("新版本 plant.db 校验未通过，继续使用当前版本")
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+            return False
+
+        try:
+            if not await g_pDBService.plant.promotePlantDB(tempPath, catalog):
+                return False
+        except Exception as e:
+            logger.warning(f"替换 plant.db 失败: {e}")
+            return False
 
+        # 先写临时文件再替换，避免中断时留下损坏的版本文件
         versionPath = os.path.join(savePath, "version.json")
+        versionTempPath = versionPath + ".tmp"
         try:
-            with open(versionPath, "w", encoding="utf-8") as f:
+            with open(versionTempPath, "w", encoding="utf-8") as f:
                 json.dump({"version": remoteVersion}, f)
+            os.replace(versionTempPath, versionPath)
             logger.debug("版本文件已更新")
         except Exception as e:
             logger.warning(f"写入版本文件失败: {e}")
             return False
 
-        await g_pDBService.plant.init()
-        await g_pDBService.plant.downloadPlant()
+        # 作物资源在后台下载，不阻塞插件启动
+        g_pDBService.plant.startDownloadPlant()
 
         return True
 
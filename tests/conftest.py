@@ -0,0 +1,54 @@
+import asyncio
+import importlib
+import importlib.util
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+# 插件目录本身不是可导入的包 以包的形式加载后模块内的相对导入才能生效
+# 注意需以 pytest tests 方式运行 插件目录下的 json.py 会遮蔽标准库 json
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+PLUGIN_NAME = "astrbot_plugin_farm"
+
+if PLUGIN_NAME not in sys.modules:
+    spec = importlib.util.spec_from_loader(PLUGIN_NAME, None, is_package=True)
+    module = importlib.util.module_from_spec(spec)
+    module.__path__ = [str(PLUGIN_ROOT)]
+    sys.modules[PLUGIN_NAME] = module
+
+cfg = importlib.import_module(f"{PLUGIN_NAME}.cfg")
+database = importlib.import_module(f"{PLUGIN_NAME}.database.database")
+dbService = importlib.import_module(f"{PLUGIN_NAME}.dbService")
+
+
+@pytest.fixture(scope="session")
+def loop():
+    # 数据库层的锁为类属性 会绑定首次使用的事件循环 全部用例共用同一个循环
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def farmDB(tmp_path):
+    """按指定的地块存储方式打开一个临时数据库，退出时关闭"""
+
+    @asynccontextmanager
+    async def openFarmDB(engine: str = "row", backend: str = "memory"):
+        config = cfg.g_pConfigManager
+        config.sDBPath = tmp_path
+        config.sDBFilePath = tmp_path / "farm.db"
+        config.sDBBackend = backend
+        config.sSoilEngine = engine
+
+        assert await database.g_pSqlManager.init()
+        await dbService.g_pDBService.init()
+        try:
+            yield dbService.g_pDBService
+        finally:
+            await dbService.g_pDBService.cleanup()
+            await database.g_pSqlManager.cleanup()
+
+    return openFarmDB
@@ -0,0 +1,76 @@
+import importlib
+
+import pytest
+
+cfg = importlib.import_module("astrbot_plugin_farm.cfg")
+g_pDBService = importlib.import_module("astrbot_plugin_farm.dbService").g_pDBService
+g_pFarmManager = importlib.import_module("astrbot_plugin_farm.farm.farm").g_pFarmManager
+
+UID = "8001"
+PLANT = "胡萝卜"
+
+
+async def _witherFarm() -> int:
+    """为用户的全部地块种下已枯萎的作物
+
+    Returns:
+        int: 地块数量
+    """
+    await g_pDBService.user.initUserInfoByUid(UID, "farmer", 0, 0)
+
+    plantId = g_pDBService.plant.m_pCatalog.plantId(PLANT)
+    soilNumber = await g_pDBService.user.getUserSoilByUid(UID)
+    async with g_pDBService.unitOfWork():
+        await g_pDBService.userSoil.importSoils(
+            [
+                {
+                    "uid": UID,
+                    "soilIndex": soilIndex,
+                    "plantId": plantId,
+                    "plantTime": 1,
+                    "matureTime": 1,
+                    "isSoilPlanted": 1,
+                    "wiltStatus": 1,
+                }
+                for soilIndex in range(1, soilNumber + 1)
+            ]
+        )
+
+    return soilNumber
+
+
+async def _eradicate(farmDB, engine: str, failExp: bool, monkeypatch) -> None:
+    async with farmDB(engine):
+        soilNumber = await _witherFarm()
+        exp = await g_pDBService.user.getUserExpByUid(UID)
+
+        if failExp:
+
+            async def addUserExpByUid(uid: str, exp: int) -> int:
+                return -1
+
+            monkeypatch.setattr(g_pDBService.user, "addUserExpByUid", addUserExpByUid)
+
+        result = await g_pFarmManager.eradicate(UID)
+        monkeypatch.undo()
+
+        translation = cfg.g_pConfigManager.sTranslation["eradicate"]
+        if failExp:
+            # 经验增加失败时整次铲除回滚 枯萎的作物原样保留
+            assert result == translation["error"]
+            assert await g_pDBService.user.getUserExpByUid(UID) == exp
+        else:
+            assert result == translation["success"].format(exp=3 * soilNumber)
+
+        for soilIndex in range(1, soilNumber + 1):
+            soil = await g_pDBService.userSoil.getUserSoil(UID, soilIndex)
+            assert soil["wiltStatus"] == (1 if failExp else 0)
+            assert bool(soil["plantId"]) == failExp
+
+
+@pytest.mark.parametrize("engine", ["row", "packed"])
+@pytest.mark.parametrize("failExp", [False, True])
+def test_eradicate_rolls_back_when_exp_fails(
+    loop, farmDB, monkeypatch, engine, failExp
+):
+    loop.run_until_complete(_eradicate(farmDB, engine, failExp, monkeypatch))
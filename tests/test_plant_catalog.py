@@ -0,0 +1,47 @@
+import importlib
+import shutil
+import sqlite3
+
+import pytest
+
+cfg = importlib.import_module("astrbot_plugin_farm.cfg")
+g_pDBService = importlib.import_module("astrbot_plugin_farm.dbService").g_pDBService
+
+PLANT = "胡萝卜"
+
+# 对暂存的 plant.db 所做的修改，以及修改后是否仍应通过校验
+CHANGES = {
+    "unchanged": ([], True),
+    "added": (
+        [
+            "CREATE TEMP TABLE staged AS SELECT * FROM plant WHERE name = :name",
+            "UPDATE staged SET id = (SELECT MAX(id) + 1 FROM plant), name = '新作物'",
+            "INSERT INTO plant SELECT * FROM staged",
+        ],
+        True,
+    ),
+    "renamed": (["UPDATE plant SET name = '改名作物' WHERE name = :name"], False),
+    "renumbered": (
+        ["UPDATE plant SET id = (SELECT MAX(id) + 1 FROM plant) WHERE name = :name"],
+        False,
+    ),
+}
+
+
+async def _validate(farmDB, tmp_path, change: str) -> None:
+    statements, accepted = CHANGES[change]
+    async with farmDB():
+        staged = tmp_path / "plantTemp.db"
+        shutil.copyfile(cfg.g_pConfigManager.sPlantPath, staged)
+        with sqlite3.connect(staged) as db:
+            for statement in statements:
+                db.execute(statement, {"name": PLANT})
+        db.close()
+
+        catalog = await g_pDBService.plant.validatePlantDB(str(staged))
+        assert (catalog is not None) == accepted
+
+
+@pytest.mark.parametrize("change", list(CHANGES))
+def test_validate_refuses_remapped_plants(loop, farmDB, tmp_path, change):
+    loop.run_until_complete(_validate(farmDB, tmp_path, change))
@@ -0,0 +1,18 @@
+import importlib
+
+import pytest
+
+g_pQueryPlanAudit = importlib.import_module(
+    "astrbot_plugin_farm.database.queryPlan"
+).g_pQueryPlanAudit
+
+
+async def _audit(farmDB, backend: str) -> list[str]:
+    async with farmDB(backend=backend):
+        return await g_pQueryPlanAudit.audit()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+def test_hot_statements_use_indexes(loop, farmDB, backend):
+    # 热点语句取自语句登记表 与运行时执行的SQL一致
+    assert loop.run_until_complete(_audit(farmDB, backend)) == []
@@ -0,0 +1,42 @@
+import importlib
+
+cfg = importlib.import_module("astrbot_plugin_farm.cfg")
+database = importlib.import_module("astrbot_plugin_farm.database.database")
+retention = importlib.import_module("astrbot_plugin_farm.database.retention")
+g_pRetentionManager = retention.g_pRetentionManager
+
+
+async def _autoVacuum() -> int:
+    async with database.CSqlManager.m_pDB.execute("PRAGMA auto_vacuum") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def _switchVacuumMode(farmDB, monkeypatch) -> None:
+    async with farmDB(backend="sqlite"):
+        # 迁移不再整理全库 启动后仍为 NONE
+        assert await _autoVacuum() == 0
+
+        # 非空闲时段的定时整理不切换
+        monkeypatch.setattr(
+            retention.CRetentionManager, "isQuiet", staticmethod(lambda: False)
+        )
+        await g_pRetentionManager.vacuum(untilQuietEnds=True)
+        assert await _autoVacuum() == 0
+
+        # 事务中无法执行 VACUUM 切换失败后保持原状 下次整理重试
+        db = database.CSqlManager.m_pDB
+        await db.execute("BEGIN")
+        reclaimed, _ = await g_pRetentionManager.vacuum()
+        assert reclaimed == 0
+        await db.execute("ROLLBACK")
+        assert await _autoVacuum() == 0
+
+        monkeypatch.setattr(
+            retention.CRetentionManager, "isQuiet", staticmethod(lambda: True)
+        )
+        await g_pRetentionManager.vacuum(untilQuietEnds=True)
+        assert await _autoVacuum() == 2
+
+
+def test_incremental_vacuum_switch_is_retried(loop, farmDB, monkeypatch):
+    loop.run_until_complete(_switchVacuumMode(farmDB, monkeypatch))
@@ -0,0 +1,94 @@
+import asyncio
+import importlib
+import random
+
+import pytest
+
+g_pDBService = importlib.import_module("astrbot_plugin_farm.dbService").g_pDBService
+
+TARGET = "9001"
+THIEVES = [str(9100 + i) for i in range(12)]
+PLANT = "草莓"
+
+
+async def _setupFarm(remaining: int) -> dict:
+    """为被偷用户种下最后一季的成熟作物，每块地只剩 remaining 个可偷
+
+    Returns:
+        dict: 作物信息
+    """
+    plant = g_pDBService.plant.m_pCatalog.plant(PLANT)
+
+    await g_pDBService.user.initUserInfoByUid(TARGET, "target", 0, 0)
+    for thief in THIEVES:
+        await g_pDBService.user.initUserInfoByUid(thief, "thief", 0, 0)
+
+    # 被偷数量由偷菜流程维护 无法单独更新 以导入的方式直接写入地块
+    plantId = g_pDBService.plant.m_pCatalog.plantId(PLANT)
+    soilNumber = await g_pDBService.user.getUserSoilByUid(TARGET)
+    async with g_pDBService.unitOfWork():
+        await g_pDBService.userSoil.importSoils(
+            [
+                {
+                    "uid": TARGET,
+                    "soilIndex": soilIndex,
+                    "plantId": plantId,
+                    "plantTime": 1,
+                    "matureTime": 1,
+                    "harvestCount": plant["crop"] - 1,
+                    "isSoilPlanted": 1,
+                    "stolenTotal": plant["harvest"] - remaining,
+                    "stealerCount": 1,
+                }
+                for soilIndex in range(1, soilNumber + 1)
+            ]
+        )
+
+    return plant
+
+
+async def _stealConcurrently(farmDB, engine: str, seed: int) -> None:
+    async with farmDB(engine):
+        g_pDBService.userSteal.m_pRandom = random.Random(seed)
+        try:
+            await _stealAll()
+        finally:
+            g_pDBService.userSteal.m_pRandom = random
+
+
+async def _stealAll() -> None:
+    plant = await _setupFarm(remaining=3)
+
+    results = await asyncio.gather(
+        *[g_pDBService.userSteal.stealMany(TARGET, thief) for thief in THIEVES]
+    )
+
+    stolenByPlot = {}
+    for result in results:
+        for soilIndex, _, number in result["stolen"]:
+            stolenByPlot[soilIndex] = stolenByPlot.get(soilIndex, 0) + number
+
+    records = await g_pDBService.userSteal.getStealRecordsByUid(TARGET)
+    recordedByPlot = {}
+    for record in records:
+        soilIndex = record["soilIndex"]
+        recordedByPlot[soilIndex] = (
+            recordedByPlot.get(soilIndex, 0) + record["stealCount"]
+        )
+
+    soilNumber = await g_pDBService.user.getUserSoilByUid(TARGET)
+    for soilIndex in range(1, soilNumber + 1):
+        soil = await g_pDBService.userSoil.getUserSoil(TARGET, soilIndex)
+
+        assert soil["stolenTotal"] <= plant["harvest"]
+        # 偷走的数量只能是被偷前剩余的 3 个
+        assert stolenByPlot.get(soilIndex, 0) == 3
+        assert recordedByPlot.get(soilIndex, 0) == 3
+        assert soil["stolenTotal"] == plant["harvest"]
+        assert soil["wiltStatus"] == 1
+
+
+@pytest.mark.parametrize("engine", ["row", "packed"])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_concurrent_steal_never_exceeds_harvest(loop, farmDB, engine, seed):
+    loop.run_until_complete(_stealConcurrently(farmDB, engine, seed))
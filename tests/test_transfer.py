@@ -0,0 +1,55 @@
+import gzip
+import importlib
+import json
+
+import pytest
+
+cfg = importlib.import_module("astrbot_plugin_farm.cfg")
+g_pDBService = importlib.import_module("astrbot_plugin_farm.dbService").g_pDBService
+g_pTransferManager = importlib.import_module(
+    "astrbot_plugin_farm.database.transfer"
+).g_pTransferManager
+
+UID = "8101"
+SEED = "胡萝卜"
+
+
+async def _import(farmDB, engine: str, newer: bool) -> None:
+    async with farmDB(engine):
+        cfg.g_pConfigManager.sDBExportCompression = "gzip"
+        await g_pDBService.user.initUserInfoByUid(UID, "farmer", 0, 0)
+        assert await g_pDBService.userSeed.addUserSeedByUid(UID, SEED, 3)
+
+        exported = await g_pTransferManager.export(UID)
+        assert exported
+        path = g_pTransferManager.exportDir() / exported["name"]
+
+        if newer:
+            # 模拟较新版本插件导出的文件 只改写文件头中的数据库版本
+            with gzip.open(path, "rb") as stream:
+                lines = stream.readlines()
+            header = json.loads(lines[0])
+            header["dbVersion"] += 1
+            lines[0] = json.dumps(header).encode() + b"\n"
+            path = path.with_name("farm-newer" + path.name[len("farm-") :])
+            with gzip.open(path, "wb") as stream:
+                stream.writelines(lines)
+
+        # 导出后数量变化 导入时应整行覆盖为文件中的数量而不是累加
+        assert await g_pDBService.userSeed.addUserSeedByUid(UID, SEED, 2)
+
+        result = await g_pTransferManager.importFile(path.name)
+        count = await g_pDBService.userSeed.getUserSeedByName(UID, SEED)
+        if newer:
+            assert result["dbVersion"] == header["dbVersion"]
+            assert result["rows"] == 0
+            assert count == 5
+        else:
+            assert "error" not in result and result["complete"]
+            assert count == 3
+
+
+@pytest.mark.parametrize("engine", ["row", "packed"])
+@pytest.mark.parametrize("newer", [False, True])
+def test_import_replaces_rows_and_rejects_newer_files(loop, farmDB, engine, newer):
+    loop.run_until_complete(_import(farmDB, engine, newer))